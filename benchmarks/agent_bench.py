@@ -0,0 +1,223 @@
+# benchmarks/agent_bench.py
+"""
+End-to-end agent benchmark against the local mock endpoints (mock_openai_server.py).
+
+Starts the mock server in a subprocess, points Sabik at it through the usual environment
+variables and drives AdvancedSabikAgent.process_input through scripted conversations,
+including multi-iteration tool loops. Each repetition is a fresh conversation on the same
+agent (warm connection pools). Reports per turn:
+
+- latency percentiles (wall time of process_input);
+- bytes sent to / received from the endpoints (as seen by the server);
+- time outside the network: wall time minus the time at least one request was in flight,
+  i.e. the agent's own overhead (JSON, rendering, context management, tool code);
+- peak RSS of the process (and peak traced Python memory with --tracemalloc).
+
+    python benchmarks/agent_bench.py [--repeat 10] [--scenario-file my_scenario.json] [--json results.json]
+
+All mock latency and payload options (--chat-latency-ms, --image-kb, ...) are accepted too.
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+from mock_openai_server import add_latency_arguments
+
+# User message -> scripted assistant steps (see mock_openai_server.py)
+DEFAULT_SCENARIO = {
+    "Just say hello.": [],
+    "What is 350 / 7 * 3 + 15 and 12 * 12?": [
+        {"tool_calls": [{"name": "calculator", "arguments": {"expressions": ["350 / 7 * 3 + 15", "12 * 12"]}}]},
+        {"content": "165.0 and 144."},
+    ],
+    "Research these pages, draw a summary image and read the conclusion aloud.": [
+        {"tool_calls": [
+            {"name": "fetch_many_urls", "arguments": {"urls": ["{base}/page/1", "{base}/page/2", "{base}/page/3"]}},
+            {"name": "calculator", "arguments": {"expression": "3 * 64"}},
+        ]},
+        {"tool_calls": [{"name": "generate_ai_image", "arguments": {"prompt": "summary chart", "width": 256, "height": 256}}]},
+        {"tool_calls": [{"name": "generate_speech_audio", "arguments": {"text_to_speak": "The pages agree.", "auto_play": False}}]},
+        {"content": "Done: fetched three pages, generated the image and spoke the conclusion."},
+    ],
+}
+
+
+def start_mock_server(options, scenario_path):
+    command = [sys.executable, os.path.join(BENCH_DIR, "mock_openai_server.py"), "--script", scenario_path]
+    for name, value in vars(options).items():
+        if name in MOCK_OPTIONS:
+            command += [f"--{name.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("READY "):
+        process.kill()
+        raise RuntimeError(f"Mock server failed to start: {line!r}")
+    return process, line.split()[1]
+
+
+def fetch_request_log(base_url):
+    with urllib.request.urlopen(f"{base_url}/__stats") as response:
+        return json.load(response)["requests"]
+
+
+def network_seconds(requests, start, end):
+    """Length of the union of request intervals clipped to [start, end]."""
+    intervals = sorted((max(r["start"], start), min(r["end"], end)) for r in requests if r["end"] > start and r["start"] < end)
+    total, current_start, current_end = 0.0, None, None
+    for interval_start, interval_end in intervals:
+        if current_end is None or interval_start > current_end:
+            if current_end is not None:
+                total += current_end - current_start
+            current_start, current_end = interval_start, interval_end
+        else:
+            current_end = max(current_end, interval_end)
+    if current_end is not None:
+        total += current_end - current_start
+    return total
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples):
+    latencies = [s["latency_ms"] for s in samples]
+    return {
+        "turns": len(samples),
+        "latency_ms": {"p50": percentile(latencies, 0.5), "p90": percentile(latencies, 0.9), "p99": percentile(latencies, 0.99), "max": max(latencies), "mean": statistics.fmean(latencies)},
+        "outside_network_ms": {"p50": percentile([s["outside_network_ms"] for s in samples], 0.5), "mean": statistics.fmean(s["outside_network_ms"] for s in samples)},
+        "requests_per_turn": statistics.fmean(s["requests"] for s in samples),
+        "bytes_sent_per_turn": statistics.fmean(s["bytes_sent"] for s in samples),
+        "bytes_received_per_turn": statistics.fmean(s["bytes_received"] for s in samples),
+    }
+
+
+def run(options):
+    scenario = DEFAULT_SCENARIO
+    if options.scenario_file:
+        with open(options.scenario_file, "r", encoding="utf-8") as f:
+            scenario = json.load(f)
+    with tempfile.TemporaryDirectory(prefix="sabik-bench-") as workdir:
+        scenario_path = os.path.join(workdir, "scenario.json")
+        with open(scenario_path, "w", encoding="utf-8") as f:
+            json.dump(scenario, f)
+
+        server, base_url = start_mock_server(options, scenario_path)
+        try:
+            # Configuration is read at import time, so the environment is set before importing sabik_agent
+            os.environ.update({
+                "OPENAI_BASE_URL_TEXT": f"{base_url}/openai",
+                "OPENAI_IMAGE_BASE_URL_TEXT": base_url,
+                "OUTPUT_DIR": os.path.join(workdir, "outputs"),
+                "STREAM_RESPONSES": "true" if options.stream else "false",
+                "RESULT_CACHE_ENABLED": "false", # Measure the work, not the caches
+                "TTS_CACHE_ENABLED": "false",
+                "TTS_AUTO_PLAY": "false",
+                "TRACE_ENABLED": "true" if options.trace else "false",
+                "TRACE_FILE": os.path.join(workdir, "traces.jsonl"),
+                "TRACE_METRICS_FILE": os.path.join(workdir, "metrics.prom"),
+            })
+            sys.path.insert(0, PROJECT_ROOT)
+            from sabik_agent.agent import AdvancedSabikAgent
+            from sabik_agent import output, tracing
+            output.set_sink("rich" if options.verbose else "null")
+            agent = AdvancedSabikAgent()
+            if options.tracemalloc:
+                tracemalloc.start()
+            samples = []
+            for repetition in range(options.warmup + options.repeat):
+                agent.reset_conversation()
+                for user_input in scenario:
+                    started = time.time()
+                    agent.process_input(user_input)
+                    ended = time.time()
+                    if repetition >= options.warmup:
+                        samples.append({"label": user_input, "start": started, "end": ended})
+
+            traced_peak = tracemalloc.get_traced_memory()[1] if options.tracemalloc else None
+            log = fetch_request_log(base_url)
+            tracing.configure(False) # Writes the last spans while the working directory still exists
+        finally:
+            server.stdin.close()
+            server.wait(timeout=10)
+
+    for sample in samples:
+        in_turn = [r for r in log if r["start"] >= sample["start"] and r["end"] <= sample["end"] + 0.01]
+        wall = sample["end"] - sample["start"]
+        sample.update({
+            "latency_ms": wall * 1000,
+            "outside_network_ms": (wall - network_seconds(in_turn, sample["start"], sample["end"])) * 1000,
+            "requests": len(in_turn),
+            "bytes_sent": sum(r["bytes_in"] for r in in_turn),
+            "bytes_received": sum(r["bytes_out"] for r in in_turn),
+        })
+
+    report = {
+        "settings": {name: value for name, value in vars(options).items() if name != "json"},
+        "overall": summarize(samples),
+        "by_turn": {label: summarize([s for s in samples if s["label"] == label]) for label in scenario},
+        "memory": {
+            "traced_peak_mib": traced_peak / (1024 * 1024) if traced_peak is not None else None,
+            "max_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, # KiB on Linux
+        },
+    }
+    return report
+
+
+def print_report(report):
+    def line(label, summary):
+        latency = summary["latency_ms"]
+        print(f"{label[:48]:48} {summary['turns']:5d} {latency['p50']:8.1f} {latency['p90']:8.1f} {latency['p99']:8.1f} {summary['outside_network_ms']['p50']:9.1f} "
+              f"{summary['requests_per_turn']:6.1f} {summary['bytes_sent_per_turn'] / 1024:9.1f} {summary['bytes_received_per_turn'] / 1024:9.1f}")
+    print(f"{'turn':48} {'n':>5} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'local ms':>9} {'reqs':>6} {'sent KiB':>9} {'recv KiB':>9}")
+    for label, summary in report["by_turn"].items():
+        line(label, summary)
+    line("ALL", report["overall"])
+    memory = report["memory"]
+    traced = f"{memory['traced_peak_mib']:.1f} MiB" if memory["traced_peak_mib"] is not None else "n/a"
+    print(f"\nPeak traced memory: {traced}, max RSS: {memory['max_rss_mib']:.1f} MiB")
+    print("'local ms' = p50 of time outside the network (agent overhead)")
+
+
+MOCK_OPTIONS = set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=10, help="Measured repetitions of the scenario")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured repetitions first")
+    parser.add_argument("--scenario-file", help="JSON file mapping user messages to scripted assistant steps")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="Benchmark with STREAM_RESPONSES=false")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report peak traced Python memory (slows the agent down)")
+    parser.add_argument("--trace", action="store_true", help="Run with TRACE_ENABLED=true (spans are written to the temporary work directory)")
+    parser.add_argument("--verbose", action="store_true", help="Show the agent's Rich output (default: the null output sink)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    mock_group = parser.add_argument_group("mock server")
+    add_latency_arguments(mock_group)
+    MOCK_OPTIONS.update(action.dest for action in mock_group._group_actions)
+    options = parser.parse_args()
+
+    report = run(options)
+    print_report(report)
+    if options.json:
+        with open(options.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+# benchmarks/mock_openai_server.py
+"""
+Local stand-in for the endpoints Sabik talks to, for benchmarks.
+
+    POST {prefix}/chat/completions   chat completions, streamed (SSE) or not, with scripted tool calls
+    POST {prefix}                    TTS (openai-audio): JSON with base64 audio
+    GET  /prompt/<prompt>            image generation: PNG bytes
+    GET  /page/<n>                   HTML page for the web tools
+    GET  /__stats                    per-request log (timestamps and bytes) as JSON
+    POST /__reset                    clears the request log
+
+Scripts map a user message to the assistant steps that follow it. The step is chosen from the
+number of assistant messages after that user message, so the server is stateless and safe
+for concurrent agents:
+
+    {"Compute the totals": [
+        {"tool_calls": [{"name": "calculator", "arguments": {"expression": "2+2"}}]},
+        {"content": "The total is 4."}
+    ]}
+
+"{base}" inside tool-call arguments is replaced by the server's base URL. Messages without
+a script (and exhausted scripts) get a plain text reply of --reply-chars characters.
+
+    python benchmarks/mock_openai_server.py --port 0 --script scenario.json
+prints "READY <base_url>" once it is listening.
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+FILLER = "Sabik benchmark reply text. "
+
+
+def _png_bytes(size):
+    """A valid 1x1 PNG padded with an ancillary chunk to roughly `size` bytes."""
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+    header = b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0))
+    pixels = chunk(b"IDAT", zlib.compress(b"\x00\xff\x00\x00"))
+    padding = chunk(b"zzZz", os.urandom(max(0, size - len(header) - len(pixels) - 24)))
+    return header + padding + pixels + chunk(b"IEND", b"")
+
+
+class MockState:
+    def __init__(self, options, script):
+        self.options = options
+        self.script = script
+        self.base_url = None
+        self.lock = threading.Lock()
+        self.log = []
+        self.image = _png_bytes(options.image_kb * 1024)
+        self.audio_b64 = base64.b64encode(b"ID3" + os.urandom(max(0, options.audio_kb * 1024 - 3))).decode("ascii")
+        self.reply = (FILLER * (options.reply_chars // len(FILLER) + 1))[:options.reply_chars]
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real endpoints
+    state = None # Set by serve()
+
+    def log_message(self, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        # Small SSE writes must not wait for delayed ACKs (Nagle), as with real servers
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    # --- plumbing -------------------------------------------------------------------
+
+    def _begin(self):
+        self._started = time.time()
+        self._bytes_out = 0
+        length = int(self.headers.get("Content-Length") or 0)
+        self._body = self.rfile.read(length) if length else b""
+        self._bytes_in = len(self.requestline) + len(str(self.headers)) + len(self._body)
+
+    def _finish(self, kind):
+        with self.state.lock:
+            self.state.log.append({"kind": kind, "start": self._started, "end": time.time(), "bytes_in": self._bytes_in, "bytes_out": self._bytes_out})
+
+    def end_headers(self):
+        self._bytes_out += sum(len(line) for line in getattr(self, "_headers_buffer", [])) + 2
+        super().end_headers()
+
+    def _write(self, data):
+        self.wfile.write(data)
+        self._bytes_out += len(data)
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self._write(body)
+
+    def _send_json(self, obj, status=200):
+        self._send(status, json.dumps(obj).encode("utf-8"), "application/json")
+
+    def _sleep(self, milliseconds):
+        if milliseconds > 0:
+            time.sleep(milliseconds / 1000)
+
+    # --- routes ---------------------------------------------------------------------
+
+    def do_GET(self):
+        self._begin()
+        path = urlsplit(self.path).path
+        if path == "/__stats":
+            with self.state.lock:
+                log = list(self.state.log)
+            return self._send_json({"requests": log})
+        if path.startswith("/prompt/"):
+            self._sleep(self.state.options.image_latency_ms)
+            self._send(200, self.state.image, "image/png")
+            return self._finish("image")
+        if path.startswith("/page/"):
+            self._sleep(self.state.options.page_latency_ms)
+            paragraph = "<p>" + FILLER * 8 + "</p>\n"
+            body = "<html><head><title>Mock page</title></head><body><nav>menu</nav>" + paragraph * max(1, self.state.options.page_kb * 1024 // len(paragraph)) + "</body></html>"
+            self._send(200, body.encode("utf-8"), "text/html; charset=utf-8")
+            return self._finish("page")
+        self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        self._begin()
+        path = urlsplit(self.path).path.rstrip("/")
+        if path == "/__reset":
+            with self.state.lock:
+                self.state.log.clear()
+            return self._send_json({"ok": True})
+        try:
+            payload = json.loads(self._body or b"{}")
+        except ValueError:
+            return self._send_json({"error": "invalid JSON"}, status=400)
+        if path.endswith("/chat/completions"):
+            self._chat(payload)
+            return self._finish("chat")
+        if payload.get("model") == "openai-audio" or "audio" in (payload.get("modalities") or []):
+            self._sleep(self.state.options.tts_latency_ms)
+            self._send_json({"choices": [{"index": 0, "message": {"role": "assistant", "content": None, "audio": {"data": self.state.audio_b64}}}]})
+            return self._finish("tts")
+        self._send_json({"error": "not found"}, status=404)
+
+    # --- chat completions -----------------------------------------------------------
+
+    def _next_step(self, messages):
+        last_user = None
+        for i, message in enumerate(messages):
+            if message.get("role") == "user" and isinstance(message.get("content"), str):
+                last_user = i
+        if last_user is None:
+            return {"content": self.state.reply}
+        steps = self.state.script.get(messages[last_user]["content"], [])
+        step_index = sum(1 for message in messages[last_user + 1:] if message.get("role") == "assistant")
+        if step_index < len(steps):
+            return steps[step_index]
+        return {"content": self.state.reply}
+
+    def _tool_calls(self, step):
+        calls = []
+        for i, call in enumerate(step.get("tool_calls") or []):
+            arguments = json.dumps(call.get("arguments", {})).replace("{base}", self.state.base_url)
+            calls.append({"id": f"call_{int(time.time() * 1000)}_{i}", "type": "function", "function": {"name": call["name"], "arguments": arguments}})
+        return calls
+
+    @staticmethod
+    def _usage(payload, content, tool_calls):
+        # Rough 4-characters-per-token estimate, enough to exercise usage accounting
+        prompt = len(json.dumps(payload.get("messages", []))) // 4
+        completion = (len(content or "") + sum(len(call["function"]["arguments"]) for call in tool_calls)) // 4
+        return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion}
+
+    def _chat(self, payload):
+        options = self.state.options
+        step = self._next_step(payload.get("messages", []))
+        tool_calls = self._tool_calls(step)
+        content = step.get("content")
+        created = int(time.time())
+        self._sleep(options.chat_latency_ms)
+        if not payload.get("stream"):
+            message = {"role": "assistant", "content": content}
+            if tool_calls:
+                message["tool_calls"] = tool_calls
+            return self._send_json({
+                "id": "chatcmpl-mock", "object": "chat.completion", "created": created, "model": payload.get("model", "mock"),
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+                "usage": self._usage(payload, content, tool_calls),
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(delta, finish_reason=None):
+            chunk = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": payload.get("model", "mock"),
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+
+        event({"role": "assistant", "content": ""})
+        size = max(1, options.stream_chunk_chars)
+        for start in range(0, len(content or ""), size):
+            self._sleep(options.stream_chunk_delay_ms)
+            event({"content": content[start:start + size]})
+        for index, call in enumerate(tool_calls):
+            event({"tool_calls": [{"index": index, "id": call["id"], "type": "function", "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            arguments = call["function"]["arguments"]
+            for start in range(0, len(arguments), size):
+                self._sleep(options.stream_chunk_delay_ms)
+                event({"tool_calls": [{"index": index, "function": {"arguments": arguments[start:start + size]}}]})
+        event({}, finish_reason="tool_calls" if tool_calls else "stop")
+        if (payload.get("stream_options") or {}).get("include_usage"):
+            usage = {"id": "chatcmpl-mock", "object": "chat.completion.chunk", "created": created, "model": payload.get("model", "mock"),
+                     "choices": [], "usage": self._usage(payload, content, tool_calls)}
+            self._write_chunk(f"data: {json.dumps(usage)}\n\n".encode("utf-8"))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _write_chunk(self, data):
+        self._write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def add_latency_arguments(parser):
+    """Latency and payload options, shared with the benchmark driver."""
+    parser.add_argument("--chat-latency-ms", type=float, default=40.0, help="Delay before a chat completion starts")
+    parser.add_argument("--stream-chunk-delay-ms", type=float, default=2.0, help="Delay between streamed chunks")
+    parser.add_argument("--stream-chunk-chars", type=int, default=16, help="Characters per streamed chunk")
+    parser.add_argument("--reply-chars", type=int, default=400, help="Length of plain text replies")
+    parser.add_argument("--image-latency-ms", type=float, default=150.0)
+    parser.add_argument("--image-kb", type=int, default=256)
+    parser.add_argument("--tts-latency-ms", type=float, default=100.0)
+    parser.add_argument("--audio-kb", type=int, default=64)
+    parser.add_argument("--page-latency-ms", type=float, default=30.0)
+    parser.add_argument("--page-kb", type=int, default=64)
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping keep-alive connections at exit is expected here
+        if not isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            super().handle_error(request, client_address)
+
+
+def serve(options, script, host="127.0.0.1", port=0):
+    """Starts the server on a background thread and returns it (base URL in server.state.base_url)."""
+    state = MockState(options, script)
+    handler = type("BoundMockHandler", (MockHandler,), {"state": state})
+    server = MockServer((host, port), handler)
+    state.base_url = f"http://{host}:{server.server_port}"
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--script", help="JSON file mapping user messages to assistant steps")
+    add_latency_arguments(parser)
+    options = parser.parse_args()
+    script = {}
+    if options.script:
+        with open(options.script, "r", encoding="utf-8") as f:
+            script = json.load(f)
+    server = serve(options, script, options.host, options.port)
+    print(f"READY {server.state.base_url}", flush=True)
+    try:
+        # Exit when the parent closes our stdin (or on Ctrl+C)
+        sys.stdin.read()
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# benchmarks/startup_importtime.py
+"""
+Cold-start benchmark for the CLI: imports main.py and constructs the agent (everything that
+happens before the first prompt) in fresh interpreters with `python -X importtime`.
+
+Reports the median self-measured import time over several runs and the slowest modules, and
+exits with status 1 if the median exceeds --budget-ms or if any module that should load lazily
+(openai, numpy, PIL, ... see DEFERRED_MODULES) was imported at startup.
+
+    python benchmarks/startup_importtime.py [--runs 5] [--budget-ms 250] [--top 15]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STARTUP_CODE = "import main; main.AdvancedSabikAgent()"
+# Heavy dependencies that must only load on first use (first LLM call or first tool call)
+DEFERRED_MODULES = ["openai", "httpx", "requests", "numpy", "numexpr", "PIL", "pydub", "gtts", "rich.markdown", "rich.syntax"]
+
+
+def measure_once():
+    """Returns ({module: (self_us, cumulative_us)}, total_us) for one cold start."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_CODE],
+        cwd=PROJECT_ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE="1"),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup failed:\n{result.stderr[-2000:]}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules, sum(self_us for self_us, _ in modules.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="Fail if the median total import time exceeds this")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest modules (cumulative) to list")
+    args = parser.parse_args()
+
+    totals = []
+    for _ in range(max(1, args.runs)):
+        modules, total_us = measure_once()
+        totals.append(total_us)
+
+    median_ms = statistics.median(totals) / 1000
+    print(f"Startup import time over {len(totals)} runs: median {median_ms:.1f} ms, min {min(totals) / 1000:.1f} ms, max {max(totals) / 1000:.1f} ms")
+    print(f"Modules imported: {len(modules)}")
+    print("\nSlowest modules (cumulative, last run):")
+    for name, (self_us, cumulative_us) in sorted(modules.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    failures = []
+    eager = [name for name in DEFERRED_MODULES if name in modules]
+    if eager:
+        failures.append(f"Deferred modules imported at startup: {', '.join(eager)}")
+    if median_ms > args.budget_ms:
+        failures.append(f"Median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    for failure in failures:
+        print(f"\nFAIL: {failure}")
+    if not failures:
+        print(f"\nOK: within the {args.budget_ms:.0f} ms budget and no deferred module loaded at startup")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,10 @@
 # main.py - Entry point for the Sabik AI Agent CLI
 
+import argparse
+import json
 import os
 import sys
+import time
 
 # Ensure the sabik_agent package can be found if running main.py directly from sabik/
 # This is useful for development. For installation, setup.py would handle paths.
@@ -12,13 +15,31 @@ sys.path.insert(0, project_root)
 
 from sabik_agent.agent import AdvancedSabikAgent
 from sabik_agent.interface import console, Panel
+from sabik_agent import output
 from sabik_agent import config as app_config # For OUTPUT_DIR or other direct config needs
 
-def run_cli():
-    # Output directory is created by config.py when imported
-    # os.makedirs(app_config.OUTPUT_DIR, exist_ok=True) # Redundant if config.py does it
+def run_cli(quiet=False, session_log=None):
+    # Output directories are created by the tools when they first write to them
 
     agent = AdvancedSabikAgent()
+    session_note = "Session saving is off."
+    if session_log is not None:
+        if session_log.turns:
+            agent.resume_session(session_log)
+            session_note = f"Resumed session {session_log.id} ({session_log.turns} turns)."
+        else:
+            agent.session_log = session_log
+            session_note = f"Session: {session_log.id} (resume with --resume {session_log.id})"
+    if quiet:
+        try:
+            return run_quiet_cli(agent)
+        finally:
+            if session_log is not None:
+                session_log.close()
+    if app_config.STREAM_RESPONSES:
+        streaming_note = "Responses are streamed; tool calls start as soon as their arguments arrive."
+    else:
+        streaming_note = "Responses are not streamed (STREAM_RESPONSES=false)."
     
     console.print(Panel(f"""[bold]Sabik AI Agent[/]
 Referrer: [cyan]{agent.referrer}[/cyan]
@@ -27,7 +48,8 @@ Image API: [cyan]{app_config.OPENAI_IMAGE_BASE_URL_TEXT}[/cyan]
 Output Dir: [cyan]{app_config.OUTPUT_DIR}[/cyan]
 
 The agent uses Large Language Models with tool-calling capabilities.
-Responses are not streamed in this version for simplicity with tool integration.
+{streaming_note}
+{session_note}
 """, title="[bold green]Welcome to Sabik AI![/]", border_style="green", expand=False))
 
     console.print(Panel("""[bold]Available Commands & Usage Examples:[/bold]
@@ -73,7 +95,69 @@ Responses are not streamed in this version for simplicity with tool integration.
             console.rule(style="dim grey50") # Separator after processing each command
 
     finally:
+        if session_log is not None:
+            session_log.close()
         console.print("[bold green]Sabik AI shut down gracefully.[/bold green]")
 
+def run_quiet_cli(agent):
+    # No banners, panels or prompts: read requests from stdin and print only the answers
+    for line in sys.stdin:
+        user_input = line.strip()
+        if user_input.lower() in ("quit", "exit"):
+            break
+        if user_input:
+            print(agent.process_input(user_input), flush=True)
+
+def list_sessions_cli():
+    from sabik_agent.sessions import SessionStore
+    entries = SessionStore().list()
+    if not entries:
+        print("No saved sessions.")
+    for entry in entries:
+        updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.get("updated", 0)))
+        print(f"{entry['id']}  {updated}  {entry.get('turns', 0):4d} turns  {entry.get('title', '')}")
+
+def open_session(options):
+    """The session log for the interactive loop: resumed, new, or None when saving is off."""
+    from sabik_agent.sessions import SessionStore
+    if options.resume is not None:
+        return SessionStore().open(options.resume)
+    if options.no_session or not app_config.SESSIONS_ENABLED:
+        return None
+    return SessionStore().create()
+
+def run_batch_cli(options):
+    from sabik_agent.batch import run_batch
+    output_path = options.output or os.path.join(app_config.OUTPUT_DIR, "batch_results.jsonl")
+    summary = run_batch(options.batch, output_path, concurrency=options.concurrency, resume=not options.no_resume, verbose=options.verbose)
+    print(json.dumps(dict(summary, output=output_path)), file=sys.stderr)
+    return 130 if summary["interrupted"] else (1 if summary["error"] else 0)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sabik AI terminal assistant. Interactive unless --batch is given.")
+    parser.add_argument("--batch", metavar="PROMPTS", help="Run prompts from a file ('-' for stdin) without interaction: one per line, plain text or JSON {\"id\", \"prompt\"}")
+    parser.add_argument("-o", "--output", help="JSONL results file for --batch (default: OUTPUT_DIR/batch_results.jsonl)")
+    parser.add_argument("-c", "--concurrency", type=int, help="Parallel agent sessions for --batch (default: BATCH_CONCURRENCY)")
+    parser.add_argument("--no-resume", action="store_true", help="Re-run prompts that already have an 'ok' record in the output file")
+    parser.add_argument("--verbose", action="store_true", help="Show the output of batch sessions (in the --output-mode format)")
+    parser.add_argument("--sessions", action="store_true", help="List saved sessions, most recent first, and exit")
+    parser.add_argument("--resume", nargs="?", const="last", metavar="ID", help="Continue a saved session (an id, a unique id prefix, or the most recent one if omitted)")
+    parser.add_argument("--no-session", action="store_true", help="Do not save this conversation")
+    parser.add_argument("--output-mode", choices=sorted(output.SINKS), help="How agent and tool output is shown (default: OUTPUT_MODE)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Same as --output-mode null; interactively, only the answers are printed")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
-    run_cli()
+    options = parse_args()
+    if options.quiet or options.output_mode:
+        output.set_sink("null" if options.quiet else options.output_mode)
+    if options.sessions:
+        sys.exit(list_sessions_cli())
+    if options.batch:
+        sys.exit(run_batch_cli(options))
+    try:
+        session_log = open_session(options)
+    except KeyError as e:
+        print(f"Cannot resume: {e.args[0]}", file=sys.stderr)
+        sys.exit(1)
+    run_cli(quiet=options.quiet, session_log=session_log)
@@ -1,5 +1,6 @@
 # Marks the folder as a Python package
 # Optionally, you can make key classes/functions available for easier import
 # from .agent import AdvancedSabikAgent
+# from .async_agent import AsyncSabikAgent
 # from .interface import console
 # from .config import OUTPUT_DIR
\ No newline at end of file
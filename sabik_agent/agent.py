@@ -1,17 +1,21 @@
 # sabik_agent/agent.py
-import openai
-import requests
 import json
 import os # For API_KEY, etc., if not using config module directly for everything
 import time # For loop counts, etc.
+import threading
+from concurrent.futures import ThreadPoolExecutor
 # urllib.parse removed as tool helpers handle URL encoding
 
-# Rich components for agent's own logging/display if needed outside of tools
-from .interface import console, Panel, Markdown, Live, Spinner, Text, Syntax, Table
+# Everything the agent displays goes through the active output sink (Rich, plain, JSON or null)
+from . import output
 
 # Agent-specific modules
 from . import config as app_config # Use the config module
 from . import tools as agent_tools
+from . import tracing
+from .blobs import STUB_PREFIX, externalize
+from .context import ContextBudget
+from .tool_selection import ToolSelector
 # from . import utils - tools will import utils directly or agent passes utils module to tools
 
 class AdvancedSabikAgent:
@@ -24,11 +28,10 @@ class AdvancedSabikAgent:
         - Consistency: maintain system instructions throughout processing
         """
         self.referrer = referrer or app_config.REFERRER_ID
-        self.client = openai.OpenAI(
-            base_url=app_config.OPENAI_BASE_URL_TEXT,
-            api_key=app_config.API_KEY,
-            default_headers={"Referer": self.referrer}
-        )
+        # The LLM client and HTTP session (openai, httpx, requests) are built on first use
+        self._client = None
+        self._session = None
+        self._lazy_lock = threading.Lock() # Tool workers may read self.session concurrently; build it once
         self.system_instructions = """
         You are Sabik, a terminal-first AI assistant. You are fast, focused, and efficient—built for power users who operate in the command line.
 
@@ -52,60 +55,284 @@ Stay sharp. Stay quiet unless needed. Let the user lead.
 
 You are Sabik.
 """
-        self.session = requests.Session()
-        self.session.headers.update({"User-Agent": self.referrer, "Referer": self.referrer})
-
-        # Tool definitions (schemas)
-        self.tools_schemas = [
-            { "type": "function", "function": { "name": "generate_ai_image", "description": "Generate an image from a text prompt. Use when asked to create, draw, or visualize something.", "parameters": { "type": "object", "properties": { "prompt": {"type": "string", "description": "Detailed description of the image."}, "model": {"type": "string", "description": "Optional: Image model (e.g., 'flux', 'turbo')."}, "width": {"type": "integer", "description": "Optional: Image width."}, "height": {"type": "integer", "description": "Optional: Image height."}, }, "required": ["prompt"]}}},
-            { "type": "function", "function": { "name": "analyze_image_content", "description": "Analyzes an image (from URL or local path) to describe it or answer questions about it.", "parameters": { "type": "object", "properties": { "image_url_or_path": {"type": "string", "description": "URL or local path of the image."}, "analysis_prompt": {"type": "string", "description": "Specific question/focus for analysis (e.g., 'What color is the car?'). Defaults to general description."}, }, "required": ["image_url_or_path"]}}},
-            { "type": "function", "function": { "name": "transcribe_audio_file", "description": "Transcribes speech from a local audio file into text.", "parameters": { "type": "object", "properties": { "audio_file_path": {"type": "string", "description": "Local path of the audio file."}, }, "required": ["audio_file_path"]}}},
-            { "type": "function", "function": { "name": "generate_speech_audio", "description": "Converts text to speech audio, saves it, and automatically plays it. Use when asked to 'say', 'speak', or 'read aloud'.", "parameters": { "type": "object", "properties": { "text_to_speak": {"type": "string", "description": "Text to convert to speech."}, "voice": {"type": "string", "enum": ["alloy", "echo", "fable", "onyx", "nova", "shimmer"], "description": "Voice for TTS. Defaults to 'alloy'."}, "auto_play": {"type": "boolean", "description": "Whether to automatically play the audio after generation. Defaults to true."} }, "required": ["text_to_speak"]}}},
-            { "type": "function", "function": { "name": "simple_web_search", "description": "Fetches a summary of a single web page given its URL. Useful for finding current information or details from a specific website.", "parameters": { "type": "object", "properties": { "url": {"type": "string", "description": "The URL of the webpage to search/fetch."}, }, "required": ["url"]}}},
-            { "type": "function", "function": { "name": "calculator", "description": "Evaluates a simple mathematical expression (e.g., '2+2', '100*3.14/2'). Use for calculations. Only supports basic arithmetic operations: +, -, *, / and parentheses.", "parameters": { "type": "object", "properties": { "expression": {"type": "string", "description": "The mathematical expression to evaluate."}, }, "required": ["expression"]}}},
-        ]
+
+        # Tool definitions (schemas), declared in tools/registry.py
+        self.tools_schemas = agent_tools.tool_schemas()
         
-        # Mapping tool names to their actual functions in agent_tools module
-        self.available_functions = {
-            "generate_ai_image": agent_tools.generate_ai_image,
-            "analyze_image_content": agent_tools.analyze_image_content,
-            "transcribe_audio_file": agent_tools.transcribe_audio_file,
-            "generate_speech_audio": agent_tools.generate_speech_audio,
-            "simple_web_search": agent_tools.simple_web_search,
-            "calculator": agent_tools.calculator,
-        }
+        # Mapping tool names to their functions; each tool module is imported on its first call
+        self.available_functions = agent_tools.lazy_functions()
+
+        self.tool_selector = ToolSelector(agent_tools.TOOL_SPECS)
+        self.reset_conversation()
+
+        # Concurrent tool execution (see _handle_function_call)
+        self._tool_executor = None
+        self._serial_tool_lock = threading.Lock()
+
+    def reset_conversation(self):
+        """
+        Starts a new, independent conversation: clears the history, the per-turn state, the context
+        budget's rolling summary and the session log binding. Clients, pools and caches are kept.
+        """
+        # Per-turn tool subset (see _start_turn); the full set until the first turn
+        self.turn_tools_schemas = self.tools_schemas
+        self.last_turn_tools = []
+        self.last_turn_tool_calls = [] # {"id", "name", "arguments", "status"} per tool call of the last turn
         self.message_history = []
+        self.context_budget = ContextBudget(
+            app_config.CONTEXT_TOKEN_BUDGET,
+            keep_turns=app_config.CONTEXT_KEEP_TURNS,
+            summarizer=self._summarize_dropped_turns if app_config.CONTEXT_SUMMARIZE else None,
+        )
+        self.last_turn_tokens_saved = 0
 
-    def _chat_completion_with_tools(self, messages_to_send, model="openai-large"):
-        current_messages_for_api_call = list(messages_to_send) # Work with a copy
+        # Persistence of the conversation (see sessions.py); None keeps it in memory only
+        self.session_log = None
+        self._turn_user_message = None
+        self._persisted_summary = None # Rolling summary message last recorded in the session log
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lazy_lock:
+                if self._client is None:
+                    import openai
+                    from .transport import build_http_client
+                    self._client = openai.OpenAI(
+                        base_url=app_config.OPENAI_BASE_URL_TEXT,
+                        api_key=app_config.API_KEY,
+                        default_headers={"Referer": self.referrer},
+                        http_client=build_http_client(self.referrer),
+                        max_retries=0, # Retries and backoff are handled by the shared transport
+                    )
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lazy_lock:
+                if self._session is None:
+                    from .transport import build_session
+                    self._session = build_session(self.referrer)
+        return self._session
+
+    @session.setter
+    def session(self, value):
+        self._session = value
+
+    def _request_payload(self, messages, model):
         request_payload = {
             "model": model,
-            "messages": current_messages_for_api_call,
-            "stream": False,
-            "tools": self.tools_schemas, # Use the schemas here
-            "tool_choice": "auto"
+            "messages": list(messages),
+            "stream": app_config.STREAM_RESPONSES,
         }
+        if self.turn_tools_schemas: # The API rejects an empty tools list
+            request_payload["tools"] = self.turn_tools_schemas # Tool subset selected for this turn
+            request_payload["tool_choice"] = "auto"
+        if app_config.STREAM_RESPONSES and tracing.current().recording:
+            request_payload["stream_options"] = {"include_usage": True} # Token usage arrives in a final chunk
+        return request_payload
+
+    @staticmethod
+    def _trace_request(span, request_payload):
+        if span.recording: # Serializing the payload again is only worth it when it is recorded
+            tools = request_payload.get("tools")
+            encoded_tools = getattr(tools, "json", None) # Cached subsets carry their JSON (see tool_selection.py)
+            if encoded_tools is None:
+                span.set(bytes_sent=len(json.dumps(request_payload, default=str)))
+            else:
+                rest = {key: value for key, value in request_payload.items() if key != "tools"}
+                span.set(bytes_sent=len(json.dumps(rest, default=str)) + len(', "tools": ') + len(encoded_tools))
 
-        console.print(Panel(f"Model: {model}, Tools: Enabled", title="[bold blue]Sending to LLM[/]", border_style="blue", expand=False))
-        spinner_text = Text("Assistant is thinking...", style="grey50 italic")
-        spinner_obj = Spinner("dots", text=spinner_text)
-        live_renderable = Panel(spinner_obj, border_style="dim grey50", expand=False)
+    @staticmethod
+    def _trace_response(span, response_message_dict, usage=None):
+        if usage is not None:
+            span.set(prompt_tokens=usage.prompt_tokens, completion_tokens=usage.completion_tokens)
+        if response_message_dict is not None:
+            span.set(response_chars=len(response_message_dict.get("content") or ""), tool_calls=len(response_message_dict.get("tool_calls") or []))
 
-        with Live(live_renderable, console=console, refresh_per_second=10, vertical_overflow="visible") as live:
+    def _tools_state(self):
+        offered = len(self.turn_tools_schemas)
+        if offered == len(self.tools_schemas):
+            return f"All {offered}"
+        if not offered:
+            return "None"
+        names = ", ".join(schema["function"]["name"] for schema in self.turn_tools_schemas)
+        return f"{offered} of {len(self.tools_schemas)} ({names})"
+
+    def _request_assistant_message(self, live, messages, model, follow_up=False):
+        """
+        Performs one chat completion call and returns (assistant_message_dict, started_tool_futures),
+        or (None, None) on failure. started_tool_futures maps tool_call ids to calls that were
+        already started while the response was still streaming.
+        """
+        with tracing.span("llm.request", model=model, stream=app_config.STREAM_RESPONSES, messages=len(messages), tools=len(self.turn_tools_schemas)) as span:
+            request_payload = self._request_payload(messages, model)
+            self._trace_request(span, request_payload)
             try:
-                response = self.client.chat.completions.create(**request_payload)
+                if app_config.STREAM_RESPONSES:
+                    response_message_dict, started_tool_futures = self._stream_assistant_message(live, request_payload)
+                else:
+                    response = self.client.chat.completions.create(**request_payload)
+                    response_message_dict, started_tool_futures = None, {}
+                    if response.choices:
+                        response_message_dict = response.choices[0].message.model_dump(exclude_unset=True) # Get as dict
+                    self._trace_response(span, response_message_dict, response.usage)
             except Exception as e:
-                live.update(Panel(f"API Call Failed: {str(e)}", title="[bold red]Error[/]", border_style="red"))
-                console.print(f"[red]Initial API call error: {e}[/red]")
+                span.record_error(e)
+                if follow_up:
+                    live.status("Error", f"API Call Failed (Follow-up): {str(e)}", "error")
+                    output.message(f"Follow-up API call error: {e}", "error")
+                else:
+                    live.status("Error", f"API Call Failed: {str(e)}", "error")
+                    output.message(f"Initial API call error: {e}", "error")
+                return None, None
+
+        if response_message_dict is None:
+            if follow_up:
+                live.status("Error", "No response choices after tool call.", "error")
+                output.message("Error: No choices after tool call.", "error")
+            else:
+                live.status("Error", "No response choices from API.", "error")
+                output.message("Error: No choices from API.", "error")
+            return None, None
+        return response_message_dict, started_tool_futures
+
+    def _stream_assistant_message(self, live, request_payload):
+        """
+        Consumes a streamed chat completion. Text deltas are rendered into the live panel as they
+        arrive and tool_call fragments are assembled by index. A tool call is started on the tool
+        pool as soon as its arguments form a complete JSON object, before the stream has finished.
+        Returns (assistant_message_dict or None if no choices were streamed, started_tool_futures).
+        If the stream fails, calls already started are settled (see _settle_tool_calls) before the error propagates.
+        """
+        content_parts = []
+        tool_calls_by_index = {}
+        started_tool_futures = {}
+        started_tool_calls = []
+        received_choices = False
+
+        span = tracing.current()
+        usage = None
+        try:
+            for chunk in self.client.chat.completions.create(**request_payload):
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                received_choices = True
+                delta = chunk.choices[0].delta
+                maybe_complete = self._apply_stream_delta(delta, content_parts, tool_calls_by_index)
+
+                if delta.content:
+                    live.stream(content_parts) # The sink joins and renders the text only if it displays it
+
+                for entry in maybe_complete:
+                    snapshot = self._completed_tool_call(entry, started_tool_futures)
+                    if snapshot:
+                        started_tool_futures[snapshot["id"]] = self._get_tool_executor().submit(tracing.bind(self._execute_tool_call), snapshot)
+                        started_tool_calls.append(snapshot)
+        except Exception:
+            if started_tool_calls:
+                self._record_abandoned_tool_calls(started_tool_calls, self._settle_tool_calls(started_tool_calls, started_tool_futures, "the response stream failed"))
+            raise
+
+        if not received_choices:
+            return None, started_tool_futures
+        response_message_dict = self._streamed_message(content_parts, tool_calls_by_index)
+        self._trace_response(span, response_message_dict, usage)
+        return response_message_dict, started_tool_futures
+
+    @staticmethod
+    def _apply_stream_delta(delta, content_parts, tool_calls_by_index):
+        """
+        Folds one streamed delta into the accumulated content and tool calls.
+        Returns the tool call entries whose arguments may have just become complete.
+        """
+        if delta.content:
+            content_parts.append(delta.content)
+        maybe_complete = []
+        for tool_call_delta in delta.tool_calls or []:
+            entry = tool_calls_by_index.setdefault(tool_call_delta.index, {"id": None, "type": "function", "function": {"name": "", "arguments": ""}})
+            if tool_call_delta.id:
+                entry["id"] = tool_call_delta.id
+            function_delta = tool_call_delta.function
+            if function_delta is None:
+                continue
+            if function_delta.name:
+                entry["function"]["name"] += function_delta.name
+            if function_delta.arguments:
+                entry["function"]["arguments"] += function_delta.arguments
+                # A JSON object is only parseable once its closing brace has arrived
+                if "}" in function_delta.arguments:
+                    maybe_complete.append(entry)
+        return maybe_complete
+
+    @staticmethod
+    def _streamed_message(content_parts, tool_calls_by_index):
+        response_message_dict = {"role": "assistant", "content": "".join(content_parts) or None}
+        if tool_calls_by_index:
+            response_message_dict["tool_calls"] = [tool_calls_by_index[index] for index in sorted(tool_calls_by_index)]
+        return response_message_dict
+
+    def _completed_tool_call(self, tool_call_dict, started_tool_calls):
+        """
+        Returns a snapshot of a streamed tool call that is ready to run early (id, known name and
+        complete JSON arguments, not started yet), or None.
+        """
+        if not app_config.PARALLEL_TOOL_CALLS:
+            return None
+        tool_call_id = tool_call_dict.get("id")
+        function_name = tool_call_dict["function"]["name"]
+        if not tool_call_id or tool_call_id in started_tool_calls or function_name not in self.available_functions:
+            return None
+        try:
+            if not isinstance(json.loads(tool_call_dict["function"]["arguments"]), dict):
                 return None
+        except json.JSONDecodeError:
+            return None # Arguments still incomplete
+        # Snapshot the entry so later (whitespace) fragments cannot change what is being executed
+        return {"id": tool_call_id, "type": "function", "function": dict(tool_call_dict["function"])}
+
+    def _settle_tool_calls(self, tool_calls, started_tool_futures, reason):
+        """
+        Outcomes for tool calls of a response that will not be followed up. Calls started early are
+        cancelled if still queued and awaited otherwise (their side effects have happened); calls
+        never run get an error result naming `reason`.
+        """
+        outcomes = []
+        for tool_call_dict in tool_calls:
+            future = started_tool_futures.get(tool_call_dict.get("id"))
+            if future is not None and not future.cancel():
+                try:
+                    outcomes.append(future.result())
+                except Exception as e: # Defensive: _execute_tool_call should never raise
+                    outcomes.append(self._tool_error_outcome(tool_call_dict, e))
+            else:
+                outcomes.append(self._skipped_tool_outcome(tool_call_dict, reason))
+        return outcomes
+
+    def _skipped_tool_outcome(self, tool_call_dict, reason):
+        return self._tool_history_message(tool_call_dict, json.dumps({"error": f"Tool call not executed: {reason}."})), "skipped"
+
+    def _record_abandoned_tool_calls(self, tool_calls, outcomes):
+        """Adds the calls started for a failed response, with their results, so the history shows what ran."""
+        self.message_history.append({"role": "assistant", "content": None, "tool_calls": tool_calls})
+        self.message_history.extend(self._collect_tool_outcomes(tool_calls, outcomes))
 
-            if not response.choices:
-                live.update(Panel("No response choices from API.", title="[bold red]Error[/]", border_style="red"))
-                console.print("[red]Error: No choices from API.[/red]")
+    def _chat_completion_with_tools(self, messages_to_send, model="openai-large"):
+        tools_state = f"{self._tools_state()}, Streaming" if app_config.STREAM_RESPONSES else self._tools_state()
+        sink = output.get_sink()
+        sink.llm_request(model, tools_state)
+
+        with sink.live() as live:
+            response_message_dict, started_tool_futures = self._request_assistant_message(live, messages_to_send, model)
+            if response_message_dict is None:
                 return None
-            
-            response_message_pydantic = response.choices[0].message
-            response_message_dict = response_message_pydantic.model_dump(exclude_unset=True) # Get as dict
             self.message_history.append(response_message_dict) # Add assistant's first response
 
             loop_count = 0
@@ -114,160 +341,305 @@ You are Sabik.
             # Loop as long as the LLM requests tool calls
             while response_message_dict.get("tool_calls") and loop_count < max_loops:
                 loop_count += 1
-                live.update(Panel(f"Assistant requested tool call(s)... (Iteration {loop_count})", title="[bold magenta]Tool Call Requested[/]", border_style="magenta"))
-                
-                tool_calls_display = []
-                for tc_dict in response_message_dict.get("tool_calls", []):
-                    func_info = tc_dict.get('function', {})
-                    tool_calls_display.append(f"  ID: {tc_dict.get('id')}, Func: {func_info.get('name')}, Args: {func_info.get('arguments')}")
-                console.print(Panel("\n".join(tool_calls_display), title="[bold bright_yellow]Tool Call Details[/]", border_style="bright_yellow"))
-
-                # Handle the function calls and get results
-                # The tool_calls from Pydantic model are already dict-like
-                tool_results = self._handle_function_call(response_message_dict.get("tool_calls", []))
+                live.status("Tool Call Requested", f"Assistant requested tool call(s)... (Iteration {loop_count})", "tool")
+                sink.tool_calls_requested(response_message_dict.get("tool_calls", []))
+
+                # Handle the function calls and get results (calls started during streaming are reused)
+                tool_results = self._handle_function_call(response_message_dict.get("tool_calls", []), started_tool_futures)
                 
                 # Add tool results to message history for the next LLM call
                 for res_dict in tool_results:
                     self.message_history.append(res_dict)
 
-                live.update(Panel(f"Sending tool results to LLM... (Iteration {loop_count})", title="[bold blue]Follow-up LLM Call[/]", border_style="blue"))
+                live.status("Follow-up LLM Call", f"Sending tool results to LLM... (Iteration {loop_count})")
                 
                 # Make a new call to the LLM with the tool results
-                follow_up_payload = {
-                    "model": model,
-                    "messages": list(self.message_history), # Send the updated history
-                    "stream": False,
-                    "tools": self.tools_schemas,
-                    "tool_choice": "auto"
-                }
-                
-                try:
-                    response = self.client.chat.completions.create(**follow_up_payload)
-                except Exception as e:
-                    live.update(Panel(f"API Call Failed (Follow-up): {str(e)}", title="[bold red]Error[/]", border_style="red"))
-                    console.print(f"[red]Follow-up API call error: {e}[/red]")
-                    return None
-
-                if not response.choices:
-                    live.update(Panel("No response choices after tool call.", title="[bold red]Error[/]", border_style="red"))
-                    console.print("[red]Error: No choices after tool call.[/red]")
+                self._fit_context()
+                response_message_dict, started_tool_futures = self._request_assistant_message(live, self.message_history, model, follow_up=True)
+                if response_message_dict is None:
                     return None
-                
-                response_message_pydantic = response.choices[0].message
-                response_message_dict = response_message_pydantic.model_dump(exclude_unset=True)
                 self.message_history.append(response_message_dict) # Add new assistant response
 
             if loop_count >= max_loops:
-                live.update(Panel(f"Max tool call iterations ({max_loops}) reached.", title="[bold orange]Loop Limit[/]", border_style="orange"))
-                console.print(f"[orange3]Warning: Max tool call iterations reached.[/orange3]")
-
-            final_content = response_message_pydantic.content
-            if final_content:
-                live.update(Panel(Markdown(final_content), title="[bold bright_magenta]Assistant[/]", border_style="bright_magenta", title_align="left"))
-            else: # If the last message was a tool call, there might be no text content
-                live.update(Panel("[No direct text content in final assistant response. Review tool outputs and logs.]", title="[bold bright_magenta]Assistant[/]", border_style="bright_magenta", title_align="left"))
-            
+                live.status("Loop Limit", f"Max tool call iterations ({max_loops}) reached.", "warning")
+                output.message("Warning: Max tool call iterations reached.", "warning")
+                if response_message_dict.get("tool_calls"):
+                    # Every tool_call needs a result; calls started while streaming are awaited, not orphaned
+                    tool_calls = response_message_dict["tool_calls"]
+                    outcomes = self._settle_tool_calls(tool_calls, started_tool_futures, "tool call iteration limit reached")
+                    self.message_history.extend(self._collect_tool_outcomes(tool_calls, outcomes))
+
+            final_content = response_message_dict.get("content")
+            with tracing.span("render.markdown", chars=len(final_content or "")):
+                live.assistant(final_content) # Without text content, the sink shows a placeholder
+
             return response_message_dict # Return the dictionary of the final assistant message
 
-    def _handle_function_call(self, tool_calls_list_of_dicts):
-        tool_results_for_history = []
-        
-        table = Table(title="[bold yellow]Executing Tools[/]", show_lines=True, expand=False)
-        table.add_column("Tool ID", style="dim", overflow="fold")
-        table.add_column("Function", style="cyan", overflow="fold")
-        table.add_column("Arguments", style="magenta", overflow="fold", max_width=50)
-        table.add_column("Status", style="green", overflow="fold")
+    def _get_tool_executor(self):
+        """Lazily create the bounded worker pool shared by all concurrent tool calls of this agent."""
+        if self._tool_executor is None:
+            self._tool_executor = ThreadPoolExecutor(max_workers=max(1, app_config.TOOL_MAX_WORKERS), thread_name_prefix="sabik-tool")
+        return self._tool_executor
+
+    @staticmethod
+    def _tool_history_message(tool_call_dict, tool_output_content_str):
+        return {
+            "tool_call_id": str(tool_call_dict.get("id")), # Must be a string
+            "role": "tool",
+            "name": str(tool_call_dict.get("function", {}).get("name")), # Must be a string
+            "content": tool_output_content_str # Must be a string (JSON string of results)
+        }
+
+    def _check_tool_call(self, tool_call_dict):
+        """Returns an error outcome for unknown or malformed tool calls, or None if the call can be executed."""
+        function_details = tool_call_dict.get("function", {})
+        function_name = function_details.get("name")
+        if function_name not in self.available_functions:
+            err_msg = f"Function '{function_name}' not found or not implemented by the agent."
+            output.panel("Unknown Tool Function", f"LLM requested an unknown function: '{function_name}'", "error")
+            return self._tool_history_message(tool_call_dict, json.dumps({"error": err_msg})), "unknown function"
+        if function_details.get("arguments") is None or tool_call_dict.get("id") is None:
+            err_msg = f"Malformed tool_call object for function '{function_name}'. Missing arguments string or tool_call_id."
+            output.panel("Malformed Tool Call", f"Malformed tool_call for '{function_name}': {tool_call_dict}", "error")
+            return self._tool_history_message(tool_call_dict, json.dumps({"error": err_msg})), "error"
+        return None
+
+    def _tool_kwargs(self, function_to_call, function_args):
+        # Pass necessary dependencies to the tool function
+        return dict(
+            session=self.session,
+            client=self.client,
+            config=app_config, # Pass the whole config module
+            **function_args # The specific arguments for the tool
+        )
+
+    def _tool_result_outcome(self, tool_call_dict, function_response_obj):
+        function_name = tool_call_dict.get("function", {}).get("name")
+        if isinstance(function_response_obj, dict):
+            tool_output_content_str = json.dumps(function_response_obj)
+            status = str(function_response_obj.get("status", "unknown")).lower()
+        else: # Should ideally always be a dict for consistency
+            tool_output_content_str = str(function_response_obj) # Fallback
+            status = "non-dict result"
+        # Display tool result; the sink reuses the serialized string and formats only if it displays it
+        with tracing.span("render.tool_result", tool=function_name, chars=len(tool_output_content_str)):
+            output.get_sink().tool_result(function_name, function_response_obj, tool_output_content_str)
+        if not getattr(self.available_functions.get(function_name), "inline_result", False):
+            # Large results go to the blob store; the history keeps a preview and a handle
+            tool_output_content_str = externalize(function_response_obj, tool_output_content_str)
+        return self._tool_history_message(tool_call_dict, tool_output_content_str), status
+
+    def _tool_error_outcome(self, tool_call_dict, e):
+        function_name = tool_call_dict.get("function", {}).get("name")
+        args_str = tool_call_dict.get("function", {}).get("arguments")
+        if isinstance(e, json.JSONDecodeError):
+            err_msg = f"Invalid JSON arguments for tool '{function_name}': {str(e)}. Args received: {args_str}"
+            output.panel("Tool Argument Error", f"Invalid JSON arguments for {function_name}: {args_str}\nError: {e}", "error")
+        elif isinstance(e, TypeError): # Mismatched arguments for the tool function
+            err_msg = f"Incorrect arguments when calling tool '{function_name}': {str(e)}. Args received: {args_str}"
+            output.panel("Tool Call Error", f"Argument error for tool {function_name} with args {args_str}:\nError: {e}", "error")
+        else: # Catch-all for other errors during tool execution
+            err_msg = f"Exception during execution of tool '{function_name}': {type(e).__name__} - {str(e)}. Args received: {args_str}"
+            output.panel("Tool Execution Error", f"Error executing tool {function_name}:\n{type(e).__name__}: {e}", "error")
+        return self._tool_history_message(tool_call_dict, json.dumps({"error": err_msg})), "error"
 
+    def _execute_tool_call(self, tool_call_dict):
+        """
+        Runs a single tool call and returns (history_message_dict, status), status being e.g. "success" or "error".
+        Never raises: every failure is converted into an error result so that one
+        failing call cannot affect the other calls of the same assistant turn.
+        """
+        failure = self._check_tool_call(tool_call_dict)
+        if failure:
+            return failure
+        function_details = tool_call_dict["function"]
+        function_to_call = self.available_functions[function_details["name"]]
+        with tracing.span("tool", tool=function_details["name"], bytes_sent=len(function_details["arguments"])) as span:
+            try:
+                function_args = json.loads(function_details["arguments"])
+                tool_kwargs = self._tool_kwargs(function_to_call, function_args)
+                if getattr(function_to_call, "serial_only", False):
+                    # serial_only tools must never overlap with each other
+                    with self._serial_tool_lock:
+                        function_response_obj = function_to_call(**tool_kwargs)
+                else:
+                    function_response_obj = function_to_call(**tool_kwargs)
+            except Exception as e:
+                span.record_error(e)
+                return self._tool_error_outcome(tool_call_dict, e)
+            outcome = self._tool_result_outcome(tool_call_dict, function_response_obj)
+            self._trace_tool_result(span, function_response_obj, outcome[0]["content"])
+            return outcome
+
+    @staticmethod
+    def _trace_tool_result(span, function_response_obj, content):
+        span.set(bytes_received=len(content))
+        if isinstance(function_response_obj, dict):
+            span.set(status=function_response_obj.get("status"))
+            if isinstance(function_response_obj.get("cache"), str): # Tools report hit / miss / revalidated ...
+                span.set(cache=function_response_obj["cache"])
+
+    def _handle_function_call(self, tool_calls_list_of_dicts, started_tool_futures=None):
+        started_tool_futures = started_tool_futures or {}
         if not tool_calls_list_of_dicts:
-            return tool_results_for_history
-
-        for tool_call_dict in tool_calls_list_of_dicts:
-            function_details = tool_call_dict.get("function", {})
-            function_name = function_details.get("name")
-            args_str = function_details.get("arguments") # This is a string
-            tool_call_id = tool_call_dict.get("id")
-
-            status_display = "[red]Error[/red]" # Default status
-            tool_output_content_str = "" # For history
-
-            if function_name in self.available_functions:
-                function_to_call = self.available_functions[function_name]
-                if args_str is not None and tool_call_id is not None:
-                    try:
-                        function_args = json.loads(args_str)
-                        # Pass necessary dependencies to the tool function
-                        function_response_obj = function_to_call(
-                            session=self.session,
-                            client=self.client,
-                            config=app_config, # Pass the whole config module
-                            **function_args # The specific arguments for the tool
-                        )
-                        
-                        if isinstance(function_response_obj, dict):
-                            tool_output_content_str = json.dumps(function_response_obj)
-                            status_display = f"[green]{function_response_obj.get('status', 'unknown').capitalize()}[/green]"
-                            # Display tool result (optional, can be verbose)
-                            console.print(Panel(Syntax(json.dumps(function_response_obj, indent=2), "json", theme="default", word_wrap=True), title=f"Result: [cyan]{function_name}[/]", border_style="green", expand=False))
-                        else: # Should ideally always be a dict for consistency
-                            tool_output_content_str = str(function_response_obj) # Fallback
-                            status_display = "[yellow]Non-dict result[/yellow]"
-                            console.print(f"[yellow]Warning:[/yellow] Tool {function_name} returned a non-dictionary type: {tool_output_content_str}")
-
-                    except json.JSONDecodeError as e:
-                        err_msg = f"Invalid JSON arguments for tool '{function_name}': {str(e)}. Args received: {args_str}"
-                        tool_output_content_str = json.dumps({"error": err_msg})
-                        console.print(Panel(f"Invalid JSON arguments for {function_name}: {args_str}\nError: {e}", title="[bold red]Tool Argument Error[/]", border_style="red"))
-                    except TypeError as e: # Mismatched arguments for the tool function
-                        err_msg = f"Incorrect arguments when calling tool '{function_name}': {str(e)}. Args received: {args_str}"
-                        tool_output_content_str = json.dumps({"error": err_msg})
-                        console.print(Panel(f"Argument error for tool {function_name} with args {args_str}:\nError: {e}", title="[bold red]Tool Call Error[/]", border_style="red"))
-                    except Exception as e: # Catch-all for other errors during tool execution
-                        err_msg = f"Exception during execution of tool '{function_name}': {type(e).__name__} - {str(e)}. Args received: {args_str}"
-                        tool_output_content_str = json.dumps({"error": err_msg})
-                        console.print(Panel(f"Error executing tool {function_name}:\n{type(e).__name__}: {e}", title="[bold red]Tool Execution Error[/]", border_style="red"))
-                else: # Missing args_str or tool_call_id
-                    err_msg = f"Malformed tool_call object for function '{function_name}'. Missing arguments string or tool_call_id."
-                    tool_output_content_str = json.dumps({"error": err_msg})
-                    console.print(Panel(f"Malformed tool_call for '{function_name}': {tool_call_dict}", title="[bold red]Malformed Tool Call[/]", border_style="red"))
-            else: # Function name not found in available_functions
-                err_msg = f"Function '{function_name}' not found or not implemented by the agent."
-                tool_output_content_str = json.dumps({"error": err_msg})
-                console.print(Panel(f"LLM requested an unknown function: '{function_name}'", title="[bold red]Unknown Tool Function[/]", border_style="red"))
-                status_display = "[red]Unknown Function[/red]"
-            
-            table.add_row(str(tool_call_id), str(function_name), str(args_str), status_display)
-            tool_results_for_history.append({
-                "tool_call_id": str(tool_call_id), # Must be a string
-                "role": "tool",
-                "name": str(function_name), # Must be a string
-                "content": tool_output_content_str # Must be a string (JSON string of results)
-            })
-        
-        console.print(table)
+            return []
+
+        if started_tool_futures or (app_config.PARALLEL_TOOL_CALLS and len(tool_calls_list_of_dicts) > 1):
+            # Independent calls run concurrently; results are still collected in tool_call order
+            executor = self._get_tool_executor()
+            futures = [
+                started_tool_futures.get(tool_call_dict.get("id")) or executor.submit(tracing.bind(self._execute_tool_call), tool_call_dict)
+                for tool_call_dict in tool_calls_list_of_dicts
+            ]
+            outcomes = []
+            for tool_call_dict, future in zip(tool_calls_list_of_dicts, futures):
+                try:
+                    outcomes.append(future.result())
+                except Exception as e: # Defensive: _execute_tool_call should never raise
+                    outcomes.append(self._tool_error_outcome(tool_call_dict, e))
+        else:
+            outcomes = [self._execute_tool_call(tool_call_dict) for tool_call_dict in tool_calls_list_of_dicts]
+
+        return self._collect_tool_outcomes(tool_calls_list_of_dicts, outcomes)
+
+    def _collect_tool_outcomes(self, tool_calls_list_of_dicts, outcomes):
+        """
+        Reports the summary of the calls and returns the role=tool messages in tool_call order.
+        Runs on the turn's thread, so per-turn state is only changed here, never from tool workers.
+        """
+        tool_results_for_history = []
+        summary_rows = []
+
+        for tool_call_dict, (tool_result_dict, status) in zip(tool_calls_list_of_dicts, outcomes):
+            args_str = tool_call_dict.get("function", {}).get("arguments")
+            summary_rows.append((tool_result_dict["tool_call_id"], tool_result_dict["name"], str(args_str), status))
+            tool_results_for_history.append(tool_result_dict)
+            self.last_turn_tool_calls.append({"id": tool_result_dict["tool_call_id"], "name": tool_result_dict["name"], "arguments": args_str, "status": status})
+            if tool_result_dict["name"] not in self.last_turn_tools:
+                self.last_turn_tools.append(tool_result_dict["name"])
+            if str(tool_result_dict["content"]).startswith(STUB_PREFIX):
+                self._offer_tool("read_tool_result") # The result went to the blob store
+
+        output.get_sink().tool_summary(summary_rows)
         return tool_results_for_history
 
-    def process_input(self, user_input):
+    def _start_turn(self, user_input):
         # Ensure system instructions are always first in message history
         if not self.message_history or self.message_history[0].get("role") != "system":
             self.message_history.insert(0, {"role": "system", "content": self.system_instructions})
-        self.message_history.append({"role": "user", "content": user_input})
-        
-        # For simplicity, using a fixed model. Could be made configurable.
-        model = "openai-large" 
-        
-        console.rule("[bold blue]Processing Request[/]")
-        # Send a copy of the history to avoid modification by _chat_completion_with_tools if it were to do so
-        # (though current implementation appends to self.message_history directly)
-        messages_to_send = list(self.message_history) 
-        
-        assistant_response_dict = self._chat_completion_with_tools(messages_to_send, model=model)
-        
+        self._turn_user_message = {"role": "user", "content": user_input}
+        self.message_history.append(self._turn_user_message)
+        self.last_turn_tool_calls = []
+        self._select_turn_tools(user_input)
+
+    def _select_turn_tools(self, user_input):
+        previous_tools, self.last_turn_tools = self.last_turn_tools, []
+        if not app_config.TOOL_SELECTION:
+            self.turn_tools_schemas = self.tools_schemas
+            return
+        names = self.tool_selector.select(user_input, previous_tools)
+        self.turn_tools_schemas = self.tool_selector.schemas(names, self.tools_schemas)
+        # Follow-up questions may need parts of large results stored in earlier turns
+        if any(message.get("role") == "tool" and str(message.get("content")).startswith(STUB_PREFIX) for message in self.message_history):
+            self._offer_tool("read_tool_result")
+
+    def _offer_tool(self, name):
+        """Adds a tool to this turn's subset, e.g. read_tool_result once a result went to the blob store."""
+        names = [schema["function"]["name"] for schema in self.turn_tools_schemas]
+        if name not in names and name in self.available_functions:
+            self.turn_tools_schemas = self.tool_selector.schemas(names + [name], self.tools_schemas)
+
+    @staticmethod
+    def _turn_result(assistant_response_dict):
         if assistant_response_dict:
             # The final content from the assistant (could be None if last action was a tool_call without a followup text response)
             return assistant_response_dict.get("content", "[Agent Info: No textual content in final assistant message. Tool actions may have occurred.]")
         else:
             return "[Agent Info: Failed to get a response from the assistant after processing.]"
 
+    def _summarize_dropped_turns(self, previous_summary, dropped_messages):
+        """Compresses turns dropped by the context budget into a rolling summary (None on failure)."""
+        transcript = []
+        for message in dropped_messages:
+            content = message.get("content")
+            if not isinstance(content, str):
+                content = json.dumps(content)
+            if message.get("tool_calls"):
+                names = ", ".join(tc.get("function", {}).get("name", "?") for tc in message["tool_calls"])
+                content = f"{content or ''} [called tools: {names}]"
+            transcript.append(f"{message.get('role')}: {(content or '')[:2000]}")
+        prompt = "Update the running summary of a conversation between a user and the Sabik terminal assistant. Keep facts, file paths, results and open tasks; be brief.\n\n"
+        if previous_summary:
+            prompt += f"Current summary:\n{previous_summary}\n\n"
+        prompt += "Turns to fold in:\n" + "\n".join(transcript)
+        try:
+            response = self.client.chat.completions.create(model=app_config.CONTEXT_SUMMARY_MODEL, messages=[{"role": "user", "content": prompt}], stream=False)
+            return response.choices[0].message.content if response.choices else None
+        except Exception as e:
+            output.message(f"Warn: Context summarization failed: {e}", "warning")
+            return None
+
+    def _fit_context(self):
+        """Applies the token budget to message_history and accumulates the savings for this turn."""
+        with tracing.span("context.fit") as span:
+            saved = self.context_budget.fit(self.message_history)
+            span.set(tokens_saved=saved)
+        self.last_turn_tokens_saved += saved
+        return saved
+
+    def _report_context_savings(self):
+        if self.last_turn_tokens_saved:
+            output.message(f"Context budget: saved ~{self.last_turn_tokens_saved} tokens this turn (history now ~{self.context_budget.total(self.message_history)} tokens).", "detail")
+
+    def resume_session(self, session_log):
+        """Continues a saved conversation: its messages become the history and new turns are appended to its log."""
+        self.message_history = [{"role": "system", "content": self.system_instructions}] + session_log.load()
+        self.context_budget.adopt_summary(self.message_history)
+        self._persisted_summary = self.context_budget.summary_message
+        self.session_log = session_log
+
+    def _persist_turn(self):
+        """Appends the messages of this turn (and any new rolling summary) to the session log and compacts it now and then."""
+        if self.session_log is None or self._turn_user_message is None:
+            return
+        history = self.message_history
+        start = next((i for i in range(len(history) - 1, -1, -1) if history[i] is self._turn_user_message), None)
+        if start is None:
+            return
+        try:
+            self.session_log.append_turn(history[start:])
+            summary = self.context_budget.summary_message
+            if summary is not None and summary is not self._persisted_summary and any(message is summary for message in history):
+                # Only whole turns are dropped, so the kept user messages are the latest turns
+                kept_turns = sum(1 for message in history if message.get("role") == "user")
+                self.session_log.append_summary(summary, self.session_log.turns - kept_turns)
+                self._persisted_summary = summary
+            if self.session_log.should_compact():
+                self.session_log.compact()
+        except OSError as e:
+            output.message(f"Warn: Could not save the session: {e}", "warning")
+
+    def process_input(self, user_input):
+        # One trace per turn: LLM calls, HTTP requests, tools and rendering are its child spans
+        with tracing.span("turn", input_chars=len(user_input or "")) as span:
+            self._start_turn(user_input)
+            self.last_turn_tokens_saved = 0
+            self._fit_context()
+
+            # For simplicity, using a fixed model. Could be made configurable.
+            model = "openai-large"
+
+            output.rule("Processing Request")
+            # Send a copy of the history to avoid modification by _chat_completion_with_tools if it were to do so
+            # (though current implementation appends to self.message_history directly)
+            messages_to_send = list(self.message_history)
+
+            assistant_response_dict = self._chat_completion_with_tools(messages_to_send, model=model)
+            self._report_context_savings()
+            self._persist_turn()
+            span.set(model=model, tools_offered=len(self.turn_tools_schemas), tools_called=list(self.last_turn_tools), tokens_saved=self.last_turn_tokens_saved, ok=assistant_response_dict is not None)
+            return self._turn_result(assistant_response_dict)
+
     def get_session(self):
         """Allows external components to access the agent's session."""
         return self.session
@@ -0,0 +1,232 @@
+# sabik_agent/async_agent.py
+"""
+Asyncio-native counterpart of AdvancedSabikAgent.
+
+Many AsyncSabikAgent instances can share one event loop and one connection pool
+(pass the same httpx.AsyncClient as `http_client`). Tools follow the usual protocol
+(`session`, `client`, `config` keyword arguments plus the tool's own arguments):
+
+- `async def` tools are awaited directly and receive the shared httpx.AsyncClient
+  as `session` and the openai.AsyncOpenAI client as `client`.
+- Plain (sync) tools are wrapped automatically: they run on the agent's bounded tool
+  pool via `loop.run_in_executor` and receive the sync `requests.Session` / `openai.OpenAI`
+  pair, exactly as with AdvancedSabikAgent.
+"""
+import asyncio
+import functools
+import inspect
+import json
+
+import openai
+
+from . import output
+from . import config as app_config
+from . import tracing
+from .agent import AdvancedSabikAgent
+from .transport import build_async_http_client
+from .tools import resolve_tool
+
+
+class AsyncSabikAgent(AdvancedSabikAgent):
+    def __init__(self, referrer=None, http_client=None):
+        super().__init__(referrer=referrer)
+        # The httpx client is the connection pool shared by the LLM client and async tools
+        self._owns_http_client = http_client is None
+        self.http_client = http_client or build_async_http_client(self.referrer)
+        self.async_client = openai.AsyncOpenAI(
+            base_url=app_config.OPENAI_BASE_URL_TEXT,
+            api_key=app_config.API_KEY,
+            default_headers={"Referer": self.referrer},
+            http_client=self.http_client,
+            max_retries=0, # Retries and backoff are handled by the shared transport
+        )
+        self._async_serial_tool_lock = asyncio.Lock()
+        self._tool_slots = asyncio.Semaphore(max(1, app_config.TOOL_MAX_WORKERS))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+    async def aclose(self):
+        """Releases the connection pool (if owned by this agent), the sync session and the tool pool."""
+        if self._owns_http_client:
+            await self.http_client.aclose()
+        if self._session is not None:
+            self._session.close()
+        if self._tool_executor is not None:
+            self._tool_executor.shutdown(wait=False)
+
+    def _tool_kwargs(self, function_to_call, function_args):
+        if inspect.iscoroutinefunction(resolve_tool(function_to_call)):
+            return dict(session=self.http_client, client=self.async_client, config=app_config, **function_args)
+        return super()._tool_kwargs(function_to_call, function_args)
+
+    async def _request_assistant_message_async(self, messages, model, follow_up=False):
+        """
+        Async version of _request_assistant_message; started tool calls are returned as asyncio tasks.
+        If the stream fails they are awaited and recorded; if the turn is cancelled they are cancelled too.
+        """
+        started_tool_tasks = {}
+        started_tool_calls = []
+        with tracing.span("llm.request", model=model, stream=app_config.STREAM_RESPONSES, messages=len(messages), tools=len(self.turn_tools_schemas)) as span:
+            request_payload = self._request_payload(messages, model)
+            self._trace_request(span, request_payload)
+            try:
+                if app_config.STREAM_RESPONSES:
+                    content_parts, tool_calls_by_index = [], {}
+                    received_choices = False
+                    usage = None
+                    stream = await self.async_client.chat.completions.create(**request_payload)
+                    try:
+                        async for chunk in stream:
+                            if getattr(chunk, "usage", None) is not None:
+                                usage = chunk.usage
+                            if not chunk.choices:
+                                continue
+                            received_choices = True
+                            for entry in self._apply_stream_delta(chunk.choices[0].delta, content_parts, tool_calls_by_index):
+                                snapshot = self._completed_tool_call(entry, started_tool_tasks)
+                                if snapshot:
+                                    started_tool_tasks[snapshot["id"]] = asyncio.ensure_future(self._execute_tool_call_async(snapshot))
+                                    started_tool_calls.append(snapshot)
+                    except asyncio.CancelledError:
+                        for task in started_tool_tasks.values():
+                            task.cancel()
+                        raise
+                    except Exception:
+                        if started_tool_calls:
+                            outcomes = await self._settle_tool_tasks(started_tool_calls, started_tool_tasks, "the response stream failed")
+                            self._record_abandoned_tool_calls(started_tool_calls, outcomes)
+                        raise
+                    response_message_dict = self._streamed_message(content_parts, tool_calls_by_index) if received_choices else None
+                else:
+                    response = await self.async_client.chat.completions.create(**request_payload)
+                    response_message_dict = response.choices[0].message.model_dump(exclude_unset=True) if response.choices else None
+                    usage = response.usage
+                self._trace_response(span, response_message_dict, usage)
+            except Exception as e:
+                span.record_error(e)
+                label = "Follow-up" if follow_up else "Initial"
+                output.panel("Error", f"{label} API call error: {e}", "error")
+                return None, None
+
+        if response_message_dict is None:
+            detail = "No response choices after tool call." if follow_up else "No response choices from API."
+            output.panel("Error", detail, "error")
+            return None, None
+        return response_message_dict, started_tool_tasks
+
+    async def _execute_tool_call_async(self, tool_call_dict):
+        """Async version of _execute_tool_call. Sync tools are run on the tool pool; never raises."""
+        failure = self._check_tool_call(tool_call_dict)
+        if failure:
+            return failure
+        function_details = tool_call_dict["function"]
+        function_to_call = self.available_functions[function_details["name"]]
+
+        async with self._tool_slots:
+            if not inspect.iscoroutinefunction(resolve_tool(function_to_call)):
+                # Sync tools keep the exact sync semantics (including the serial lock) on a worker thread
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_tool_executor(), tracing.bind(self._execute_tool_call), tool_call_dict)
+            with tracing.span("tool", tool=function_details["name"], bytes_sent=len(function_details["arguments"])) as span:
+                try:
+                    function_args = json.loads(function_details["arguments"])
+                    call = functools.partial(function_to_call, **self._tool_kwargs(function_to_call, function_args))
+                    if getattr(function_to_call, "serial_only", False):
+                        async with self._async_serial_tool_lock:
+                            function_response_obj = await call()
+                    else:
+                        function_response_obj = await call()
+                except Exception as e:
+                    span.record_error(e)
+                    return self._tool_error_outcome(tool_call_dict, e)
+                outcome = self._tool_result_outcome(tool_call_dict, function_response_obj)
+                self._trace_tool_result(span, function_response_obj, outcome[0]["content"])
+                return outcome
+
+    async def _settle_tool_tasks(self, tool_calls, started_tool_tasks, reason):
+        """Async version of _settle_tool_calls: started calls are awaited, the others get an error result."""
+        outcomes = []
+        for tool_call_dict in tool_calls:
+            task = started_tool_tasks.get(tool_call_dict.get("id"))
+            if task is None:
+                outcomes.append(self._skipped_tool_outcome(tool_call_dict, reason))
+                continue
+            try:
+                outcomes.append(await task)
+            except Exception as e: # Defensive: _execute_tool_call_async should never raise
+                outcomes.append(self._tool_error_outcome(tool_call_dict, e))
+        return outcomes
+
+    async def _handle_function_call_async(self, tool_calls_list_of_dicts, started_tool_tasks=None):
+        started_tool_tasks = started_tool_tasks or {}
+        if not tool_calls_list_of_dicts:
+            return []
+        if app_config.PARALLEL_TOOL_CALLS:
+            awaitables = [
+                started_tool_tasks.get(tool_call_dict.get("id")) or self._execute_tool_call_async(tool_call_dict)
+                for tool_call_dict in tool_calls_list_of_dicts
+            ]
+            results = await asyncio.gather(*awaitables, return_exceptions=True)
+            outcomes = [
+                self._tool_error_outcome(tool_call_dict, result) if isinstance(result, BaseException) else result
+                for tool_call_dict, result in zip(tool_calls_list_of_dicts, results)
+            ]
+        else:
+            outcomes = [await self._execute_tool_call_async(tool_call_dict) for tool_call_dict in tool_calls_list_of_dicts]
+        return self._collect_tool_outcomes(tool_calls_list_of_dicts, outcomes)
+
+    async def _chat_completion_with_tools_async(self, messages_to_send, model="openai-large"):
+        output.get_sink().llm_request(model, f"{self._tools_state()} (async)")
+        response_message_dict, started_tool_tasks = await self._request_assistant_message_async(messages_to_send, model)
+        if response_message_dict is None:
+            return None
+        self.message_history.append(response_message_dict)
+
+        loop_count = 0
+        max_loops = 5 # Max tool call iterations
+        while response_message_dict.get("tool_calls") and loop_count < max_loops:
+            loop_count += 1
+            tool_results = await self._handle_function_call_async(response_message_dict.get("tool_calls", []), started_tool_tasks)
+            for res_dict in tool_results:
+                self.message_history.append(res_dict)
+
+            await self._fit_context_async()
+            response_message_dict, started_tool_tasks = await self._request_assistant_message_async(self.message_history, model, follow_up=True)
+            if response_message_dict is None:
+                return None
+            self.message_history.append(response_message_dict)
+
+        if loop_count >= max_loops:
+            output.message("Warning: Max tool call iterations reached.", "warning")
+            if response_message_dict.get("tool_calls"):
+                tool_calls = response_message_dict["tool_calls"]
+                outcomes = await self._settle_tool_tasks(tool_calls, started_tool_tasks, "tool call iteration limit reached")
+                self.message_history.extend(self._collect_tool_outcomes(tool_calls, outcomes))
+
+        final_content = response_message_dict.get("content")
+        if final_content:
+            with tracing.span("render.markdown", chars=len(final_content)):
+                output.get_sink().assistant(final_content)
+        return response_message_dict
+
+    async def _fit_context_async(self):
+        # Summarization makes a blocking LLM call, so keep it off the event loop
+        if self.context_budget.summarizer is not None:
+            return await asyncio.get_running_loop().run_in_executor(self._get_tool_executor(), tracing.bind(self._fit_context))
+        return self._fit_context()
+
+    async def process_input(self, user_input):
+        with tracing.span("turn", input_chars=len(user_input or "")) as span:
+            self._start_turn(user_input)
+            self.last_turn_tokens_saved = 0
+            await self._fit_context_async()
+            model = "openai-large"
+            assistant_response_dict = await self._chat_completion_with_tools_async(list(self.message_history), model=model)
+            self._report_context_savings()
+            self._persist_turn()
+            span.set(model=model, tools_offered=len(self.turn_tools_schemas), tools_called=list(self.last_turn_tools), tokens_saved=self.last_turn_tokens_saved, ok=assistant_response_dict is not None)
+            return self._turn_result(assistant_response_dict)
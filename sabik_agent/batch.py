@@ -0,0 +1,176 @@
+# sabik_agent/batch.py
+"""
+Headless batch mode: runs many prompts through parallel agent sessions.
+
+Prompts are read from a file (or stdin), one per line: plain text, or JSON objects with a
+"prompt" and an optional "id". Each prompt is an independent conversation. `concurrency`
+worker threads each own one AdvancedSabikAgent (its own HTTP session and tool pool), so at
+most `concurrency` prompts are in flight at any time. Every finished prompt is appended to
+the output file as one JSON line and flushed right away:
+
+    {"id", "prompt", "status": "ok"|"error", "content", "error", "tool_calls",
+     "tokens_saved", "worker", "started_at", "queue_ms", "duration_ms"}
+
+Prompts are identified by their "id" (default: line number in the input). With resume, ids
+that already have an "ok" record in the output file are skipped, so an interrupted batch
+is continued by running the same command again; failed prompts are retried.
+"""
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from . import config as app_config
+from . import output
+
+
+def read_prompts(path):
+    """Returns [(id, prompt)] from a text/JSONL file, or stdin when path is '-'."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    prompts, seen = [], set()
+    for line_number, line in enumerate(lines, start=1):
+        text = line.strip()
+        if not text or text.startswith("#"):
+            continue
+        prompt_id = str(line_number)
+        if text.startswith("{"):
+            try:
+                item = json.loads(text)
+            except ValueError:
+                item = None
+            if isinstance(item, dict) and isinstance(item.get("prompt"), str):
+                prompt_id = str(item.get("id", prompt_id))
+                text = item["prompt"]
+        if prompt_id in seen:
+            raise ValueError(f"Duplicate prompt id '{prompt_id}' on line {line_number}.")
+        seen.add(prompt_id)
+        prompts.append((prompt_id, text))
+    return prompts
+
+
+def completed_ids(output_path):
+    """Ids with an "ok" record in an existing output file (unparseable lines are ignored)."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError: # e.g. a line cut short by an interruption
+                continue
+            if isinstance(record, dict) and record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+class _ResultWriter:
+    def __init__(self, output_path):
+        self._lock = threading.Lock()
+        directory = os.path.dirname(output_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(output_path, "a+", encoding="utf-8")
+        # Never glue a new record onto a line that was cut short by an interruption
+        if self._file.tell() > 0:
+            self._file.seek(self._file.tell() - 1)
+            if self._file.read(1) != "\n":
+                self._file.write("\n")
+
+    def write(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._file.closed: # Workers abandoned by an interruption may still finish
+                self._file.write(line)
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def _run_prompt(agent, worker, prompt_id, prompt, queued_at):
+    agent.reset_conversation() # Every prompt is an independent conversation
+    started_at = time.time()
+    started = time.perf_counter()
+    record = {"id": prompt_id, "prompt": prompt, "worker": worker}
+    try:
+        content = agent.process_input(prompt)
+        failed = isinstance(content, str) and content.startswith("[Agent Info: Failed")
+        record.update({"status": "error" if failed else "ok", "content": content, "error": content if failed else None})
+    except Exception as e:
+        record.update({"status": "error", "content": None, "error": f"{type(e).__name__}: {e}"})
+    record.update({
+        "tool_calls": agent.last_turn_tool_calls,
+        "tokens_saved": agent.last_turn_tokens_saved,
+        "started_at": round(started_at, 3),
+        "queue_ms": round((started_at - queued_at) * 1000, 1),
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    return record
+
+
+def run_batch(input_path, output_path, concurrency=None, resume=True, verbose=False, agent_factory=None):
+    """
+    Runs every prompt of input_path and appends the records to output_path.
+    Returns a summary dict (total, skipped, ok, error, interrupted).
+    """
+    from .agent import AdvancedSabikAgent
+    agent_factory = agent_factory or AdvancedSabikAgent
+    concurrency = max(1, concurrency or app_config.BATCH_CONCURRENCY)
+
+    prompts = read_prompts(input_path)
+    done = completed_ids(output_path) if resume else set()
+    pending = [(prompt_id, prompt) for prompt_id, prompt in prompts if prompt_id not in done]
+    summary = {"total": len(prompts), "skipped": len(prompts) - len(pending), "ok": 0, "error": 0, "interrupted": False}
+    if not pending:
+        return summary
+
+    # Panels from parallel sessions would interleave; progress goes to stderr instead
+    previous_sink = output.set_sink(output.get_sink() if verbose else "null")
+    work = queue.Queue()
+    queued_at = time.time()
+    for item in pending:
+        work.put(item)
+    stop = threading.Event()
+    writer = _ResultWriter(output_path)
+    counts_lock = threading.Lock()
+
+    def worker_loop(worker):
+        agent = None
+        while not stop.is_set():
+            try:
+                prompt_id, prompt = work.get_nowait()
+            except queue.Empty:
+                return
+            if agent is None:
+                agent = agent_factory()
+            record = _run_prompt(agent, worker, prompt_id, prompt, queued_at)
+            writer.write(record)
+            with counts_lock:
+                summary[record["status"]] += 1
+                finished = summary["ok"] + summary["error"]
+            sys.stderr.write(f"[{finished}/{len(pending)}] {prompt_id}: {record['status']} in {record['duration_ms']:.0f} ms\n") # One write per line: no interleaving
+            sys.stderr.flush()
+
+    threads = [threading.Thread(target=worker_loop, args=(i,), name=f"sabik-batch-{i}", daemon=True) for i in range(min(concurrency, len(pending)))]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            while thread.is_alive():
+                thread.join(0.2) # Short joins keep Ctrl+C responsive
+    except KeyboardInterrupt:
+        # In-flight prompts are abandoned; they have no record and run again on resume
+        stop.set()
+        summary["interrupted"] = True
+    finally:
+        writer.close()
+        output.set_sink(previous_sink)
+    return summary
@@ -0,0 +1,144 @@
+# sabik_agent/blobs.py
+"""
+Out-of-band storage for large tool results (TOOL_RESULT_BLOBS).
+
+A tool result whose JSON is longer than TOOL_RESULT_INLINE_CHARS is written to a local,
+content-addressed blob and the role=tool message only carries a stub: the handle, the
+result's status, its size and a preview. Blobs are line-oriented text rather than JSON, so
+line ranges follow the content: one "path: value" line per small field, and long strings
+(transcripts, page text) verbatim under a "## path" heading.
+
+    {"blob": "blob_3f2a...", "status": "success", "bytes": 48211, "lines": 960,
+     "preview": "{\"status\": \"success\", \"transcription\": \"...", "note": "..."}
+
+The model pulls the parts it needs with the read_tool_result tool (byte or line ranges),
+so request payloads stay small however large the results get. The handle comes first so
+it survives the context budget's folding of old tool results.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+
+from . import config as app_config
+from .cache import _evict_lru
+
+LONG_STRING_CHARS = 200 # Strings longer than this (or multi-line) get their own section
+HANDLE_PREFIX = "blob_"
+HANDLE_PATTERN = re.compile(r"^blob_[0-9a-f]{32}$")
+STUB_PREFIX = '{"blob": "'
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class BlobStore:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, handle):
+        if not HANDLE_PATTERN.match(handle or ""):
+            raise KeyError(f"Invalid blob handle '{handle}'.")
+        return os.path.join(self.directory, f"{handle}.txt")
+
+    def put(self, text):
+        """Stores text (once per distinct content) and returns its handle."""
+        data = text.encode("utf-8")
+        handle = HANDLE_PREFIX + hashlib.sha256(data).hexdigest()[:32]
+        path = self._path(handle)
+        if os.path.exists(path):
+            os.utime(path) # Refresh its LRU position
+            return handle
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _evict_lru(self.directory, self.max_bytes, ".txt", self._lock, keep=path)
+        return handle
+
+    def read_bytes(self, handle, start=0, end=None):
+        """(text of bytes [start, end), total bytes); a multi-byte character cut at an edge is replaced."""
+        path = self._path(handle)
+        try:
+            with open(path, "rb") as f:
+                total = os.fstat(f.fileno()).st_size
+                start = max(0, min(start, total))
+                end = total if end is None else max(start, min(end, total))
+                f.seek(start)
+                data = f.read(end - start)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown or expired blob handle '{handle}'.") from None
+        return data.decode("utf-8", errors="replace"), start, end, total
+
+    def read_lines(self, handle, start=1, end=None):
+        """(text of lines start..end, 1-based and inclusive, total lines), read without loading the whole blob."""
+        path = self._path(handle)
+        selected, total = [], 0
+        start = max(1, start)
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                for total, line in enumerate(f, start=1):
+                    if start <= total and (end is None or total <= end):
+                        selected.append(line)
+        except FileNotFoundError:
+            raise KeyError(f"Unknown or expired blob handle '{handle}'.") from None
+        end = min(end or total, total)
+        return "".join(selected), start, end, total
+
+
+def render_text(value, path="", out=None):
+    """Line-oriented text of a tool result (see the module docstring)."""
+    out = [] if out is None else out
+    if isinstance(value, dict):
+        for key, item in value.items():
+            render_text(item, f"{path}.{key}" if path else str(key), out)
+    elif isinstance(value, list) and any(isinstance(item, (dict, list)) for item in value):
+        for i, item in enumerate(value):
+            render_text(item, f"{path}[{i}]", out)
+    elif isinstance(value, str) and (len(value) > LONG_STRING_CHARS or "\n" in value):
+        out.append(f"## {path}\n{value}")
+    else:
+        out.append(f"{path}: {json.dumps(value, ensure_ascii=False)}")
+    return out
+
+
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BlobStore(app_config.BLOB_DIR, app_config.BLOB_MAX_MB * 1024 * 1024)
+    return _store
+
+
+def externalize(result, serialized):
+    """
+    The role=tool content for a result: `serialized` itself when small enough (or when
+    blobs are disabled), else a stub pointing at a blob with the full result.
+    """
+    if not app_config.TOOL_RESULT_BLOBS or len(serialized) <= app_config.TOOL_RESULT_INLINE_CHARS:
+        return serialized
+    text = "\n".join(render_text(result)) + "\n" if isinstance(result, (dict, list)) else serialized
+    try:
+        handle = get_store().put(text)
+    except OSError:
+        return serialized # Without a blob the model gets the full result, as before
+    stub = {
+        "blob": handle,
+        "status": result.get("status") if isinstance(result, dict) else None,
+        "bytes": len(text.encode("utf-8")),
+        "lines": text.count("\n") + (not text.endswith("\n")),
+        "preview": serialized[:app_config.TOOL_RESULT_PREVIEW_CHARS],
+        "note": "Large result stored out of band; only a preview is shown. Call read_tool_result with this blob handle and a line or byte range to read more.",
+    }
+    return json.dumps(stub, ensure_ascii=False)
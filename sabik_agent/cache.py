@@ -0,0 +1,208 @@
+# sabik_agent/cache.py
+"""
+Persistent, content-addressed caches stored under OUTPUT_DIR.
+
+ResultCache entries are small JSON files named by the SHA-256 of their key parts; FileCache
+entries are binary files (e.g. audio) named the same way. Each cache has its own directory
+and a total-size cap; when the cap is exceeded the least recently used entries (by file
+mtime, refreshed on every hit) are evicted. ResultCache entries also expire after a TTL.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+
+from . import config as app_config
+from . import tracing
+
+HASH_CHUNK_SIZE = 1024 * 1024
+CACHE_ROOT = os.path.join(app_config.OUTPUT_DIR, "cache")
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def file_sha256(path):
+    """Streams a file through SHA-256 without loading it into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_key(*parts):
+    """Stable cache key for a tuple of JSON-serializable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, namespace, max_bytes, ttl_seconds, root=None):
+        self.directory = os.path.join(root or CACHE_ROOT, namespace)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        """Returns the cached value or None (missing, expired or unreadable)."""
+        with tracing.span("cache.get", namespace=os.path.basename(self.directory)) as span:
+            value, outcome = self._read(key)
+            span.set(cache=outcome)
+            return value
+
+    def _read(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if self.ttl_seconds > 0 and time.time() - entry["created"] > self.ttl_seconds:
+                os.remove(path)
+                return None, "expired"
+            os.utime(path) # Refresh mtime: it is the LRU clock
+            return entry["value"], "hit"
+        except (OSError, ValueError, KeyError, TypeError):
+            return None, "miss"
+
+    def set(self, key, value):
+        os.makedirs(self.directory, exist_ok=True)
+        # Write atomically so concurrent readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"created": time.time(), "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        _evict_lru(self.directory, self.max_bytes, ".json", self._lock)
+
+
+class FileCache:
+    """Content-addressed binary files (one file per key) with size-capped LRU eviction."""
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path_for(self, key, ext):
+        return os.path.join(self.directory, f"{key}.{ext}")
+
+    def lookup(self, key, ext):
+        """Returns the cached file path (refreshing its LRU position) or None."""
+        path = self.path_for(key, ext)
+        with tracing.span("cache.lookup", namespace=os.path.basename(self.directory)) as span:
+            try:
+                os.utime(path)
+                span.set(cache="hit")
+                return path
+            except OSError:
+                span.set(cache="miss")
+                return None
+
+    def store(self, key, ext, writer):
+        """Creates the entry atomically: writer(file_path) must write the content to the given temp path."""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            writer(tmp_path)
+            os.chmod(tmp_path, 0o644)
+            path = self.path_for(key, ext)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        _evict_lru(self.directory, self.max_bytes, None, self._lock, keep=path) # Every extension counts toward the cap
+        return path
+
+
+def _evict_lru(directory, max_bytes, suffix, lock, keep=None):
+    """Removes the least recently used files ending in `suffix` (any non-temp file if None) until the directory fits max_bytes."""
+    if max_bytes <= 0:
+        return
+    with lock:
+        entries = []
+        total = 0
+        for entry in os.scandir(directory):
+            if entry.name.endswith(".tmp") or (suffix is not None and not entry.name.endswith(suffix)):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError: # Removed concurrently
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+        if total <= max_bytes:
+            return
+        for _, size, path in sorted(entries): # Oldest access first
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key: one caller does the work, the others share its result."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        """Returns (result, shared) where shared is True if another caller's in-flight result was reused."""
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+
+def get_result_cache(namespace):
+    """Shared ResultCache for a namespace, configured from RESULT_CACHE_* settings (None if disabled)."""
+    if not app_config.RESULT_CACHE_ENABLED:
+        return None
+    with _caches_lock:
+        cache = _caches.get(namespace)
+        if cache is None:
+            cache = _caches[namespace] = ResultCache(
+                namespace,
+                max_bytes=app_config.RESULT_CACHE_MAX_MB * 1024 * 1024,
+                ttl_seconds=app_config.RESULT_CACHE_TTL_SECONDS,
+            )
+        return cache
+
+
+def get_file_cache(name, max_mb):
+    """Shared FileCache stored in OUTPUT_DIR/<name>."""
+    with _caches_lock:
+        cache = _caches.get(("files", name))
+        if cache is None:
+            cache = _caches[("files", name)] = FileCache(os.path.join(app_config.OUTPUT_DIR, name), max_mb * 1024 * 1024)
+        return cache
@@ -0,0 +1,367 @@
+# sabik_agent/cassette.py
+"""
+Record/replay of outbound HTTP exchanges (CASSETTE_MODE), for deterministic offline runs.
+
+Both transports in transport.py consult the cassette: the requests adapter behind the
+agent's `session` (images, TTS, web fetches) and the httpx transports behind the OpenAI
+clients (chat completions, streamed or not).
+
+- record: every exchange goes to the network as usual and is appended to CASSETTE_FILE
+  once its body has been read (the file is started afresh on first use). Bodies are
+  recorded as the caller reads them, so streamed byte caps apply unchanged, and a body
+  closed early is recorded as far as it was read;
+- replay: nothing goes to the network. Each request is answered from the cassette, with
+  its recorded timing (CASSETTE_LATENCY=original) or at once (zero). A request without a
+  recording fails like a connection error.
+
+CASSETTE_FILE is JSON lines (gzip-compressed if the name ends in .gz). After a header line
+there is one line per exchange:
+
+    {"via": "httpx", "method": "POST", "url": "...", "body_sha256": "...", "status": 200,
+     "headers": {...}, "ttfb_ms": 412.0, "duration_ms": 1630.5, "body": "data: {...}",
+     "chunks": [[412.0, 96], [431.2, 88], ...]}
+
+"body" holds text, or "body_b64" binary data; "chunks" (streamed responses only) holds
+the arrival time and size of each piece, so SSE streams replay at their original pace.
+A request is matched by method and URL: preferably the next unused recording with the
+same body hash, else the next unused one in recording order (request bodies may contain
+timestamps or file names). Once all recordings of a URL are used they are reused from the
+start, so a recorded session can be replayed in a loop.
+"""
+import asyncio
+import atexit
+import base64
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+import httpx
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from . import config as app_config
+
+FORMAT_VERSION = 1
+# Hop-by-hop and framing headers do not describe a replayed body
+DROPPED_HEADERS = frozenset({"connection", "keep-alive", "transfer-encoding", "date"})
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+class CassetteMissError(requests.exceptions.ConnectionError):
+    """Raised by the requests adapter when replaying a request that was never recorded."""
+
+
+def _body_hash(body):
+    if not isinstance(body, (bytes, str)): # None, or a streamed body that cannot be hashed up front
+        body = b""
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _encode_body(record, data):
+    try:
+        record["body"] = data.decode("utf-8")
+    except UnicodeDecodeError:
+        record["body_b64"] = base64.b64encode(data).decode("ascii")
+
+
+def _decode_body(record):
+    if "body_b64" in record:
+        return base64.b64decode(record["body_b64"])
+    return record.get("body", "").encode("utf-8")
+
+
+def _ms_since(started):
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+class Cassette:
+    def __init__(self, path, mode, latency="original"):
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self._lock = threading.Lock()
+        self._file = None
+        self._recordings = {} # (method, url) -> [record, ...] in recording order
+        self._used = {} # (method, url) -> indices of recordings already served
+        if mode == "replay":
+            self._load()
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    # --- recording ------------------------------------------------------------------
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = _open(self.path, "w")
+                self._file.write(json.dumps({"cassette": FORMAT_VERSION, "created": time.time()}) + "\n")
+            self._file.write(line)
+            self._file.flush()
+
+    def _record(self, via, method, url, body, status, headers, started, ttfb_ms, data, chunks=None):
+        record = {
+            "via": via,
+            "method": method,
+            "url": str(url),
+            "body_sha256": _body_hash(body),
+            "status": status,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+            "ttfb_ms": ttfb_ms,
+            "duration_ms": _ms_since(started),
+        }
+        _encode_body(record, data)
+        if chunks and len(chunks) > 1:
+            record["chunks"] = chunks
+        self._append(record)
+
+    def record_requests(self, request, response, started):
+        """Wraps the raw stream of a requests response so its body is recorded as the caller reads it."""
+        ttfb_ms = round(response.elapsed.total_seconds() * 1000, 1)
+        # requests reads the body decoded by urllib3, hence no Content-Encoding (the length is set once known)
+        headers = {name: value for name, value in response.headers.items() if name.lower() not in ("content-encoding", "content-length")}
+        response.raw = _RecordingRaw(self, "requests", request.method, request.url, request.body, response.status_code, headers, started, ttfb_ms, response.raw)
+        return response
+
+    def record_httpx(self, request, response, started):
+        """Wraps an httpx response so its body is recorded as the client streams it."""
+        stream = _RecordingStream(self, "httpx", request.method, request.url, request.content, response.status_code, response.headers, started, _ms_since(started), response)
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream, extensions=response.extensions, request=request)
+
+    def record_httpx_async(self, request, response, started):
+        stream = _AsyncRecordingStream(self, "httpx", request.method, request.url, request.content, response.status_code, response.headers, started, _ms_since(started), response)
+        return httpx.Response(response.status_code, headers=response.headers, stream=stream, extensions=response.extensions, request=request)
+
+    # --- replay ---------------------------------------------------------------------
+
+    def _load(self):
+        try:
+            with _open(self.path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError: # e.g. the last line of an interrupted recording
+                        continue
+                    if "method" in record:
+                        self._recordings.setdefault((record["method"], record["url"]), []).append(record)
+        except FileNotFoundError:
+            pass # Every request will miss
+        except EOFError:
+            pass # A .gz recording that was not closed: keep the lines read so far
+
+    def match(self, method, url, body):
+        """The recording to serve for a request, or None."""
+        key = (method, str(url))
+        body_hash = _body_hash(body)
+        with self._lock:
+            recordings = self._recordings.get(key)
+            if not recordings:
+                return None
+            used = self._used.setdefault(key, set())
+            if len(used) == len(recordings):
+                used.clear() # All served: replay them again from the start
+            unused = [i for i in range(len(recordings)) if i not in used]
+            index = next((i for i in unused if recordings[i]["body_sha256"] == body_hash), unused[0])
+            used.add(index)
+            return recordings[index]
+
+    def _pieces(self, record):
+        """(delay before the piece in seconds, bytes) pairs of a recorded body."""
+        data = _decode_body(record)
+        original = self.latency == "original"
+        chunks = record.get("chunks") or [[record.get("duration_ms", 0), len(data)]]
+        pieces, offset, previous_ms = [], 0, record.get("ttfb_ms", 0)
+        for at_ms, size in chunks:
+            pieces.append((max(0.0, at_ms - previous_ms) / 1000 if original else 0.0, data[offset:offset + size]))
+            offset += size
+            previous_ms = max(previous_ms, at_ms)
+        if offset < len(data): # Sizes that do not add up (hand-edited cassette): serve the rest
+            pieces.append((0.0, data[offset:]))
+        return pieces
+
+    def _ttfb(self, record):
+        return record.get("ttfb_ms", 0) / 1000 if self.latency == "original" else 0.0
+
+    def replay_requests(self, request):
+        record = self.match(request.method, request.url, request.body)
+        if record is None:
+            raise CassetteMissError(f"No recording for {request.method} {request.url} in cassette {self.path}", request=request)
+        if self.latency == "original": # requests reads the whole body before returning
+            time.sleep(record.get("duration_ms", 0) / 1000)
+        response = requests.Response()
+        response.status_code = record["status"]
+        response.headers = CaseInsensitiveDict(record["headers"])
+        response._content = _decode_body(record)
+        response._content_consumed = True
+        response.raw = io.BytesIO(response._content)
+        response.url = request.url
+        response.request = request
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response.reason = "Replayed"
+        return response
+
+    def replay_httpx(self, request):
+        record = self.match(request.method, request.url, request.content)
+        if record is None:
+            raise httpx.ConnectError(f"No recording for {request.method} {request.url} in cassette {self.path}", request=request)
+        if self._ttfb(record):
+            time.sleep(self._ttfb(record))
+        return httpx.Response(record["status"], headers=record["headers"], stream=_ReplayStream(self._pieces(record)), request=request)
+
+    async def replay_httpx_async(self, request):
+        record = self.match(request.method, request.url, request.content)
+        if record is None:
+            raise httpx.ConnectError(f"No recording for {request.method} {request.url} in cassette {self.path}", request=request)
+        await asyncio.sleep(self._ttfb(record))
+        return httpx.Response(record["status"], headers=record["headers"], stream=_AsyncReplayStream(self._pieces(record)), request=request)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class _Recorder:
+    """Collects a response body as the client reads it and records the exchange at the end."""
+    def __init__(self, cassette, via, method, url, body, status, headers, started, ttfb_ms, source):
+        self._cassette = cassette
+        self._exchange = (via, method, url, body, status, headers)
+        self._source = source # The underlying response (httpx) or raw stream (requests)
+        self._started = started
+        self._ttfb_ms = ttfb_ms
+        self._data = bytearray()
+        self._chunks = []
+        self._done = False
+
+    def _add(self, chunk):
+        self._data += chunk
+        self._chunks.append([_ms_since(self._started), len(chunk)])
+
+    def _finish(self):
+        # Also called when the client closes a stream early: what was read is what it saw
+        if not self._done:
+            self._done = True
+            via, method, url, body, status, headers = self._exchange
+            if via == "requests":
+                headers = dict(headers, **{"Content-Length": str(len(self._data))})
+            self._cassette._record(via, method, url, body, status, headers, self._started, self._ttfb_ms, bytes(self._data), self._chunks)
+
+
+class _RecordingRaw(_Recorder):
+    """Stands in for a requests response's urllib3 raw stream; requests reads through stream() or read(), web.py through read1()."""
+    def stream(self, amt=2 ** 16, decode_content=None):
+        for chunk in self._source.stream(amt, decode_content=decode_content):
+            self._add(chunk)
+            yield chunk
+        self._finish()
+
+    def read(self, amt=None, decode_content=None, **kwargs):
+        chunk = self._source.read(amt, decode_content=decode_content, **kwargs)
+        if chunk:
+            self._add(chunk)
+        if not chunk or amt is None:
+            self._finish()
+        return chunk
+
+    def read1(self, amt=None, decode_content=None):
+        chunk = self._source.read1(amt, decode_content=decode_content)
+        if chunk:
+            self._add(chunk)
+        else:
+            self._finish()
+        return chunk
+
+    def close(self):
+        self._source.close()
+        self._finish()
+
+    def release_conn(self):
+        self._source.release_conn()
+        self._finish()
+
+    def __getattr__(self, name):
+        return getattr(self._source, name)
+
+
+class _RecordingStream(_Recorder, httpx.SyncByteStream):
+    def __iter__(self):
+        for chunk in self._source.stream:
+            self._add(chunk)
+            yield chunk
+        self._finish()
+
+    def close(self):
+        self._source.close()
+        self._finish()
+
+
+class _AsyncRecordingStream(_Recorder, httpx.AsyncByteStream):
+    async def __aiter__(self):
+        async for chunk in self._source.stream:
+            self._add(chunk)
+            yield chunk
+        self._finish()
+
+    async def aclose(self):
+        await self._source.aclose()
+        self._finish()
+
+
+class _ReplayStream(httpx.SyncByteStream):
+    def __init__(self, pieces):
+        self._pieces = pieces
+
+    def __iter__(self):
+        for delay, piece in self._pieces:
+            if delay:
+                time.sleep(delay)
+            yield piece
+
+
+class _AsyncReplayStream(httpx.AsyncByteStream):
+    def __init__(self, pieces):
+        self._pieces = pieces
+
+    async def __aiter__(self):
+        for delay, piece in self._pieces:
+            if delay:
+                await asyncio.sleep(delay)
+            yield piece
+
+
+def _close():
+    if _cassette is not None:
+        _cassette.close() # Completes a .gz file
+
+
+atexit.register(_close)
+
+
+def get_cassette():
+    """The process-wide cassette for CASSETTE_MODE, or None when it is "off"."""
+    global _cassette
+    if app_config.CASSETTE_MODE not in ("record", "replay"):
+        return None
+    if _cassette is None:
+        with _cassette_lock:
+            if _cassette is None:
+                _cassette = Cassette(app_config.CASSETTE_FILE, app_config.CASSETTE_MODE, app_config.CASSETTE_LATENCY)
+    return _cassette
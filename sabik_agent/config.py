@@ -7,5 +7,108 @@ REFERRER_ID = os.environ.get("OPENAI_REFERRER", "sabik")
 API_KEY = os.environ.get("OPENAI_API_KEY", "dummy-openai-key")
 OUTPUT_DIR = os.environ.get("OUTPUT_DIR", "agent_outputs_tool_mode")
 
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
\ No newline at end of file
+# Shared HTTP transport: connection pools, retries with jittered backoff, per-endpoint circuit breaker
+HTTP_POOL_CONNECTIONS = int(os.environ.get("HTTP_POOL_CONNECTIONS", "10"))
+HTTP_POOL_MAXSIZE = int(os.environ.get("HTTP_POOL_MAXSIZE", "16"))
+HTTP_KEEPALIVE_SECONDS = float(os.environ.get("HTTP_KEEPALIVE_SECONDS", "30"))
+HTTP_MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+HTTP_BACKOFF_BASE = float(os.environ.get("HTTP_BACKOFF_BASE", "0.5"))
+HTTP_BACKOFF_MAX = float(os.environ.get("HTTP_BACKOFF_MAX", "20"))
+HTTP_RETRY_AFTER_MAX = float(os.environ.get("HTTP_RETRY_AFTER_MAX", "60"))
+HTTP_RETRY_READ_TIMEOUT_MAX = float(os.environ.get("HTTP_RETRY_READ_TIMEOUT_MAX", "30")) # Longer read timeouts are not retried
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+
+# Headless batch mode (main.py --batch): parallel agent sessions
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "4"))
+
+# Large tool results go to a local blob store; the history keeps a preview and a handle (read_tool_result tool)
+TOOL_RESULT_BLOBS = os.environ.get("TOOL_RESULT_BLOBS", "true").lower() == "true"
+TOOL_RESULT_INLINE_CHARS = int(os.environ.get("TOOL_RESULT_INLINE_CHARS", "4000"))
+TOOL_RESULT_PREVIEW_CHARS = int(os.environ.get("TOOL_RESULT_PREVIEW_CHARS", "800"))
+BLOB_DIR = os.environ.get("BLOB_DIR", os.path.join(OUTPUT_DIR, "blobs"))
+BLOB_MAX_MB = int(os.environ.get("BLOB_MAX_MB", "256"))
+
+# Conversations are saved as append-only JSONL logs (main.py --sessions / --resume)
+SESSIONS_ENABLED = os.environ.get("SESSIONS_ENABLED", "true").lower() == "true"
+SESSION_DIR = os.environ.get("SESSION_DIR", os.path.join(OUTPUT_DIR, "sessions"))
+SESSION_FSYNC = os.environ.get("SESSION_FSYNC", "turn").lower() # turn, interval or never
+SESSION_FSYNC_INTERVAL = float(os.environ.get("SESSION_FSYNC_INTERVAL", "5"))
+SESSION_COMPACT_TURNS = int(os.environ.get("SESSION_COMPACT_TURNS", "20"))
+
+# Where agent and tool output goes: rich (panels, Markdown), plain (text lines), json (one event per line) or null (quiet)
+OUTPUT_MODE = os.environ.get("OUTPUT_MODE", "rich").lower()
+
+# Record outbound HTTP exchanges to a cassette, or replay them offline (off, record or replay)
+CASSETTE_MODE = os.environ.get("CASSETTE_MODE", "off").lower()
+CASSETTE_FILE = os.environ.get("CASSETTE_FILE", os.path.join(OUTPUT_DIR, "cassette.jsonl"))
+CASSETTE_LATENCY = os.environ.get("CASSETTE_LATENCY", "original").lower() # Replay timing: original or zero
+
+# Span tracing of LLM calls, HTTP requests, tools and rendering (JSONL trace + Prometheus text summary)
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "false").lower() == "true"
+TRACE_FILE = os.environ.get("TRACE_FILE", os.path.join(OUTPUT_DIR, "traces.jsonl"))
+TRACE_METRICS_FILE = os.environ.get("TRACE_METRICS_FILE", os.path.join(OUTPUT_DIR, "metrics.prom"))
+
+# Stream assistant text and tool-call fragments as they are generated
+STREAM_RESPONSES = os.environ.get("STREAM_RESPONSES", "true").lower() == "true"
+
+# Tool execution: independent tool calls from one assistant turn run concurrently on a bounded pool
+PARALLEL_TOOL_CALLS = os.environ.get("PARALLEL_TOOL_CALLS", "true").lower() == "true"
+TOOL_MAX_WORKERS = int(os.environ.get("TOOL_MAX_WORKERS", "4"))
+
+# Offer the LLM only the tools a turn plausibly needs (local heuristics; all tools when unsure)
+TOOL_SELECTION = os.environ.get("TOOL_SELECTION", "true").lower() == "true"
+
+# Context budget for message_history (CONTEXT_TOKEN_BUDGET=0 disables trimming)
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "24000"))
+CONTEXT_KEEP_TURNS = int(os.environ.get("CONTEXT_KEEP_TURNS", "2"))
+CONTEXT_SUMMARIZE = os.environ.get("CONTEXT_SUMMARIZE", "false").lower() == "true"
+CONTEXT_SUMMARY_MODEL = os.environ.get("CONTEXT_SUMMARY_MODEL", "openai")
+
+# Maximum size of a downloaded image (generated images and remote images for analysis)
+MAX_IMAGE_DOWNLOAD_MB = int(os.environ.get("MAX_IMAGE_DOWNLOAD_MB", "50"))
+
+# Vision upload optimization: downscale / recompress images before analysis
+VISION_OPTIMIZE = os.environ.get("VISION_OPTIMIZE", "true").lower() == "true"
+VISION_MAX_SIDE = int(os.environ.get("VISION_MAX_SIDE", "1536"))
+VISION_MAX_UPLOAD_KB = int(os.environ.get("VISION_MAX_UPLOAD_KB", "1024"))
+VISION_UPLOAD_FORMAT = os.environ.get("VISION_UPLOAD_FORMAT", "JPEG")
+VISION_UPLOAD_QUALITY = int(os.environ.get("VISION_UPLOAD_QUALITY", "85"))
+
+# Long-audio transcription: split into overlapping segments transcribed concurrently
+TRANSCRIBE_LONG_AUDIO = os.environ.get("TRANSCRIBE_LONG_AUDIO", "true").lower() == "true"
+TRANSCRIBE_SEGMENT_SECONDS = float(os.environ.get("TRANSCRIBE_SEGMENT_SECONDS", "120"))
+TRANSCRIBE_OVERLAP_SECONDS = float(os.environ.get("TRANSCRIBE_OVERLAP_SECONDS", "2"))
+TRANSCRIBE_MAX_WORKERS = int(os.environ.get("TRANSCRIBE_MAX_WORKERS", "4"))
+
+# Pipelined text-to-speech: synthesize sentence chunks concurrently and play them as they arrive
+TTS_PIPELINE = os.environ.get("TTS_PIPELINE", "true").lower() == "true"
+TTS_CHUNK_CHARS = int(os.environ.get("TTS_CHUNK_CHARS", "300"))
+TTS_MAX_WORKERS = int(os.environ.get("TTS_MAX_WORKERS", "3"))
+TTS_MERGE_OUTPUT = os.environ.get("TTS_MERGE_OUTPUT", "true").lower() == "true"
+
+# Content-addressed TTS audio cache in OUTPUT_DIR/tts_cache (size-capped LRU)
+TTS_CACHE_ENABLED = os.environ.get("TTS_CACHE_ENABLED", "true").lower() == "true"
+TTS_CACHE_MAX_MB = int(os.environ.get("TTS_CACHE_MAX_MB", "200"))
+
+# Web page fetching: streamed body cap, extracted-text cap and request timeout
+WEB_MAX_BYTES = int(os.environ.get("WEB_MAX_BYTES", str(2 * 1024 * 1024)))
+WEB_MAX_CHARS = int(os.environ.get("WEB_MAX_CHARS", "8000"))
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", "10"))
+
+# Batch URL fetching (fetch_many_urls)
+FETCH_MAX_URLS = int(os.environ.get("FETCH_MAX_URLS", "10"))
+FETCH_MAX_WORKERS = int(os.environ.get("FETCH_MAX_WORKERS", "8"))
+FETCH_PER_HOST_LIMIT = int(os.environ.get("FETCH_PER_HOST_LIMIT", "2"))
+FETCH_DEADLINE_SECONDS = float(os.environ.get("FETCH_DEADLINE_SECONDS", "20"))
+FETCH_MAX_CHARS_PER_URL = int(os.environ.get("FETCH_MAX_CHARS_PER_URL", "2000"))
+
+# Calculator batch mode: expressions per call, values per variable, compiled-expression LRU size
+CALCULATOR_MAX_EXPRESSIONS = int(os.environ.get("CALCULATOR_MAX_EXPRESSIONS", "200"))
+CALCULATOR_MAX_VALUES = int(os.environ.get("CALCULATOR_MAX_VALUES", "100000"))
+CALCULATOR_CACHE_SIZE = int(os.environ.get("CALCULATOR_CACHE_SIZE", "256"))
+
+# Persistent result cache for image analysis / transcription / web pages (under OUTPUT_DIR/cache; 0 disables a limit)
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MAX_MB = int(os.environ.get("RESULT_CACHE_MAX_MB", "64"))
+RESULT_CACHE_TTL_SECONDS = int(os.environ.get("RESULT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
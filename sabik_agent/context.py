@@ -0,0 +1,168 @@
+# sabik_agent/context.py
+"""
+Token-budgeted management of the agent's message_history.
+
+Keeps a running (cached) token estimate per message and, when the history exceeds
+the budget, shrinks it in place:
+1. the system prompt, the rolling summary and the latest `keep_turns` turns are pinned;
+2. older tool results are folded into short previews first (oldest first); blob store stubs
+   are already compact and keep their handle, so read_tool_result stays usable;
+3. if that is not enough, the oldest whole turns are dropped, optionally compressed
+   into a rolling summary message placed right after the system prompt.
+Whole turns are dropped at once so an assistant tool_calls message is never separated
+from its role=tool results.
+"""
+import json
+
+from .blobs import STUB_PREFIX
+
+CHARS_PER_TOKEN = 4 # Rough heuristic for English text / JSON; no tokenizer dependency
+MESSAGE_OVERHEAD_TOKENS = 4 # Role and framing tokens per message
+FOLD_MIN_TOKENS = 64 # Tool results smaller than this are not worth folding
+FOLD_PREVIEW_CHARS = 200
+SUMMARY_PREFIX = "Summary of the earlier conversation (older turns were compressed):\n"
+
+
+def estimate_tokens(message):
+    """Cheap token estimate for one chat message (content plus any tool_calls)."""
+    content = message.get("content")
+    if content is None:
+        chars = 0
+    elif isinstance(content, str):
+        chars = len(content)
+    else: # Multimodal content parts
+        chars = len(json.dumps(content))
+    if message.get("tool_calls"):
+        chars += len(json.dumps(message["tool_calls"]))
+    return MESSAGE_OVERHEAD_TOKENS + (chars + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+class ContextBudget:
+    def __init__(self, max_tokens, keep_turns=2, summarizer=None):
+        """
+        max_tokens: budget for the whole history (<= 0 disables enforcement).
+        keep_turns: number of most recent user turns that are never folded or dropped.
+        summarizer: optional callable(previous_summary, dropped_messages) -> str or None,
+                    used to fold dropped turns into a rolling summary.
+        """
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.summarizer = summarizer
+        # id(message) -> (message, content, tool_calls, estimate). Holding the message keeps its id from
+        # being recycled while the entry exists; content/tool_calls identity catches in-place rewrites.
+        self._estimates = {}
+        self._summary_message = None
+
+    @property
+    def summary_message(self):
+        """The current rolling summary message, or None."""
+        return self._summary_message
+
+    def adopt_summary(self, history):
+        """Pins the rolling summary of a restored history (the system message after the prompt)."""
+        for message in history[1:2]:
+            content = message.get("content")
+            if message.get("role") == "system" and isinstance(content, str) and content.startswith(SUMMARY_PREFIX):
+                self._summary_message = message
+
+    def tokens(self, message):
+        content, tool_calls = message.get("content"), message.get("tool_calls")
+        entry = self._estimates.get(id(message))
+        if entry is not None and entry[1] is content and entry[2] is tool_calls:
+            return entry[3]
+        estimate = estimate_tokens(message)
+        self._estimates[id(message)] = (message, content, tool_calls, estimate)
+        return estimate
+
+    def total(self, history):
+        return sum(self.tokens(message) for message in history)
+
+    def fit(self, history):
+        """Shrinks `history` in place to the budget. Returns the number of tokens saved."""
+        if self.max_tokens <= 0:
+            return 0
+        before = self.total(history)
+        if before > self.max_tokens:
+            total = self._fold_old_tool_results(history, before)
+            if total > self.max_tokens:
+                total = self._drop_old_turns(history, total)
+        else:
+            total = before
+
+        # Forget messages that are no longer in the history (also after it was replaced wholesale)
+        live_ids = {id(message) for message in history}
+        self._estimates = {key: entry for key, entry in self._estimates.items() if key in live_ids}
+        return before - total
+
+    def _head_length(self, history):
+        """Number of leading pinned messages (system prompt and rolling summary)."""
+        head = 0
+        if history and history[0].get("role") == "system":
+            head = 1
+        if self._summary_message is not None and len(history) > head and history[head] is self._summary_message:
+            head += 1
+        return head
+
+    def _protected_start(self, history):
+        """Index of the first message of the pinned latest turns."""
+        user_indices = [i for i, message in enumerate(history) if message.get("role") == "user"]
+        if len(user_indices) <= self.keep_turns:
+            return self._head_length(history) if not user_indices else user_indices[0]
+        return user_indices[-self.keep_turns]
+
+    def _fold_old_tool_results(self, history, total):
+        for i in range(self._head_length(history), self._protected_start(history)):
+            if total <= self.max_tokens:
+                break
+            message = history[i]
+            if message.get("role") != "tool" or str(message.get("content")).startswith(STUB_PREFIX):
+                continue
+            old_tokens = self.tokens(message)
+            if old_tokens < FOLD_MIN_TOKENS:
+                continue
+            content = message.get("content") or ""
+            message["content"] = json.dumps({
+                "folded": True,
+                "preview": content[:FOLD_PREVIEW_CHARS],
+                "note": f"Older tool result truncated to save context (~{old_tokens} tokens)."
+            })
+            new_tokens = self.tokens(message) # The new content invalidates the cached estimate
+            total -= old_tokens - new_tokens
+        return total
+
+    def _drop_old_turns(self, history, total):
+        head = self._head_length(history)
+        protected_start = self._protected_start(history)
+        cut = head
+        dropped_tokens = 0
+        # Advance turn by turn (a turn starts at a user message) until enough is freed
+        while cut < protected_start and total - dropped_tokens > self.max_tokens:
+            next_cut = cut + 1
+            while next_cut < protected_start and history[next_cut].get("role") != "user":
+                next_cut += 1
+            dropped_tokens += sum(self.tokens(message) for message in history[cut:next_cut])
+            cut = next_cut
+        if cut == head:
+            return total
+
+        dropped = history[head:cut]
+        del history[head:cut]
+        total -= dropped_tokens
+
+        if self.summarizer is not None:
+            previous_summary = None
+            if self._summary_message is not None and any(message is self._summary_message for message in history):
+                previous_summary = self._summary_message["content"][len(SUMMARY_PREFIX):]
+                total -= self.tokens(self._summary_message)
+                del history[next(i for i, message in enumerate(history) if message is self._summary_message)]
+            summary = self.summarizer(previous_summary, dropped)
+            if summary:
+                self._summary_message = {"role": "system", "content": SUMMARY_PREFIX + summary}
+                insert_at = 1 if history and history[0].get("role") == "system" else 0
+                history.insert(insert_at, self._summary_message)
+                total += self.tokens(self._summary_message)
+            elif previous_summary is not None: # Keep the old summary if the new one failed
+                insert_at = 1 if history and history[0].get("role") == "system" else 0
+                history.insert(insert_at, self._summary_message)
+                total += self.tokens(self._summary_message)
+        return total
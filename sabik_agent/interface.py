@@ -1,14 +1,32 @@
 # sabik_agent/interface.py
+import importlib
+
 from rich.console import Console
 from rich.panel import Panel
-from rich.syntax import Syntax
-from rich.markdown import Markdown
-from rich.table import Table
-from rich.live import Live
-from rich.spinner import Spinner
 from rich.text import Text
 
+# Renderables that pull in large parts of rich (markdown-it, pygments, ...) are imported on
+# first use: `interface.Markdown` works as before but costs nothing at startup.
+_LAZY_RENDERABLES = {
+    "Syntax": "rich.syntax",
+    "Markdown": "rich.markdown",
+    "Table": "rich.table",
+    "Live": "rich.live",
+    "Spinner": "rich.spinner",
+}
+
+# Panel and Text are re-exported for main.py and output.py
+__all__ = ["console", "Panel", "Text", *_LAZY_RENDERABLES]
+
+def __getattr__(name):
+    module_name = _LAZY_RENDERABLES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
 # Global console instance for consistent Rich output
 console = Console()
 
-# You could add CLI-specific helper functions here if needed later
\ No newline at end of file
+# You could add CLI-specific helper functions here if needed later
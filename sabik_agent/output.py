@@ -0,0 +1,346 @@
+# sabik_agent/output.py
+"""
+Output sinks: where the agent, utils and tools report what they are doing.
+
+Callers emit events with raw data (tool_call, message, tool_result, ...) and the active
+sink decides how, and whether, to format them:
+
+- RichSink: panels, tables, Markdown and a Live region (the interactive default);
+- PlainSink: one plain text line per event;
+- JsonSink: one JSON object per line and event, for scripts;
+- NullSink: drops everything, so quiet and headless runs pay no formatting cost.
+
+The sink is process-wide (OUTPUT_MODE, or set_sink() at runtime); the module-level
+functions forward to it, e.g. `output.message("Audio saved", target=path)`.
+"""
+import json
+import sys
+import threading
+import time
+
+from . import config as app_config
+
+LEVEL_STYLES = {"info": "blue", "success": "green", "warning": "yellow", "error": "red", "detail": "grey50"}
+STATUS_STYLES = {"success": "green", "error": "red"}
+PLAIN_RESULT_CHARS = 500
+
+
+class NullLive:
+    """Live region events: a status line, streamed assistant text and the final answer."""
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def status(self, title, text, level="info"):
+        pass
+
+    def stream(self, parts):
+        """parts: the assistant text received so far, as a list of fragments."""
+        pass
+
+    def assistant(self, content):
+        pass
+
+
+NULL_LIVE = NullLive()
+
+
+class NullSink:
+    """Base sink: every event is a no-op."""
+    def rule(self, title=None):
+        pass
+
+    def message(self, text, level="info", target=None):
+        pass
+
+    def panel(self, title, text, level="info"):
+        pass
+
+    def tool_call(self, tool, fields):
+        pass
+
+    def llm_request(self, model, tools_state):
+        pass
+
+    def tool_calls_requested(self, tool_calls):
+        pass
+
+    def tool_result(self, tool, result, serialized):
+        """`serialized` is json.dumps(result), already computed for the message history."""
+        pass
+
+    def tool_summary(self, rows):
+        """rows: (tool_call_id, tool name, arguments string, status) per call."""
+        pass
+
+    def assistant(self, content):
+        pass
+
+    def live(self):
+        return NULL_LIVE
+
+
+class RichSink(NullSink):
+    def __init__(self, console=None):
+        from .interface import console as default_console
+        self.console = console or default_console
+
+    @staticmethod
+    def _escape(text):
+        from rich.markup import escape
+        return escape(str(text))
+
+    def _target(self, target):
+        target = str(target)
+        if target.startswith(("http://", "https://")) and not any(c in target for c in "[]"): # Brackets would end the link tag
+            return f"[link={target}]{self._escape(target)}[/link]"
+        return f"[bright_blue u]{self._escape(target)}[/bright_blue u]"
+
+    def rule(self, title=None):
+        if title:
+            self.console.rule(f"[bold blue]{self._escape(title)}[/]")
+        else:
+            self.console.rule(style="dim grey50")
+
+    def message(self, text, level="info", target=None):
+        line = self._escape(text)
+        if level != "info":
+            line = f"[{LEVEL_STYLES.get(level, 'white')}]{line}[/]"
+        if target is not None:
+            line = f"{line}: {self._target(target)}"
+        self.console.print(line)
+
+    def panel(self, title, text, level="info"):
+        from .interface import Panel
+        style = LEVEL_STYLES.get(level, "blue")
+        self.console.print(Panel(self._escape(text), title=f"[bold {style}]{self._escape(title)}[/]", border_style=style, expand=False))
+
+    def tool_call(self, tool, fields):
+        from .interface import Panel
+        lines = [f"Tool: {self._escape(tool)}"]
+        for name, value in fields.items():
+            if isinstance(value, (list, tuple)):
+                lines.append(f"{self._escape(name)}:" + "".join(f"\n  {self._target(item) if str(item).startswith(('http://', 'https://')) else self._escape(item)}" for item in value))
+            else:
+                lines.append(f"{self._escape(name)}: {self._escape(value)}")
+        self.console.print(Panel("\n".join(lines), title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
+
+    def llm_request(self, model, tools_state):
+        from .interface import Panel
+        self.console.print(Panel(f"Model: {self._escape(model)}, Tools: {self._escape(tools_state)}", title="[bold blue]Sending to LLM[/]", border_style="blue", expand=False))
+
+    def tool_calls_requested(self, tool_calls):
+        from .interface import Panel
+        lines = []
+        for tool_call in tool_calls:
+            function = tool_call.get("function", {})
+            lines.append(f"  ID: {tool_call.get('id')}, Func: {function.get('name')}, Args: {function.get('arguments')}")
+        self.console.print(Panel(self._escape("\n".join(lines)), title="[bold bright_yellow]Tool Call Details[/]", border_style="bright_yellow"))
+
+    def tool_result(self, tool, result, serialized):
+        from . import interface
+        if isinstance(result, dict):
+            body = interface.Syntax(json.dumps(result, indent=2), "json", theme="default", word_wrap=True)
+            self.console.print(interface.Panel(body, title=f"Result: [cyan]{self._escape(tool)}[/]", border_style="green", expand=False))
+        else:
+            self.console.print(f"[yellow]Warning:[/yellow] Tool {self._escape(tool)} returned a non-dictionary type: {self._escape(serialized)}")
+
+    def tool_summary(self, rows):
+        from . import interface
+        table = interface.Table(title="[bold yellow]Executing Tools[/]", show_lines=True, expand=False)
+        table.add_column("Tool ID", style="dim", overflow="fold")
+        table.add_column("Function", style="cyan", overflow="fold")
+        table.add_column("Arguments", style="magenta", overflow="fold", max_width=50)
+        table.add_column("Status", style="green", overflow="fold")
+        for tool_call_id, name, arguments, status in rows:
+            style = STATUS_STYLES.get(status, "yellow")
+            table.add_row(self._escape(tool_call_id), self._escape(name), self._escape(arguments), f"[{style}]{self._escape(str(status).capitalize())}[/{style}]")
+        self.console.print(table)
+
+    def assistant(self, content):
+        from . import interface
+        self.console.print(interface.Panel(interface.Markdown(content), title="[bold bright_magenta]Assistant[/]", border_style="bright_magenta", title_align="left"))
+
+    def live(self):
+        return RichLive(self.console)
+
+
+class RichLive(NullLive):
+    """The Live region of one LLM exchange: spinner, then status panels or streamed text."""
+    def __init__(self, console):
+        from . import interface
+        self._interface = interface
+        spinner = interface.Spinner("dots", text=interface.Text("Assistant is thinking...", style="grey50 italic"))
+        self._live = interface.Live(interface.Panel(spinner, border_style="dim grey50", expand=False), console=console, refresh_per_second=10, vertical_overflow="visible")
+        self._last_stream_render = 0.0
+
+    def __enter__(self):
+        self._live.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._live.__exit__(exc_type, exc, tb)
+
+    def status(self, title, text, level="info"):
+        from rich.markup import escape
+        style = {"info": "blue", "tool": "magenta", "warning": "orange3"}.get(level, LEVEL_STYLES.get(level, "blue"))
+        self._live.update(self._interface.Panel(escape(text), title=f"[bold {style}]{escape(title)}[/]", border_style=style))
+
+    def stream(self, parts):
+        now = time.monotonic()
+        if now - self._last_stream_render >= 0.1: # Throttle re-renders to the Live refresh rate
+            self._last_stream_render = now
+            self._live.update(self._interface.Panel(self._interface.Text("".join(parts)), title="[bold bright_magenta]Assistant[/]", border_style="bright_magenta", title_align="left"))
+
+    def assistant(self, content):
+        interface = self._interface
+        if content:
+            body = interface.Markdown(content)
+        else: # If the last message was a tool call, there might be no text content
+            body = "[No direct text content in final assistant response. Review tool outputs and logs.]"
+        self._live.update(interface.Panel(body, title="[bold bright_magenta]Assistant[/]", border_style="bright_magenta", title_align="left"), refresh=True)
+
+
+class _LineSink(NullSink):
+    """Shared plumbing of the line-oriented sinks: whole lines, written under a lock."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def _write(self, line):
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+class PlainLive(NullLive):
+    def __init__(self, sink):
+        self._sink = sink
+
+    def status(self, title, text, level="info"):
+        self._sink.panel(title, text, level)
+
+    def assistant(self, content):
+        self._sink.assistant(content or "")
+
+
+class PlainSink(_LineSink):
+    def rule(self, title=None):
+        self._write(f"== {title} ==" if title else "--")
+
+    def message(self, text, level="info", target=None):
+        prefix = f"{level.upper()}: " if level in ("warning", "error") else ""
+        self._write(f"{prefix}{text}" + (f": {target}" if target is not None else ""))
+
+    def panel(self, title, text, level="info"):
+        prefix = f"{level.upper()}: " if level in ("warning", "error") else ""
+        self._write(f"[{title}] {prefix}" + str(text).replace("\n", " | "))
+
+    def tool_call(self, tool, fields):
+        details = "; ".join(f"{name}={', '.join(map(str, value)) if isinstance(value, (list, tuple)) else value}" for name, value in fields.items())
+        self._write(f"[tool] {tool}: {details}")
+
+    def llm_request(self, model, tools_state):
+        self._write(f"[llm] model={model}, tools={tools_state}")
+
+    def tool_calls_requested(self, tool_calls):
+        for tool_call in tool_calls:
+            function = tool_call.get("function", {})
+            self._write(f"[tool call] {tool_call.get('id')} {function.get('name')} {function.get('arguments')}")
+
+    def tool_result(self, tool, result, serialized):
+        text = serialized if len(serialized) <= PLAIN_RESULT_CHARS else serialized[:PLAIN_RESULT_CHARS] + f"... ({len(serialized)} chars)"
+        self._write(f"[result] {tool}: {text}")
+
+    def tool_summary(self, rows):
+        for tool_call_id, name, _, status in rows:
+            self._write(f"[done] {name} ({tool_call_id}): {status}")
+
+    def assistant(self, content):
+        self._write(f"Assistant: {content}")
+
+    def live(self):
+        return PlainLive(self)
+
+
+class JsonSink(_LineSink):
+    def _event(self, event, fields):
+        self._write(json.dumps(dict({"event": event, "time": round(time.time(), 3)}, **fields), ensure_ascii=False, default=str))
+
+    def rule(self, title=None):
+        self._event("rule", {"title": title})
+
+    def message(self, text, level="info", target=None):
+        self._event("message", {"level": level, "text": text, "target": target})
+
+    def panel(self, title, text, level="info"):
+        self._event("panel", {"level": level, "title": title, "text": text})
+
+    def tool_call(self, tool, fields):
+        self._event("tool_call", {"tool": tool, "fields": fields})
+
+    def llm_request(self, model, tools_state):
+        self._event("llm_request", {"model": model, "tools": tools_state})
+
+    def tool_calls_requested(self, tool_calls):
+        self._event("tool_calls_requested", {"tool_calls": tool_calls})
+
+    def tool_result(self, tool, result, serialized):
+        # Splice the already serialized result in rather than encoding it a second time
+        head = json.dumps({"event": "tool_result", "time": round(time.time(), 3), "tool": tool}, ensure_ascii=False)
+        result_json = serialized if isinstance(result, dict) else json.dumps(serialized)
+        self._write(f'{head[:-1]}, "result": {result_json}}}')
+
+    def tool_summary(self, rows):
+        self._event("tool_summary", {"calls": [{"id": i, "tool": n, "arguments": a, "status": s} for i, n, a, s in rows]})
+
+    def assistant(self, content):
+        self._event("assistant", {"content": content})
+
+    def live(self):
+        return PlainLive(self)
+
+
+SINKS = {"rich": RichSink, "plain": PlainSink, "json": JsonSink, "null": NullSink}
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+def make_sink(mode):
+    sink_class = SINKS.get(mode)
+    if sink_class is None:
+        raise ValueError(f"Unknown output mode '{mode}'; expected one of: {', '.join(SINKS)}")
+    return sink_class()
+
+
+def get_sink():
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                _sink = make_sink(app_config.OUTPUT_MODE)
+    return _sink
+
+
+def set_sink(sink):
+    """Installs a sink (or a mode name) and returns the previous one."""
+    global _sink
+    with _sink_lock:
+        previous, _sink = _sink, make_sink(sink) if isinstance(sink, str) else sink
+    return previous
+
+
+def rule(title=None):
+    get_sink().rule(title)
+
+def message(text, level="info", target=None):
+    get_sink().message(text, level, target)
+
+def panel(title, text, level="info"):
+    get_sink().panel(title, text, level)
+
+def tool_call(tool, fields):
+    get_sink().tool_call(tool, fields)
@@ -0,0 +1,301 @@
+# sabik_agent/sessions.py
+"""
+Append-only persistence of conversations (SESSIONS_ENABLED).
+
+Each session is one JSONL file under SESSION_DIR. The first line is a header, every other
+line one chat message of message_history (the system prompt is not stored):
+
+    {"type": "session", "id", "created", "version"}
+    {"type": "message", "turn": 3, "message": {"role": "user", "content": "..."}}
+    {"type": "summary", "through_turn": 2, "message": {"role": "system", "content": "Summary of ..."}}
+
+After every turn only the messages of that turn are appended, and the file is fsynced
+according to SESSION_FSYNC: "turn" (after every turn), "interval" (at most once per
+SESSION_FSYNC_INTERVAL seconds, and on close) or "never" (left to the OS).
+A line cut short by a crash is ignored on load and cut off before the next append.
+
+Messages are never rewritten or removed: the context budget folds and drops old messages
+in memory only, and the log keeps every turn with its full tool results. When the budget
+compresses dropped turns into a rolling summary, the summary is appended as a "summary"
+record naming the last turn it covers. Resuming builds the trimmed view from the log: the
+latest summary plus the turns after it (the budget trims further on the next turn).
+Every SESSION_COMPACT_TURNS turns, a log holding superseded summaries is rewritten
+atomically without them; messages and the latest summary are kept.
+
+index.json keeps one small entry per session (title, turns, message count, timestamps), so
+listing sessions never opens the logs.
+"""
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+from . import config as app_config
+
+FORMAT_VERSION = 1
+INDEX_NAME = "index.json"
+TITLE_CHARS = 60
+FSYNC_POLICIES = ("turn", "interval", "never")
+
+
+def _write_atomic(path, text, fsync=False):
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _header_line(entry, **extra):
+    return json.dumps(dict({"type": "session", "id": entry["id"], "created": entry["created"], "version": FORMAT_VERSION}, **extra)) + "\n"
+
+
+def _message_line(message, turn):
+    return json.dumps({"type": "message", "turn": turn, "message": message}, ensure_ascii=False) + "\n"
+
+
+def _summary_line(message, through_turn):
+    return json.dumps({"type": "summary", "through_turn": through_turn, "message": message}, ensure_ascii=False) + "\n"
+
+
+class SessionStore:
+    """A directory of session logs plus their index."""
+    def __init__(self, directory=None):
+        self.directory = directory or app_config.SESSION_DIR
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def path_for(self, session_id):
+        return os.path.join(self.directory, f"{session_id}.jsonl")
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if isinstance(index, dict):
+                return index
+        except (OSError, ValueError):
+            pass
+        return self._rebuild_index() if os.path.isdir(self.directory) else {}
+
+    def _rebuild_index(self):
+        """Recreates a lost or corrupt index by reading the logs once."""
+        index = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".jsonl"):
+                try:
+                    entry = _scan_log(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                if entry:
+                    index[entry["id"]] = entry
+        return index
+
+    def update_index(self, entry):
+        with self._lock:
+            index = self._read_index()
+            index[entry["id"]] = entry
+            _write_atomic(self.index_path, json.dumps(index, ensure_ascii=False, indent=1))
+
+    def list(self):
+        """Index entries, most recently updated first."""
+        return sorted(self._read_index().values(), key=lambda entry: entry.get("updated", 0), reverse=True)
+
+    def resolve(self, session_id):
+        """Full id for an id, a unique id prefix or "last"; raises KeyError otherwise."""
+        entries = self.list()
+        if session_id in (None, "", "last"):
+            if not entries:
+                raise KeyError("No saved sessions.")
+            return entries[0]["id"]
+        matches = [entry["id"] for entry in entries if entry["id"].startswith(session_id)]
+        if session_id in matches:
+            return session_id
+        if len(matches) != 1:
+            raise KeyError(f"No session matches '{session_id}'." if not matches else f"Session id '{session_id}' is ambiguous: {', '.join(matches[:5])}")
+        return matches[0]
+
+    def create(self):
+        """A new session; its file and index entry are written with the first turn."""
+        session_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+        now = time.time()
+        return SessionLog(self, {"id": session_id, "title": "", "created": now, "updated": now, "turns": 0, "messages": 0})
+
+    def open(self, session_id):
+        """The SessionLog of an existing session (see resolve() for accepted ids)."""
+        session_id = self.resolve(session_id)
+        entry = self._read_index().get(session_id) or _scan_log(self.path_for(session_id))
+        return SessionLog(self, dict(entry))
+
+
+def _read_records(path):
+    """Parsed lines of a log and the byte length of its intact part."""
+    records, intact = [], 0
+    with open(path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"): # Torn last line of an interrupted append
+                break
+            try:
+                records.append(json.loads(raw))
+            except ValueError:
+                break
+            intact += len(raw)
+    return records, intact
+
+
+def _scan_log(path):
+    records, _ = _read_records(path)
+    if not records or records[0].get("type") != "session":
+        return None
+    header = records[0]
+    messages = [record for record in records[1:] if record.get("type") == "message"]
+    users = [record["message"] for record in messages if record["message"].get("role") == "user"]
+    return {
+        "id": header["id"],
+        "title": _title(users[0]) if users else "",
+        "created": header.get("created", 0),
+        "updated": os.path.getmtime(path),
+        "turns": max((record.get("turn", 0) for record in messages), default=0),
+        "messages": len(messages),
+    }
+
+
+def _title(message):
+    content = message.get("content")
+    text = content if isinstance(content, str) else json.dumps(content)
+    text = " ".join(text.split())
+    return text if len(text) <= TITLE_CHARS else text[:TITLE_CHARS - 3] + "..."
+
+
+class SessionLog:
+    """One session file, opened for appending on the first write."""
+    def __init__(self, store, entry):
+        self.store = store
+        self.entry = entry
+        self.path = store.path_for(entry["id"])
+        self.fsync_policy = app_config.SESSION_FSYNC if app_config.SESSION_FSYNC in FSYNC_POLICIES else "turn"
+        self._file = None
+        self._intact = None # Byte length of the parsed part of the file, known after load()
+        self._last_fsync = time.monotonic()
+        self._turns_since_compaction = 0
+        self._summaries = 0 # Summary records in the log; all but the last are superseded
+        self._lock = threading.Lock()
+
+    @property
+    def id(self):
+        return self.entry["id"]
+
+    @property
+    def turns(self):
+        return self.entry["turns"]
+
+    def load(self):
+        """
+        The messages to resume with, in order: the latest rolling summary (if any) followed by the
+        turns it does not cover. Torn or unparseable trailing lines are skipped.
+        """
+        records, self._intact = _read_records(self.path)
+        messages = [record for record in records[1:] if record.get("type") == "message"]
+        summaries = [record for record in records[1:] if record.get("type") == "summary"]
+        self.entry["messages"] = len(messages)
+        self._summaries = len(summaries)
+        if not summaries:
+            return [record["message"] for record in messages]
+        latest = summaries[-1]
+        return [latest["message"]] + [record["message"] for record in messages if record.get("turn", 0) > latest["through_turn"]]
+
+    def _open(self):
+        if self._file is None:
+            if not os.path.exists(self.path):
+                os.makedirs(self.store.directory, exist_ok=True)
+                with open(self.path, "x", encoding="utf-8") as f:
+                    f.write(_header_line(self.entry))
+                self._intact = None
+            intact = self._intact if self._intact is not None else _read_records(self.path)[1]
+            self._file = open(self.path, "r+b")
+            self._file.truncate(intact) # Drop a torn last line before appending after it
+            self._file.seek(intact)
+            self._intact = None # Stale once we append; a reopen re-reads the file
+        return self._file
+
+    def _sync(self, force=False):
+        now = time.monotonic()
+        if force or self.fsync_policy == "turn" or (self.fsync_policy == "interval" and now - self._last_fsync >= app_config.SESSION_FSYNC_INTERVAL):
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def append_turn(self, messages):
+        """Appends the messages of one finished turn with a single write."""
+        if not messages:
+            return
+        with self._lock:
+            self.entry["turns"] += 1
+            data = "".join(_message_line(message, self.entry["turns"]) for message in messages).encode("utf-8")
+            f = self._open()
+            f.write(data)
+            f.flush()
+            if self.fsync_policy != "never":
+                self._sync()
+            if not self.entry["title"]:
+                first_user = next((message for message in messages if message.get("role") == "user"), None)
+                if first_user is not None:
+                    self.entry["title"] = _title(first_user)
+            self.entry["messages"] += len(messages)
+            self.entry["updated"] = time.time()
+            self._turns_since_compaction += 1
+        self.store.update_index(dict(self.entry))
+
+    def append_summary(self, message, through_turn):
+        """Records a rolling summary that replaces turns 1..through_turn when the session is resumed."""
+        with self._lock:
+            f = self._open()
+            f.write(_summary_line(message, through_turn).encode("utf-8"))
+            f.flush()
+            if self.fsync_policy != "never":
+                self._sync()
+            self._summaries += 1
+
+    def should_compact(self):
+        """True every SESSION_COMPACT_TURNS turns if the log holds superseded summaries."""
+        every = app_config.SESSION_COMPACT_TURNS
+        return every > 0 and self._turns_since_compaction >= every and self._summaries > 1
+
+    def compact(self):
+        """Atomically rewrites the log without superseded summaries (and any torn line); messages are kept."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            records, _ = _read_records(self.path)
+            if not records or records[0].get("type") != "session":
+                return
+            summaries = [i for i, record in enumerate(records) if record.get("type") == "summary"]
+            superseded = set(summaries[:-1])
+            lines = [_header_line(self.entry, compacted=time.time())]
+            lines.extend(json.dumps(record, ensure_ascii=False) + "\n" for i, record in enumerate(records[1:], 1) if i not in superseded)
+            self._intact = None
+            _write_atomic(self.path, "".join(lines), fsync=self.fsync_policy != "never")
+            self._summaries = len(summaries) - len(superseded)
+            self._turns_since_compaction = 0
+        self.store.update_index(dict(self.entry))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                if self.fsync_policy == "interval":
+                    self._sync(force=True)
+                self._file.close()
+                self._file = None
@@ -0,0 +1,99 @@
+"""
+Per-turn selection of the tool schemas sent to the LLM.
+
+Cheap local heuristics pick the tools a user message plausibly needs: trigger regexes,
+file extensions and web URLs declared on each ToolSpec. A follow-up that matches nothing
+(such as "now make it wider") gets the tools used in the previous turn; otherwise, when
+nothing matches, the selector is unsure and offers every tool. Short small talk and local
+files no tool consumes (e.g. notes.txt) get no tools at all.
+Schema lists are built and JSON-encoded once per distinct subset and reused for every request.
+"""
+import json
+import os
+import re
+from urllib.parse import urlsplit
+
+URL_PATTERN = re.compile(r"https?://[^\s<>\"'()\[\]]+", re.I)
+FILE_EXTENSION_PATTERN = re.compile(r"[\w~/\\.-]+\.([A-Za-z][A-Za-z0-9]{1,4})\b") # Not "2.50"
+SMALL_TALK_PATTERN = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|thx|ok|okay|bye|goodbye|good (morning|afternoon|evening|night))\b[\s!.,:)]*$", re.I)
+# Local text/code/document files: no tool reads them, so naming one is no reason to offer every tool
+UNHANDLED_FILE_EXTENSIONS = frozenset((
+    "txt", "md", "rst", "log", "csv", "tsv", "json", "jsonl", "yaml", "yml", "toml", "ini", "cfg", "conf", "env",
+    "py", "js", "ts", "java", "c", "h", "cpp", "go", "rs", "rb", "sh", "sql", "xml", "pdf", "doc", "docx",
+))
+
+
+class ToolSchemas(list):
+    """A cached schema subset; `json` is its JSON encoding, computed once."""
+    def __init__(self, schemas):
+        super().__init__(schemas)
+        self.json = json.dumps(self)
+
+
+class ToolSelector:
+    def __init__(self, specs):
+        self._specs = list(specs)
+        self.all_names = tuple(spec.name for spec in self._specs)
+        # The fallback when unsure leaves out tools that are only useful once offered explicitly (read_tool_result)
+        self.fallback_names = tuple(spec.name for spec in self._specs if not spec.on_demand)
+        self._triggers = {
+            spec.name: [re.compile(pattern, re.I) for pattern in spec.triggers]
+            for spec in self._specs
+        }
+        self._tools_by_extension = {}
+        for spec in self._specs:
+            for ext in spec.extensions:
+                self._tools_by_extension.setdefault(ext.lower(), []).append(spec.name)
+        self._url_tools = [spec.name for spec in self._specs if spec.handles_urls]
+        # The schema list (and its schemas) the cache was built from; a different list or a replaced schema resets it
+        self._schema_source = (None, ())
+        self._schema_lists = {} # frozenset of names -> ToolSchemas, in registry order
+
+    def select(self, user_input, previous_tools=()):
+        """Returns the names of the tools to offer this turn (the fallback set when unsure)."""
+        text = user_input or ""
+        if SMALL_TALK_PATTERN.match(text):
+            return ()
+
+        chosen = set()
+        urls = URL_PATTERN.findall(text)
+        for url in urls:
+            ext = os.path.splitext(urlsplit(url).path)[1][1:].lower()
+            chosen.update(self._tools_by_extension.get(ext) or self._url_tools)
+        text_without_urls = URL_PATTERN.sub(" ", text)
+        unhandled_file = False
+        for ext in FILE_EXTENSION_PATTERN.findall(text_without_urls):
+            ext = ext.lower()
+            chosen.update(self._tools_by_extension.get(ext, ()))
+            unhandled_file = unhandled_file or ext in UNHANDLED_FILE_EXTENSIONS
+        for name, patterns in self._triggers.items():
+            if name not in chosen and any(pattern.search(text) for pattern in patterns):
+                chosen.add(name)
+
+        if not chosen:
+            if unhandled_file:
+                return ()
+            previous = [name for name in previous_tools if name in self._triggers]
+            if not previous:
+                return self.fallback_names
+            chosen.update(previous) # A follow-up to the previous turn, e.g. "now make it wider"
+        return tuple(name for name in self.all_names if name in chosen)
+
+    def schemas(self, names, all_schemas):
+        """
+        The (cached) schema list for a subset of tool names. Schemas of tools the selector
+        does not know about (added to the agent at runtime) are always included. Schemas are
+        treated as read-only: replace one (or the whole list) to change it.
+        """
+        source_list, source_schemas = self._schema_source
+        if all_schemas is not source_list or len(all_schemas) != len(source_schemas) or any(a is not b for a, b in zip(all_schemas, source_schemas)):
+            self._schema_source = (all_schemas, tuple(all_schemas))
+            self._schema_lists = {}
+        key = frozenset(names)
+        schema_list = self._schema_lists.get(key)
+        if schema_list is None:
+            schema_list = self._schema_lists[key] = ToolSchemas(
+                schema for schema in all_schemas
+                if schema["function"]["name"] in key or schema["function"]["name"] not in self._triggers
+            )
+        return schema_list
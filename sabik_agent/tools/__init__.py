@@ -1,12 +1,45 @@
 # sabik_agent/tools/__init__.py
 # This package re-exports all top-level tools for backward compatibility.
+# Tool modules are imported lazily: `from sabik_agent.tools import calculator` (or attribute
+# access) loads only that tool's module, and the agent holds LazyTool stand-ins until first call.
+import copy
+import importlib
+
+from .registry import TOOL_SPECS, LazyTool
+
+TOOL_NAMES = [spec.name for spec in TOOL_SPECS]
+__all__ = list(TOOL_NAMES)
+
+
+def load_tool(name):
+    """Imports the tool's module and returns its function."""
+    if name not in TOOL_NAMES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{name}", __name__)
+    function = getattr(module, name)
+    # Importing the submodule bound its name to the module; rebind it to the function as before
+    globals()[name] = function
+    return function
+
+
+def __getattr__(name):
+    return load_tool(name)
+
+
+def tool_schemas():
+    """Fresh copies of all tool schemas (callers may modify them)."""
+    return [copy.deepcopy(spec.schema) for spec in TOOL_SPECS]
+
+
+def lazy_functions():
+    """Maps each tool name to a LazyTool that imports the tool on first call."""
+    return {spec.name: LazyTool(spec, load_tool) for spec in TOOL_SPECS}
+
+
+def resolve_tool(function):
+    """The real tool function behind a LazyTool (loading it if needed)."""
+    return function.load() if isinstance(function, LazyTool) else function
 
-from .generate_ai_image import generate_ai_image
-from .analyze_image_content import analyze_image_content
-from .transcribe_audio_file import transcribe_audio_file
-from .generate_speech_audio import generate_speech_audio
-from .simple_web_search import simple_web_search
-from .calculator import calculator
 
 # Each tool implementation is in its own file, e.g.:
 # from sabik_agent.tools.generate_ai_image import generate_ai_image
@@ -1,26 +1,58 @@
+import os
+
 from .. import utils
-from ..interface import console, Panel
+from ..cache import get_result_cache, file_sha256, make_key
+from .. import output
+
+VISION_MODEL = "openai-large"
 
 def _api_call_llm_for_vision_or_stt(client, messages, model):
     payload = {"model": model, "messages": messages, "stream": False}
     try:
-        console.print(Panel(f"Model: {model}", title=f"[bold blue]Internal API Call: {model}[/]", border_style="blue", expand=False, width=80))
+        output.panel(f"Internal API Call: {model}", f"Model: {model}")
         response = client.chat.completions.create(**payload)
         if not response.choices:
-            console.print("[red]Error: No choices from API.[/red]")
+            output.message("Error: No choices from API.", "error")
             return None
         content = response.choices[0].message.content
-        console.print(Panel(f"{content[:150]}...", title="[bold green]Internal Result[/]", border_style="green", expand=False, width=80))
+        output.panel("Internal Result", f"{content[:150]}...", "success")
         return content
     except Exception as e:
-        console.print(Panel(f"Error: {e}", title=f"[bold red]{model} API Error[/]", border_style="red"))
+        output.panel(f"{model} API Error", f"Error: {e}", "error")
         return None
 
+def _analysis_cache_key(image_path, analysis_prompt, model, config):
+    # Keyed by content (remote images are downloaded first), so a changed image is never answered from the cache
+    upload_settings = (config.VISION_MAX_SIDE, config.VISION_MAX_UPLOAD_KB, config.VISION_UPLOAD_FORMAT, config.VISION_UPLOAD_QUALITY) if config.VISION_OPTIMIZE else None
+    return make_key("analyze_image_content", f"sha256:{file_sha256(image_path)}", analysis_prompt, model, upload_settings)
+
 def analyze_image_content(image_url_or_path, analysis_prompt="Describe the image in detail.", *, session, client, config, **kwargs):
-    console.print(Panel(f"Tool: Analyze Image\nSource: {image_url_or_path}\nPrompt: '{analysis_prompt}'", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
-    base64_image_data = utils.encode_image_base64(image_url_or_path)
-    if not base64_image_data:
+    output.tool_call("Analyze Image", {"Source": image_url_or_path, "Prompt": analysis_prompt})
+    if not image_url_or_path.startswith(('http://', 'https://')):
+        return _analyze_image_file(image_url_or_path, None, image_url_or_path, analysis_prompt, session, client, config)
+    try:
+        temp_path, content_type = utils.download_image(image_url_or_path, session)
+    except Exception as e:
+        output.panel("Image Encode Error", str(e), "error")
         return {"status": "error", "message": f"Could not load or encode image: {image_url_or_path}"}
+    try:
+        return _analyze_image_file(temp_path, content_type, image_url_or_path, analysis_prompt, session, client, config)
+    finally:
+        os.remove(temp_path)
+
+def _analyze_image_file(image_path, content_type, source, analysis_prompt, session, client, config):
+    cache = get_result_cache("vision")
+    cache_key = _analysis_cache_key(image_path, analysis_prompt, VISION_MODEL, config) if cache and os.path.isfile(image_path) else None
+    if cache_key:
+        cached_analysis = cache.get(cache_key)
+        if cached_analysis is not None:
+            output.message(f"Cache hit for image analysis of {source}", "detail")
+            return {"status": "success", "analysis": cached_analysis, "cache": "hit"}
+
+    upload_stats = {} if config.VISION_OPTIMIZE else None
+    base64_image_data = utils.encode_image_base64(image_path, session=session, upload_stats=upload_stats, content_type=content_type)
+    if not base64_image_data:
+        return {"status": "error", "message": f"Could not load or encode image: {source}"}
 
     messages = [
         {"role": "system", "content": "You are an AI vision expert."},
@@ -29,8 +61,13 @@ def analyze_image_content(image_url_or_path, analysis_prompt="Describe the image
             {"type": "image_url", "image_url": {"url": base64_image_data}}
         ]}
     ]
-    analysis = _api_call_llm_for_vision_or_stt(client, messages, model="openai-large")
+    analysis = _api_call_llm_for_vision_or_stt(client, messages, model=VISION_MODEL)
     if analysis:
-        return {"status": "success", "analysis": analysis}
+        if cache_key:
+            cache.set(cache_key, analysis)
+        result = {"status": "success", "analysis": analysis, "cache": "miss" if cache_key else "disabled"}
+        if upload_stats:
+            result["upload"] = upload_stats
+        return result
     else:
         return {"status": "error", "message": "Image analysis failed using the vision model."}
@@ -1,16 +1,175 @@
-from ..interface import console, Panel
+import functools
+import math
+import re
+import threading
+
 import numexpr as ne
+import numpy as np
+
+from .. import output
+from ..config import CALCULATOR_CACHE_SIZE
+
+ALLOWED_CHARS = "0123456789+-*/(). "
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_]\w*")
+CALL_PATTERN = re.compile(r"[A-Za-z_]\w*\s*\(")
+NUMBER_PATTERN = re.compile(r"\d+\.\d*|\.\d+|\d+")
+
+# Compiled NumExpr objects are not meant to be run from several threads at once
+_evaluate_lock = threading.Lock()
+
+def _check_expression(expression, variable_names=()):
+    """The character whitelist; with named inputs, identifiers must be exactly those names."""
+    if not isinstance(expression, str) or not expression.strip():
+        raise ValueError("Expression must be a non-empty string.")
+    if variable_names:
+        if CALL_PATTERN.search(expression):
+            raise ValueError("Function calls are not allowed in expressions.")
+        unknown = set(IDENTIFIER_PATTERN.findall(expression)) - set(variable_names)
+        if unknown:
+            raise ValueError(f"Expression uses unknown names: {', '.join(sorted(unknown))}")
+        expression = IDENTIFIER_PATTERN.sub(" ", expression)
+    if not all(char in ALLOWED_CHARS for char in expression):
+        raise ValueError("Expression contains disallowed characters.")
+    if any(c.isalpha() for c in expression):
+        raise ValueError("Expression contains alphabetic characters and cannot be evaluated for security reasons.")
+
+@functools.lru_cache(maxsize=CALCULATOR_CACHE_SIZE)
+def _compiled(expression, signature):
+    """Parsed and compiled expression for a (name, dtype) signature, kept in an LRU cache."""
+    return ne.NumExpr(expression, signature=[(name, np.dtype(dtype).type) for name, dtype in signature])
+
+def _evaluate_compiled(expression, names, arrays):
+    compiled = _compiled(expression, tuple((name, array.dtype.str) for name, array in zip(names, arrays)))
+    with _evaluate_lock:
+        return compiled(*arrays)
+
+def _template(expression):
+    """Replaces the numeric literals by placeholders: ('_n0*(_n1+_n2)', ['350', '7', '3'])."""
+    literals = []
+    def placeholder(match):
+        literals.append(match.group(0))
+        return f"_n{len(literals) - 1}"
+    return NUMBER_PATTERN.sub(placeholder, expression), literals
+
+def _format_scalar(value):
+    return str(value.item() if isinstance(value, np.generic) else value)
+
+def _evaluate_single(expression):
+    # Using numexpr instead of eval for secure expression evaluation
+    return str(ne.evaluate(expression))
+
+def _evaluate_batch(expressions):
+    """
+    Evaluates constant expressions in one vectorized pass per expression shape: expressions
+    that differ only in their numbers share a compiled template evaluated over literal arrays.
+    Returns a list of (result, error) pairs.
+    """
+    outcomes = [None] * len(expressions)
+    groups = {}
+    for index, expression in enumerate(expressions):
+        try:
+            _check_expression(expression)
+        except ValueError as e:
+            outcomes[index] = (None, str(e))
+            continue
+        template, literals = _template(expression)
+        kinds = tuple("f" if "." in literal else "i" for literal in literals)
+        groups.setdefault((template, kinds), []).append((index, literals))
+
+    for (template, kinds), members in groups.items():
+        results = None
+        if kinds and len(members) > 1:
+            names = [f"_n{i}" for i in range(len(kinds))]
+            arrays = [
+                np.array([float(literals[i]) if kind == "f" else int(literals[i]) for _, literals in members], dtype=np.float64 if kind == "f" else np.int64)
+                for i, kind in enumerate(kinds)
+            ]
+            try:
+                results = _evaluate_compiled(template, names, arrays)
+            except Exception:
+                results = None # e.g. a syntax error: evaluate members one by one for their own messages
+        for position, (index, _) in enumerate(members):
+            value = results[position] if results is not None else None
+            if value is not None and math.isfinite(value):
+                outcomes[index] = (_format_scalar(value), None)
+                continue
+            # Singletons, failed groups and non-finite values (e.g. division by zero) keep single-call semantics
+            try:
+                outcomes[index] = (_evaluate_single(expressions[index]), None)
+            except Exception as e:
+                outcomes[index] = (None, str(e))
+    return outcomes
+
+def _variable_arrays(variables, max_values):
+    names, arrays = [], []
+    for name, values in variables.items():
+        if not IDENTIFIER_PATTERN.fullmatch(name):
+            raise ValueError(f"Invalid variable name: '{name}'")
+        array = np.asarray(values)
+        if array.dtype.kind == "b" or array.dtype.kind not in "iuf" or array.ndim > 1:
+            raise ValueError(f"Variable '{name}' must be a number or a flat list of numbers.")
+        if array.size > max_values:
+            raise ValueError(f"Variable '{name}' has {array.size} values; at most {max_values} are allowed.")
+        names.append(name)
+        arrays.append(array.astype(np.float64 if array.dtype.kind == "f" else np.int64))
+    return names, arrays
+
+def _format_array(result):
+    if np.ndim(result) == 0:
+        return _format_scalar(result[()] if isinstance(result, np.ndarray) else result)
+    return [value if isinstance(value, int) or math.isfinite(value) else str(value) for value in result.tolist()]
+
+def calculator(expression=None, expressions=None, variables=None, *, session, client, config, **kwargs):
+    batch = list(expressions or [])
+    if expression and not batch and not variables:
+        return _calculate_one(expression)
+    if expression:
+        batch.insert(0, expression)
+    if not batch:
+        return {"status": "error", "message": "Provide 'expression' or 'expressions'."}
+    if len(batch) > config.CALCULATOR_MAX_EXPRESSIONS:
+        return {"status": "error", "message": f"Too many expressions ({len(batch)}); at most {config.CALCULATOR_MAX_EXPRESSIONS} per call."}
+
+    fields = {"Expressions": batch[:10] + ([f"... ({len(batch) - 10} more)"] if len(batch) > 10 else [])}
+    if variables:
+        fields["Variables"] = ", ".join(variables)
+    output.tool_call(f"Calculator (batch of {len(batch)})", fields)
+
+    if variables:
+        try:
+            names, arrays = _variable_arrays(variables, config.CALCULATOR_MAX_VALUES)
+        except ValueError as e:
+            return {"status": "error", "message": f"Calculator error: {e}"}
+        outcomes = []
+        for item in batch:
+            try:
+                _check_expression(item, names)
+                used = set(IDENTIFIER_PATTERN.findall(item)) # The compiled signature lists only these
+                used_names = [name for name in names if name in used]
+                used_arrays = [array for name, array in zip(names, arrays) if name in used]
+                outcomes.append((_format_array(_evaluate_compiled(item, used_names, used_arrays)), None))
+            except Exception as e:
+                outcomes.append((None, str(e)))
+    else:
+        outcomes = _evaluate_batch(batch)
+
+    results = [
+        {"expression": item, "result": result} if error is None else {"expression": item, "error": error}
+        for item, (result, error) in zip(batch, outcomes)
+    ]
+    failed = sum(1 for _, error in outcomes if error is not None)
+    return {
+        "status": "success" if failed < len(batch) else "error",
+        "results": results,
+        "evaluated": len(batch) - failed,
+        "failed": failed,
+        "message": f"Evaluated {len(batch) - failed} of {len(batch)} expressions.",
+    }
 
-def calculator(expression, *, session, client, config, **kwargs):
-    console.print(Panel(f"Tool: Calculator\nExpression: '{expression}'", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
+def _calculate_one(expression):
+    output.tool_call("Calculator", {"Expression": expression})
     try:
-        allowed_chars = "0123456789+-*/(). "
-        if not all(char in allowed_chars for char in expression):
-            raise ValueError("Expression contains disallowed characters.")
-        if any(c.isalpha() for c in expression):
-            raise ValueError("Expression contains alphabetic characters and cannot be evaluated for security reasons.")
-        # Using numexpr instead of eval for secure expression evaluation
-        result = ne.evaluate(expression)
-        return {"status": "success", "expression": expression, "result": str(result)}
+        _check_expression(expression)
+        return {"status": "success", "expression": expression, "result": _evaluate_single(expression)}
     except Exception as e:
         return {"status": "error", "expression": expression, "message": f"Calculator error for expression '{expression}': {str(e)}"}
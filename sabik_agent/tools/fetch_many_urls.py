@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from .. import tracing
+from .. import output
+from ..web import fetch_page
+
+def _fetch_one(session, url, host_slots, deadline, max_chars, config):
+    with host_slots[urlsplit(url).netloc.lower()]:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return {"url": url, "status": "error", "message": "Overall deadline reached before the fetch started."}
+        try:
+            page = fetch_page(session, url, max_bytes=config.WEB_MAX_BYTES, max_chars=max_chars, timeout=min(config.WEB_TIMEOUT, remaining), deadline=deadline)
+        except requests.exceptions.RequestException as e:
+            return {"url": url, "status": "error", "message": f"Failed to fetch: {e}"}
+        except ValueError as e:
+            return {"url": url, "status": "error", "message": str(e)}
+    return {"url": url, "status": "success", "title": page["title"], "content": page["text"], "truncated": page["truncated"], "cache": page["cache"]}
+
+def fetch_many_urls(urls, max_chars_per_url=None, *, session, client, config, **kwargs):
+    if isinstance(urls, str):
+        urls = [urls]
+    urls = list(dict.fromkeys(u.strip() for u in urls or [] if u and u.strip())) # Deduplicate, keep order
+    output.tool_call("Fetch Many URLs", {f"URLs ({len(urls)})": urls})
+    if not urls:
+        return {"status": "error", "message": "No URLs given."}
+    if len(urls) > config.FETCH_MAX_URLS:
+        return {"status": "error", "message": f"Too many URLs ({len(urls)}); at most {config.FETCH_MAX_URLS} per call."}
+    invalid = [u for u in urls if not u.startswith(('http://', 'https://'))]
+    if invalid:
+        return {"status": "error", "message": f"Invalid URLs (must start with http:// or https://): {', '.join(invalid)}"}
+
+    max_chars = max(1, min(int(max_chars_per_url or config.FETCH_MAX_CHARS_PER_URL), config.WEB_MAX_CHARS))
+    host_slots = {}
+    for u in urls:
+        host_slots.setdefault(urlsplit(u).netloc.lower(), threading.BoundedSemaphore(max(1, config.FETCH_PER_HOST_LIMIT)))
+
+    started = time.monotonic()
+    deadline = started + config.FETCH_DEADLINE_SECONDS
+    output.message(f"Fetching {len(urls)} URLs across {len(host_slots)} hosts...", "detail")
+    executor = ThreadPoolExecutor(max_workers=max(1, min(config.FETCH_MAX_WORKERS, len(urls))), thread_name_prefix="sabik-fetch")
+    try:
+        futures = [executor.submit(tracing.bind(_fetch_one), session, u, host_slots, deadline, max_chars, config) for u in urls]
+        wait(futures, timeout=config.FETCH_DEADLINE_SECONDS)
+        results = []
+        for u, future in zip(urls, futures):
+            if not future.done():
+                future.cancel()
+                results.append({"url": u, "status": "error", "message": f"Not finished within the {config.FETCH_DEADLINE_SECONDS}s deadline."})
+            elif future.exception() is not None:
+                results.append({"url": u, "status": "error", "message": f"Unexpected error: {future.exception()}"})
+            else:
+                results.append(future.result())
+    finally:
+        # Don't block on stragglers past the deadline; fetch_page stops them at the same deadline
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    fetched = sum(1 for r in results if r["status"] == "success")
+    elapsed = round(time.monotonic() - started, 2)
+    return {
+        "status": "success" if fetched else "error",
+        "results": results,
+        "fetched": fetched,
+        "failed": len(results) - fetched,
+        "elapsed_seconds": elapsed,
+        "message": f"Fetched {fetched} of {len(results)} URLs in {elapsed}s.",
+    }
@@ -2,49 +2,84 @@ import requests
 import os
 import time
 import urllib.parse
+import uuid
 
-from ..interface import console, Panel
-from ..config import OUTPUT_DIR, OPENAI_IMAGE_BASE_URL_TEXT
+from .. import utils
+from ..cache import get_result_cache, make_key, SingleFlight
+from .. import output
+from ..config import OUTPUT_DIR, OPENAI_IMAGE_BASE_URL_TEXT, MAX_IMAGE_DOWNLOAD_MB
+
+# Concurrent requests for the same parameter set share one download
+_image_requests = SingleFlight()
 
 def _api_generate_image_get(session, referrer, prompt, model=None, width=None, height=None, seed=None, nologo=None, enhance=None, safe=None):
     params = {"model": model, "width": width, "height": height, "seed": seed, "nologo": nologo, "enhance": enhance, "safe": safe, "referrer": referrer}
     params = {k: v for k, v in params.items() if v is not None}
     encoded_prompt = urllib.parse.quote(prompt, safe='')
     url = f"{OPENAI_IMAGE_BASE_URL_TEXT}/prompt/{encoded_prompt}"
-    response = None
     try:
-        console.print(Panel(f"Prompt: {prompt}\nModel: {model or 'default'}", title="[bold blue]API Call: GET Image[/]", border_style="blue", expand=False))
-        response = session.get(url, params=params, timeout=300)
-        response.raise_for_status()
-        if 'image/' in response.headers.get('Content-Type', ''):
-            os.makedirs(OUTPUT_DIR, exist_ok=True)
-            safe_prompt = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in prompt[:40]).rstrip().replace(' ', '_')
-            content_type = response.headers.get('Content-Type', 'image/jpeg')
-            ext = content_type.split('/')[-1].split(';')[0]
-            if not ext or len(ext) > 5: ext = 'jpg'
-            filename = f"image_{safe_prompt}_{int(time.time())}.{ext}"
-            filepath = os.path.join(OUTPUT_DIR, filename)
-            with open(filepath, 'wb') as f: f.write(response.content)
-            console.print(f"Image saved: [bright_blue u]{filepath}[/bright_blue u]")
-            return response.url
-        else:
-            console.print(Panel(f"Expected image, got {response.headers.get('Content-Type')}\n{response.text[:200]}", title="[bold red]API Error[/]", border_style="red"))
-            return None
+        output.panel("API Call: GET Image", f"Prompt: {prompt}\nModel: {model or 'default'}")
+        # Stream straight to a temp file in OUTPUT_DIR; the type is sniffed from the first chunk
+        temp_path, content_type, final_url = utils.stream_download(session, url, OUTPUT_DIR, MAX_IMAGE_DOWNLOAD_MB * 1024 * 1024, timeout=300, params=params, require_image=True)
+        safe_prompt = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in prompt[:40]).rstrip().replace(' ', '_')
+        ext = utils.IMAGE_EXTENSIONS.get(content_type, 'jpg')
+        # Unique per call: parallel seeded calls for one prompt must not replace each other's file
+        filename = f"image_{safe_prompt}_{int(time.time())}_{uuid.uuid4().hex[:8]}.{ext}"
+        filepath = os.path.join(OUTPUT_DIR, filename)
+        os.replace(temp_path, filepath) # Atomic: readers never see a partially written image
+        output.message("Image saved", target=filepath)
+        return final_url, filepath
     except requests.exceptions.Timeout:
-        console.print(Panel("Timeout during image generation.", title="[bold red]Timeout Error[/]", border_style="red"))
+        output.panel("Timeout Error", "Timeout during image generation.", "error")
         return None
     except requests.exceptions.RequestException as e:
-        status_code = response.status_code if response else "N/A"
-        console.print(Panel(f"Error: {e}\nStatus: {status_code}", title="[bold red]Request Error[/]", border_style="red"))
+        status_code = e.response.status_code if e.response is not None else "N/A"
+        output.panel("Request Error", f"Error: {e}\nStatus: {status_code}", "error")
+        return None
+    except utils.DownloadTooLarge as e:
+        output.panel("Image Too Large", str(e), "error")
+        return None
+    except ValueError as e:
+        output.panel("API Error", str(e), "error")
         return None
     except Exception as e:
-        console.print(Panel(f"Image generation/save error: {e}", title="[bold red]Save Error[/]", border_style="red"))
+        output.panel("Save Error", f"Image generation/save error: {e}", "error")
         return None
 
+def _cached_image(cache, cache_key):
+    """Returns the indexed (url, filepath) for a parameter set if its file still exists in OUTPUT_DIR."""
+    entry = cache.get(cache_key)
+    if entry and os.path.isfile(entry.get("filepath", "")):
+        return entry["url"], entry["filepath"]
+    return None
+
 def generate_ai_image(prompt, model=None, width=None, height=None, seed=None, nologo=None, *, session, client, config, **kwargs):
-    console.print(Panel(f"Tool: Generate Image\nPrompt: '{prompt}'", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
-    image_url = _api_generate_image_get(session, config.REFERRER_ID, prompt=prompt, model=model, width=width, height=height, seed=seed, nologo=nologo)
-    if image_url:
-        return {"status": "success", "image_url": image_url, "message": f"Image generated, available at {image_url}"}
+    output.tool_call("Generate Image", {"Prompt": prompt})
+    def generate():
+        return _api_generate_image_get(session, config.REFERRER_ID, prompt=prompt, model=model, width=width, height=height, seed=seed, nologo=nologo)
+
+    # Output is only deterministic for a fixed seed, so unseeded requests always hit the endpoint
+    cache = get_result_cache("images") if seed is not None else None
+    if cache is None:
+        generated, cache_status = generate(), "disabled"
+    else:
+        cache_key = make_key("generate_ai_image", OPENAI_IMAGE_BASE_URL_TEXT, prompt, model, width, height, seed, nologo)
+        def generate_or_reuse():
+            cached = _cached_image(cache, cache_key)
+            if cached:
+                return cached, "hit"
+            result = generate()
+            if result:
+                cache.set(cache_key, {"url": result[0], "filepath": result[1]})
+            return result, "miss"
+        (generated, cache_status), shared = _image_requests.do(cache_key, generate_or_reuse)
+        if shared:
+            cache_status = "coalesced"
+        if cache_status != "miss":
+            output.message(f"Image for this prompt/model/size/seed reused ({cache_status}): {generated[1] if generated else 'n/a'}", "detail")
+
+    if generated:
+        image_url, filepath = generated
+        return {"status": "success", "image_url": image_url, "file_path": filepath, "cache": cache_status, "message": f"Image generated, available at {image_url}"}
     else:
         return {"status": "error", "message": f"Failed to generate image for prompt: '{prompt}'."}
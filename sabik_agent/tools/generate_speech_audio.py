@@ -1,27 +1,44 @@
 import requests
 import os
+import re
+import time
+import queue
+import atexit
+import threading
 import importlib.util
 import subprocess
 import platform
 import base64
 import tempfile
 import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 
 from .. import utils
-from ..interface import console, Panel
-from ..config import OPENAI_BASE_URL_TEXT
+from .. import tracing
+from ..cache import get_file_cache, make_key
+from .. import output
+from .. import config as app_config
+from ..config import OPENAI_BASE_URL_TEXT, OUTPUT_DIR, TTS_CACHE_ENABLED, TTS_CACHE_MAX_MB
+
+_cache_stats_lock = threading.Lock()
+
+# All auto-played audio is played in order on one background thread, so tool calls never wait for playback
+# and two speech calls never talk over each other
+_playback_queue = queue.Queue()
+_playback_thread = None
+_playback_lock = threading.Lock()
 
 def _convert_mp3_to_wav(mp3_path):
     """Convert an MP3 file to WAV format for better compatibility with playback methods."""
     try:
         # Check if pydub is installed, if not, try to install it
         if importlib.util.find_spec("pydub") is None:
-            console.print(Panel("pydub not found. Attempting to install...", title="[bold yellow]Audio Conversion[/]", border_style="yellow"))
+            output.panel("Audio Conversion", "pydub not found. Attempting to install...", "warning")
             try:
                 subprocess.check_call(["pip", "install", "pydub"])
-                console.print(Panel("pydub installed successfully", title="[bold green]Audio Conversion[/]", border_style="green"))
+                output.panel("Audio Conversion", "pydub installed successfully", "success")
             except Exception as e:
-                console.print(Panel(f"Failed to install pydub: {e}", title="[bold red]Audio Conversion Error[/]", border_style="red"))
+                output.panel("Audio Conversion Error", f"Failed to install pydub: {e}", "error")
                 return None
         
         # Import pydub after ensuring it's installed
@@ -35,29 +52,36 @@ def _convert_mp3_to_wav(mp3_path):
             if ffmpeg_process.returncode != 0:
                 raise Exception("FFmpeg is not working properly")
         except (subprocess.SubprocessError, FileNotFoundError):
-            console.print(Panel("FFmpeg not found. MP3 to WAV conversion requires FFmpeg to be installed.", 
-                          title="[bold yellow]FFmpeg Missing[/]", border_style="yellow"))
-            console.print(Panel("Please install FFmpeg: https://ffmpeg.org/download.html", 
-                          title="[bold yellow]Installation Instructions[/]", border_style="yellow"))
+            output.panel("FFmpeg Missing", "FFmpeg not found. MP3 to WAV conversion requires FFmpeg to be installed.", "warning")
+            output.panel("Installation Instructions", "Please install FFmpeg: https://ffmpeg.org/download.html", "warning")
             # Fall back to direct playback without conversion
             return None
         
-        # Generate a temporary WAV file path
-        wav_path = os.path.splitext(mp3_path)[0] + ".wav"
-        
-        # Convert MP3 to WAV
-        sound = AudioSegment.from_mp3(mp3_path)
-        sound.export(wav_path, format="wav")
+        def write_wav(wav_path):
+            AudioSegment.from_mp3(mp3_path).export(wav_path, format="wav")
+
+        # Conversions of cached audio live in the TTS cache too, so its size cap covers them
+        cache = _speech_cache()
+        if cache and os.path.dirname(os.path.abspath(mp3_path)) == os.path.abspath(cache.directory):
+            cache_key = os.path.splitext(os.path.basename(mp3_path))[0]
+            wav_path = cache.lookup(cache_key, "wav") or cache.store(cache_key, "wav", write_wav)
+        else:
+            wav_path = os.path.splitext(mp3_path)[0] + ".wav"
+            write_wav(wav_path)
         
-        console.print(Panel(f"Converted MP3 to WAV: {os.path.basename(wav_path)}", title="[bold green]Audio Conversion[/]", border_style="green"))
+        output.panel("Audio Conversion", f"Converted MP3 to WAV: {os.path.basename(wav_path)}", "success")
         return wav_path
     except Exception as e:
-        console.print(Panel(f"MP3 to WAV conversion error: {e}", title="[bold red]Audio Conversion Error[/]", border_style="red"))
+        output.panel("Audio Conversion Error", f"MP3 to WAV conversion error: {e}", "error")
         # Fall back to direct playback without conversion
         return None
 
-def _play_audio_file(file_path):
-    """Play an audio file using the appropriate method for the current platform."""
+def _play_audio_file(file_path, wait=False):
+    """
+    Play an audio file using the appropriate method for the current platform.
+    With wait=True, returns only after playback finished (where the player allows it),
+    so that consecutive chunks can be played back to back.
+    """
     try:
         system = platform.system()
         if system == "Windows":
@@ -71,7 +95,7 @@ def _play_audio_file(file_path):
                     winsound.PlaySound(file_path, winsound.SND_FILENAME)
                     return True
                 except (ImportError, Exception) as e:
-                    console.print(f"[yellow]Winsound playback failed: {e}[/yellow]")
+                    output.message(f"Winsound playback failed: {e}", "warning")
             elif file_ext == ".mp3":
                 # Try to convert MP3 to WAV first for better compatibility
                 wav_path = _convert_mp3_to_wav(file_path)
@@ -81,7 +105,7 @@ def _play_audio_file(file_path):
                         winsound.PlaySound(wav_path, winsound.SND_FILENAME)
                         return True
                     except (ImportError, Exception) as e:
-                        console.print(f"[yellow]Winsound playback of converted WAV failed: {e}[/yellow]")
+                        output.message(f"Winsound playback of converted WAV failed: {e}", "warning")
             
             # For MP3 or other formats, use the default system player
             # Media.SoundPlayer only supports WAV format, not MP3
@@ -90,46 +114,53 @@ def _play_audio_file(file_path):
                 os.startfile(file_path)
                 return True
             except Exception as e:
-                console.print(f"[yellow]Default player failed: {e}[/yellow]")
+                output.message(f"Default player failed: {e}", "warning")
                 
             # Try with PowerShell's Start-Process
             try:
-                subprocess.Popen(["powershell", "-c", f"Start-Process '{file_path}'"])
+                start_process = f"Start-Process '{file_path}'" + (" -Wait" if wait else "")
+                process = subprocess.Popen(["powershell", "-c", start_process])
+                if wait:
+                    process.wait()
                 return True
             except Exception as e:
-                console.print(f"[yellow]PowerShell playback failed: {e}[/yellow]")
+                output.message(f"PowerShell playback failed: {e}", "warning")
                 
             # Last resort: try with webbrowser module
             try:
-                console.print(f"[yellow]Attempting to play audio with web browser...[/yellow]")
+                output.message("Attempting to play audio with web browser...", "warning")
                 # Convert to absolute file path with proper URI format
                 file_uri = 'file:///' + os.path.abspath(file_path).replace('\\', '/')
                 webbrowser.open(file_uri)
                 return True
             except Exception as e:
-                console.print(f"[yellow]Browser playback failed: {e}[/yellow]")
+                output.message(f"Browser playback failed: {e}", "warning")
                 return False
         elif system == "Darwin":  # macOS
             try:
-                subprocess.Popen(["afplay", file_path])
+                process = subprocess.Popen(["afplay", file_path])
+                if wait:
+                    process.wait()
                 return True
             except Exception as e:
-                console.print(f"[yellow]macOS afplay failed: {e}[/yellow]")
+                output.message(f"macOS afplay failed: {e}", "warning")
                 # Try with webbrowser as fallback
                 try:
-                    console.print(f"[yellow]Attempting to play audio with web browser...[/yellow]")
+                    output.message("Attempting to play audio with web browser...", "warning")
                     file_uri = 'file://' + os.path.abspath(file_path)
                     webbrowser.open(file_uri)
                     return True
                 except Exception as e:
-                    console.print(f"[yellow]Browser playback failed: {e}[/yellow]")
+                    output.message(f"Browser playback failed: {e}", "warning")
                     return False
         elif system == "Linux":
             # Try with various Linux audio players
             success = False
             for player in ["aplay", "paplay", "mpg123", "mpg321"]:
                 try:
-                    subprocess.Popen([player, file_path])
+                    process = subprocess.Popen([player, file_path], stderr=subprocess.DEVNULL if wait else None)
+                    if wait and process.wait() != 0:
+                        continue # Player could not handle this format; try the next one
                     success = True
                     break
                 except (subprocess.SubprocessError, FileNotFoundError):
@@ -140,21 +171,82 @@ def _play_audio_file(file_path):
             
             # If all players failed, try with webbrowser as fallback
             try:
-                console.print(f"[yellow]No suitable audio player found. Attempting to play audio with web browser...[/yellow]")
+                output.message("No suitable audio player found. Attempting to play audio with web browser...", "warning")
                 file_uri = 'file://' + os.path.abspath(file_path)
                 webbrowser.open(file_uri)
                 return True
             except Exception as e:
-                console.print(f"[yellow]Browser playback failed: {e}[/yellow]")
+                output.message(f"Browser playback failed: {e}", "warning")
                 return False
         else:
-            console.print(Panel(f"Unsupported platform for audio playback: {system}", title="[bold yellow]Audio Playback[/]", border_style="yellow"))
+            output.panel("Audio Playback", f"Unsupported platform for audio playback: {system}", "warning")
             return False
     except Exception as e:
-        console.print(Panel(f"Error playing audio: {e}", title="[bold red]Audio Playback Error[/]", border_style="red"))
+        output.panel("Audio Playback Error", f"Error playing audio: {e}", "error")
         return False
 
-def _api_generate_speech_post(session, referrer, text, voice="alloy"):
+def _playback_worker():
+    while True:
+        path = _playback_queue.get()
+        try:
+            _play_audio_file(path, wait=True)
+        finally:
+            _playback_queue.task_done()
+
+def _drain_playback():
+    """Lets queued audio finish at interpreter exit (e.g. batch or -q runs) instead of dropping it."""
+    _playback_queue.join()
+
+def _enqueue_playback(path):
+    """Plays path after everything queued before it, on the background playback thread."""
+    global _playback_thread
+    with _playback_lock:
+        if _playback_thread is None or not _playback_thread.is_alive():
+            if _playback_thread is None:
+                atexit.register(_drain_playback)
+            _playback_thread = threading.Thread(target=_playback_worker, name="sabik-tts-play", daemon=True)
+            _playback_thread.start()
+    _playback_queue.put(path)
+
+def _queue_auto_play(path, source_note=""):
+    """
+    Queues a synthesized file for background playback (converted to WAV on Windows when possible)
+    and returns the tool result.
+    """
+    output.panel("Audio Playback", "Auto-playing generated audio" + (" (fallback)" if source_note else "") + "...")
+    result = {"status": "success", "audio_file_path": path}
+    play_path = path
+    if os.path.splitext(path)[1].lower() == ".mp3" and platform.system() == "Windows":
+        output.panel("Audio Format", "MP3 file detected on Windows. Attempting to convert to WAV for better playback compatibility...")
+        wav_path = _convert_mp3_to_wav(path)
+        if wav_path:
+            result["wav_file_path"] = play_path = wav_path
+    _enqueue_playback(play_path)
+    converted = " and converted to WAV for playback" if play_path != path else ""
+    result["message"] = f"Speech audio saved to {os.path.basename(path)}{source_note}{converted} (playing in the background)"
+    return result
+
+def _speech_cache():
+    """The TTS audio cache in OUTPUT_DIR/tts_cache, or None if disabled."""
+    if not TTS_CACHE_ENABLED:
+        return None
+    return get_file_cache("tts_cache", TTS_CACHE_MAX_MB)
+
+def _record_cache_outcome(cache_stats, outcome):
+    if cache_stats is not None:
+        with _cache_stats_lock:
+            cache_stats[outcome] = cache_stats.get(outcome, 0) + 1
+
+def _api_generate_speech_post(session, referrer, text, voice="alloy", cache_stats=None):
+    cache = _speech_cache()
+    cache_key = make_key("tts", f"openai-audio@{OPENAI_BASE_URL_TEXT}", text, voice)
+    if cache:
+        cached_path = cache.lookup(cache_key, "mp3")
+        if cached_path:
+            output.message(f"TTS cache hit: {os.path.basename(cached_path)}", "detail")
+            _record_cache_outcome(cache_stats, "hits")
+            return cached_path
+
     payload = {
         "model": "openai-audio",
         "messages": [{"role": "user", "content": text}],
@@ -164,72 +256,185 @@ def _api_generate_speech_post(session, referrer, text, voice="alloy"):
     url = OPENAI_BASE_URL_TEXT
     response = None
     try:
-        console.print(Panel(f"Text: {text[:50]}...\nVoice: {voice}", title="[bold blue]API Call: POST TTS[/]", border_style="blue", expand=False))
+        output.panel("API Call: POST TTS", f"Text: {text[:50]}...\nVoice: {voice}")
         response = session.post(url, headers={"Content-Type": "application/json"}, json=payload, timeout=120)
         response.raise_for_status()
         response_data = response.json()
         audio_base64 = response_data.get('choices', [{}])[0].get('message', {}).get('audio', {}).get('data')
         if not audio_base64 or not isinstance(audio_base64, str):
             raise ValueError(f"No valid audio data found in response: {response.text[:200]}")
+        _record_cache_outcome(cache_stats, "misses")
+        if cache:
+            def write_audio(path):
+                with open(path, 'wb') as f:
+                    f.write(base64.b64decode(audio_base64))
+            saved_path = cache.store(cache_key, "mp3", write_audio)
+            output.message("Audio saved", target=saved_path)
+            return saved_path
         safe_text = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in text[:30]).rstrip().replace(' ', '_')
-        filename = f"speech_{safe_text}_{voice}_{int(os.path.getmtime(__file__))}.mp3"
+        # Text digest keeps chunks that share a 30-char prefix from overwriting each other
+        filename = f"speech_{safe_text}_{voice}_{cache_key[:10]}.mp3"
         return utils.save_base64_audio(audio_base64, filename)
     except requests.exceptions.RequestException as e:
         status_code = response.status_code if response else "N/A"
-        console.print(Panel(f"Error: {e}\nStatus: {status_code}", title="[bold red]TTS Request Error[/]", border_style="red"))
+        output.panel("TTS Request Error", f"Error: {e}\nStatus: {status_code}", "error")
         return None
     except (KeyError, IndexError, TypeError, ValueError) as e:
         resp_text = response.text[:200] if response else "N/A"
-        console.print(Panel(f"Parse Error: {e}\nResponse: {resp_text}", title="[bold red]TTS Parse Error[/]", border_style="red"))
+        output.panel("TTS Parse Error", f"Parse Error: {e}\nResponse: {resp_text}", "error")
         return None
     except Exception as e:
-        console.print(Panel(f"TTS generation error: {e}", title="[bold red]TTS Error[/]", border_style="red"))
+        output.panel("TTS Error", f"TTS generation error: {e}", "error")
         return None
 
-def _generate_speech_with_gtts(text, voice="en"):
+def _generate_speech_with_gtts(text, voice="en", cache_stats=None):
+    # Map OpenAI voices to language codes for gTTS
+    voice_to_lang = {
+        "alloy": "en",
+        "echo": "en",
+        "fable": "en",
+        "onyx": "en",
+        "nova": "en",
+        "shimmer": "en"
+    }
+    lang = voice_to_lang.get(voice, "en")
+    cache = _speech_cache()
+    cache_key = make_key("tts", "gtts", text, lang)
+    if cache:
+        cached_path = cache.lookup(cache_key, "mp3")
+        if cached_path:
+            output.message(f"TTS cache hit (gTTS): {os.path.basename(cached_path)}", "detail")
+            _record_cache_outcome(cache_stats, "hits")
+            return cached_path
+
     # Check if gtts is installed, if not, try to install it
     if importlib.util.find_spec("gtts") is None:
-        console.print(Panel("gTTS not found. Attempting to install...", title="[bold yellow]TTS Fallback[/]", border_style="yellow"))
+        output.panel("TTS Fallback", "gTTS not found. Attempting to install...", "warning")
         try:
             import subprocess
             subprocess.check_call(["pip", "install", "gtts"])
-            console.print(Panel("gTTS installed successfully", title="[bold green]TTS Fallback[/]", border_style="green"))
+            output.panel("TTS Fallback", "gTTS installed successfully", "success")
         except Exception as e:
-            console.print(Panel(f"Failed to install gTTS: {e}", title="[bold red]TTS Fallback Error[/]", border_style="red"))
+            output.panel("TTS Fallback Error", f"Failed to install gTTS: {e}", "error")
             return None
     
     try:
         from gtts import gTTS
-        # Map OpenAI voices to language codes for gTTS
-        voice_to_lang = {
-            "alloy": "en",
-            "echo": "en",
-            "fable": "en",
-            "onyx": "en",
-            "nova": "en",
-            "shimmer": "en"
-        }
-        lang = voice_to_lang.get(voice, "en")
         
         # Create gTTS object
         tts = gTTS(text=text, lang=lang, slow=False)
         
-        # Generate a filename
-        safe_text = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in text[:30]).rstrip().replace(' ', '_')
-        filename = f"speech_{safe_text}_{voice}_{int(os.path.getmtime(__file__))}.mp3"
-        filepath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "../..", "outputs", filename)
-        os.makedirs(os.path.dirname(filepath), exist_ok=True)
-        
-        # Save the audio file
-        tts.save(filepath)
-        console.print(Panel(f"Generated speech with gTTS: {filename}", title="[bold green]TTS Fallback Success[/]", border_style="green"))
+        # Save the audio file (content-addressed in the TTS cache when enabled)
+        if cache:
+            filepath = cache.store(cache_key, "mp3", tts.save)
+        else:
+            safe_text = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in text[:30]).rstrip().replace(' ', '_')
+            filepath = os.path.join(OUTPUT_DIR, f"speech_{safe_text}_{voice}_{cache_key[:10]}.mp3")
+            os.makedirs(OUTPUT_DIR, exist_ok=True)
+            tts.save(filepath)
+        _record_cache_outcome(cache_stats, "misses")
+        output.panel("TTS Fallback Success", f"Generated speech with gTTS: {os.path.basename(filepath)}", "success")
         return filepath
     except Exception as e:
-        console.print(Panel(f"gTTS generation error: {e}", title="[bold red]TTS Fallback Error[/]", border_style="red"))
+        output.panel("TTS Fallback Error", f"gTTS generation error: {e}", "error")
         return None
 
-def generate_speech_audio(text_to_speak, voice="alloy", *, session, client, config, auto_play=None, **kwargs):
-    console.print(Panel(f"Tool: Generate Speech\nText: '{text_to_speak[:50]}...'\nVoice: {voice}", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
+def _split_into_chunks(text, max_chars):
+    """Splits text on sentence boundaries into chunks of at most max_chars (long sentences are split on spaces)."""
+    chunks = []
+    current = ""
+    for sentence in re.split(r'(?<=[.!?;:])\s+', text.strip()):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return [chunk for chunk in chunks if chunk]
+
+def _synthesize_chunk(session, referrer, text, voice, tts_enabled, cache_stats=None):
+    saved_path = _api_generate_speech_post(session, referrer, text, voice, cache_stats) if tts_enabled else None
+    return saved_path or _generate_speech_with_gtts(text, voice, cache_stats)
+
+def _merge_audio_files(paths, voice):
+    """Concatenates MP3 chunk files into one file (MP3 frame streams can be joined byte-wise)."""
+    def write_merged(merged_path):
+        with open(merged_path, "wb") as merged:
+            for path in paths:
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        merged.write(block)
+
+    # Cached chunks are content-addressed, so the merged file is too and counts toward the cache size
+    cache = _speech_cache()
+    if cache:
+        cache_key = make_key("tts-merged", *[os.path.basename(path) for path in paths])
+        return cache.lookup(cache_key, "mp3") or cache.store(cache_key, "mp3", write_merged)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    merged_path = os.path.join(OUTPUT_DIR, f"speech_merged_{voice}_{int(time.time() * 1000)}.mp3")
+    write_merged(merged_path)
+    return merged_path
+
+def _generate_speech_pipelined(session, referrer, chunks, voice, tts_enabled, auto_play, merge_output, max_workers, cache_stats=None):
+    """
+    Synthesizes sentence chunks concurrently and queues them for in-order background playback as
+    soon as each one is ready, so playback of chunk 1 overlaps with synthesis of the later chunks.
+    Returns once synthesis has finished; playback may still be running.
+    """
+    # os.startfile cannot wait for a chunk to end, so on Windows the merged file is played once instead
+    play_chunks = auto_play and platform.system() != "Windows"
+    if auto_play and not play_chunks:
+        merge_output = True
+    started = time.perf_counter()
+    time_to_first_audio_ms = None
+    chunk_paths = []
+    output.panel("Audio Pipeline", f"Pipelined TTS: {len(chunks)} chunks, up to {max_workers} synthesized in parallel")
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="sabik-tts") as executor:
+        futures = [executor.submit(tracing.bind(_synthesize_chunk), session, referrer, chunk, voice, tts_enabled, cache_stats) for chunk in chunks]
+        for index, future in enumerate(futures):
+            path = future.result()
+            chunk_paths.append(path)
+            if not path:
+                output.message(f"Warn: Speech chunk {index + 1}/{len(chunks)} could not be synthesized; skipping it.", "warning")
+                continue
+            if time_to_first_audio_ms is None:
+                time_to_first_audio_ms = round((time.perf_counter() - started) * 1000)
+            if play_chunks:
+                _enqueue_playback(path)
+
+    ready_paths = [path for path in chunk_paths if path]
+    if not ready_paths:
+        return {"status": "error", "message": "Speech generation failed for every chunk."}
+    result = {"status": "success", "chunks": len(chunks), "chunk_files": ready_paths, "time_to_first_audio_ms": time_to_first_audio_ms}
+    if merge_output and len(ready_paths) > 1:
+        result["audio_file_path"] = _merge_audio_files(ready_paths, voice)
+    else:
+        result["audio_file_path"] = ready_paths[0]
+    if auto_play and not play_chunks:
+        _enqueue_playback(result["audio_file_path"])
+    failed = len(chunk_paths) - len(ready_paths)
+    play_status = " (playing in the background)" if auto_play else ""
+    result["message"] = f"Speech audio saved to {os.path.basename(result['audio_file_path'])}{play_status}" + (f"; {failed} chunk(s) failed" if failed else "")
+    return result
+
+def generate_speech_audio(text_to_speak, voice="alloy", *, session, client, config, auto_play=None, merge_output=None, **kwargs):
+    cache_stats = {"hits": 0, "misses": 0}
+    result = _generate_speech_audio(text_to_speak, voice, session, config, auto_play, merge_output, cache_stats)
+    if result.get("status") == "success":
+        result["cache"] = cache_stats
+    return result
+
+def _generate_speech_audio(text_to_speak, voice, session, config, auto_play, merge_output, cache_stats):
+    output.tool_call("Generate Speech", {"Text": f"{text_to_speak[:50]}...", "Voice": voice})
     
     # Check if TTS is enabled in environment
     tts_enabled = os.environ.get("TTS_ENABLED", "true").lower() == "true"
@@ -237,63 +442,33 @@ def generate_speech_audio(text_to_speak, voice="alloy", *, session, client, conf
     # Allow auto_play to be passed as a parameter, otherwise use environment variable
     if auto_play is None:
         auto_play = os.environ.get("TTS_AUTO_PLAY", "true").lower() == "true"
+    # Callers may pass a minimal config object; pipeline settings default to the app config
+    def setting(name):
+        return getattr(config, name, getattr(app_config, name))
+    if merge_output is None:
+        merge_output = setting("TTS_MERGE_OUTPUT")
+
+    # Paragraph-length text is synthesized per sentence chunk and played as the chunks arrive
+    if setting("TTS_PIPELINE"):
+        chunks = _split_into_chunks(text_to_speak, setting("TTS_CHUNK_CHARS"))
+        if len(chunks) > 1:
+            return _generate_speech_pipelined(session, config.REFERRER_ID, chunks, voice, tts_enabled, auto_play, merge_output, setting("TTS_MAX_WORKERS"), cache_stats)
     
     if tts_enabled:
         # Try the primary OpenAI TTS method first
-        saved_path = _api_generate_speech_post(session, config.REFERRER_ID, text_to_speak, voice)
+        saved_path = _api_generate_speech_post(session, config.REFERRER_ID, text_to_speak, voice, cache_stats)
         if saved_path:
-            # Auto-play the audio if enabled
             if auto_play:
-                console.print(Panel("Auto-playing generated audio...", title="[bold blue]Audio Playback[/]", border_style="blue"))
-                
-                # Check file extension for MP3 format
-                file_ext = os.path.splitext(saved_path)[1].lower()
-                if file_ext == ".mp3" and platform.system() == "Windows":
-                    console.print(Panel("MP3 file detected on Windows. Attempting to convert to WAV for better playback compatibility...", 
-                                  title="[bold blue]Audio Format[/]", border_style="blue"))
-                    # Try to convert to WAV first for Windows compatibility
-                    wav_path = _convert_mp3_to_wav(saved_path)
-                    if wav_path:
-                        play_success = _play_audio_file(wav_path)
-                        if play_success:
-                            play_status = "(auto-played WAV conversion)"
-                            return {"status": "success", "audio_file_path": saved_path, 
-                                    "wav_file_path": wav_path,
-                                    "message": f"Speech audio saved to {os.path.basename(saved_path)} and converted to WAV for playback {play_status}"}
-                
-                # If no conversion or conversion failed, try playing the original file
-                play_success = _play_audio_file(saved_path)
-                play_status = "(auto-played)" if play_success else "(auto-play failed - try manual playback)"
-                return {"status": "success", "audio_file_path": saved_path, "message": f"Speech audio saved to {os.path.basename(saved_path)} {play_status}"}
+                return _queue_auto_play(saved_path)
             return {"status": "success", "audio_file_path": saved_path, "message": f"Speech audio saved to {os.path.basename(saved_path)}"}
     
     # If TTS is disabled or the primary method failed, try the fallback
-    console.print(Panel("Primary TTS method unavailable. Trying fallback with gTTS...", title="[bold yellow]TTS Fallback[/]", border_style="yellow"))
-    fallback_path = _generate_speech_with_gtts(text_to_speak, voice)
+    output.panel("TTS Fallback", "Primary TTS method unavailable. Trying fallback with gTTS...", "warning")
+    fallback_path = _generate_speech_with_gtts(text_to_speak, voice, cache_stats)
     
     if fallback_path:
-        # Auto-play the fallback audio if enabled
         if auto_play:
-            console.print(Panel("Auto-playing generated audio (fallback)...", title="[bold blue]Audio Playback[/]", border_style="blue"))
-            
-            # Check file extension for MP3 format (gTTS generates MP3)
-            if platform.system() == "Windows":
-                console.print(Panel("MP3 file detected on Windows. Attempting to convert to WAV for better playback compatibility...", 
-                              title="[bold blue]Audio Format[/]", border_style="blue"))
-                # Try to convert to WAV first for Windows compatibility
-                wav_path = _convert_mp3_to_wav(fallback_path)
-                if wav_path:
-                    play_success = _play_audio_file(wav_path)
-                    if play_success:
-                        play_status = "(auto-played WAV conversion)"
-                        return {"status": "success", "audio_file_path": fallback_path, 
-                                "wav_file_path": wav_path,
-                                "message": f"Speech audio saved to {os.path.basename(fallback_path)} (using gTTS fallback) and converted to WAV for playback {play_status}"}
-            
-            # If no conversion or conversion failed, try playing the original file
-            play_success = _play_audio_file(fallback_path)
-            play_status = "(auto-played)" if play_success else "(auto-play failed - try manual playback)"
-            return {"status": "success", "audio_file_path": fallback_path, "message": f"Speech audio saved to {os.path.basename(fallback_path)} (using gTTS fallback) {play_status}"}
+            return _queue_auto_play(fallback_path, " (using gTTS fallback)")
         return {"status": "success", "audio_file_path": fallback_path, "message": f"Speech audio saved to {os.path.basename(fallback_path)} (using gTTS fallback)"}
     else:
         return {"status": "error", "message": "Speech generation failed with both primary and fallback methods."}
@@ -0,0 +1,36 @@
+from .. import output
+from ..blobs import get_store
+
+def read_tool_result(blob, start=None, end=None, unit="lines", *, session, client, config, **kwargs):
+    output.tool_call("Read Tool Result", {"Blob": blob, "Range": f"{unit} {start or (1 if unit == 'lines' else 0)}-{end if end is not None else 'end'}"})
+    if unit not in ("lines", "bytes"):
+        return {"status": "error", "message": "unit must be 'lines' or 'bytes'."}
+    try:
+        if unit == "lines":
+            text, start, end, total = get_store().read_lines(blob, start or 1, end)
+        else:
+            text, start, end, total = get_store().read_bytes(blob, start or 0, end)
+    except KeyError as e:
+        return {"status": "error", "blob": blob, "message": e.args[0]}
+    except OSError as e:
+        return {"status": "error", "blob": blob, "message": f"Could not read blob {blob}: {e}"}
+
+    # Never hand back more than a large result would have put inline
+    limit = config.TOOL_RESULT_INLINE_CHARS
+    truncated = len(text) > limit
+    if truncated:
+        text = text[:limit]
+    message = f"Read {unit} {start}-{end} of {total}."
+    if truncated:
+        message += f" Output cut to {limit} characters; request a smaller range."
+    return {
+        "status": "success",
+        "blob": blob,
+        "unit": unit,
+        "start": start,
+        "end": end,
+        "total": total,
+        "content": text,
+        "truncated": truncated,
+        "message": message,
+    }
@@ -0,0 +1,57 @@
+# sabik_agent/tools/registry.py
+"""
+Declarative tool registry: every tool's schema is known up front, but its module (and heavy
+dependencies such as numpy, PIL or numexpr) is only imported on the tool's first call.
+"""
+import threading
+
+
+class ToolSpec:
+    def __init__(self, name, schema, serial_only=False, triggers=(), extensions=(), handles_urls=False, inline_result=False, on_demand=False):
+        self.name = name
+        self.schema = schema
+        self.serial_only = serial_only # Must not run concurrently with itself (e.g. a tool driving a shared device)
+        self.inline_result = inline_result # Results always go into the history in full, never to the blob store
+        # Hints for per-turn tool selection (see tool_selection.py)
+        self.triggers = tuple(triggers) # Case-insensitive regexes matched against the user input
+        self.extensions = tuple(extensions) # File extensions (without dot) this tool consumes
+        self.handles_urls = handles_urls # Offer whenever the input contains a web URL
+        self.on_demand = on_demand # Only offered when triggered or added by the agent, never in the "all tools" fallback
+
+
+class LazyTool:
+    """Callable stand-in for a tool function that imports the tool module on first call."""
+    def __init__(self, spec, loader):
+        self.spec = spec
+        self.__name__ = spec.name
+        self.serial_only = spec.serial_only
+        self.inline_result = spec.inline_result
+        self._loader = loader
+        self._function = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._function is None:
+            with self._lock:
+                if self._function is None:
+                    self._function = self._loader(self.spec.name)
+        return self._function
+
+    def __call__(self, *args, **kwargs):
+        return self.load()(*args, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self._function is not None else "not loaded"
+        return f"<LazyTool {self.spec.name} ({state})>"
+
+
+TOOL_SPECS = [
+    ToolSpec("generate_ai_image", { "type": "function", "function": { "name": "generate_ai_image", "description": "Generate an image from a text prompt. Use when asked to create, draw, or visualize something.", "parameters": { "type": "object", "properties": { "prompt": {"type": "string", "description": "Detailed description of the image."}, "model": {"type": "string", "description": "Optional: Image model (e.g., 'flux', 'turbo')."}, "width": {"type": "integer", "description": "Optional: Image width."}, "height": {"type": "integer", "description": "Optional: Image height."}, "seed": {"type": "integer", "description": "Optional: Seed for reproducible output; repeated requests with the same seed reuse the saved image."}, }, "required": ["prompt"]}}}, triggers=(r"\b(generate|create|draw|paint|render|sketch|design|make)\b.*\b(image|picture|photo|drawing|illustration|logo|icon|art|wallpaper)", r"\b(draw|paint|sketch|visuali[sz]e|illustrate)\b", r"\bseed\b")),
+    ToolSpec("analyze_image_content", { "type": "function", "function": { "name": "analyze_image_content", "description": "Analyzes an image (from URL or local path) to describe it or answer questions about it.", "parameters": { "type": "object", "properties": { "image_url_or_path": {"type": "string", "description": "URL or local path of the image."}, "analysis_prompt": {"type": "string", "description": "Specific question/focus for analysis (e.g., 'What color is the car?'). Defaults to general description."}, }, "required": ["image_url_or_path"]}}}, triggers=(r"\b(describe|analy[sz]e|look at|what'?s in|what is in|caption|ocr|read the text)\b.*\b(image|picture|photo|screenshot|scan)", r"\b(image|picture|photo|screenshot)\b.*\b(show|depict|contain|describe|analy[sz]e|caption|what'?s in|what is in)"), extensions=("jpg", "jpeg", "png", "gif", "webp", "bmp")),
+    ToolSpec("transcribe_audio_file", { "type": "function", "function": { "name": "transcribe_audio_file", "description": "Transcribes speech from a local audio file into text.", "parameters": { "type": "object", "properties": { "audio_file_path": {"type": "string", "description": "Local path of the audio file."}, }, "required": ["audio_file_path"]}}}, triggers=(r"\btranscri(be|ption|pt)", r"\b(recording|voicemail|podcast|dictation)\b"), extensions=("wav", "mp3", "m4a", "ogg", "flac", "aac", "webm", "opus")),
+    ToolSpec("generate_speech_audio", { "type": "function", "function": { "name": "generate_speech_audio", "description": "Converts text to speech audio, saves it, and automatically plays it. Use when asked to 'say', 'speak', or 'read aloud'.", "parameters": { "type": "object", "properties": { "text_to_speak": {"type": "string", "description": "Text to convert to speech."}, "voice": {"type": "string", "enum": ["alloy", "echo", "fable", "onyx", "nova", "shimmer"], "description": "Voice for TTS. Defaults to 'alloy'."}, "auto_play": {"type": "boolean", "description": "Whether to automatically play the audio after generation. Defaults to true."}, "merge_output": {"type": "boolean", "description": "For long text spoken in chunks: also write one merged audio file. Defaults to true."} }, "required": ["text_to_speak"]}}}, triggers=(r"\b(say|speak|read (it |this |that )?(aloud|out)|pronounce|text[- ]to[- ]speech|tts|voice)\b", r"\b(alloy|echo|fable|onyx|nova|shimmer)\b")),
+    ToolSpec("simple_web_search", { "type": "function", "function": { "name": "simple_web_search", "description": "Fetches a single web page given its URL and returns its main readable text (title and body, without scripts or navigation). Useful for finding current information or details from a specific website.", "parameters": { "type": "object", "properties": { "url": {"type": "string", "description": "The URL of the webpage to search/fetch."}, }, "required": ["url"]}}}, triggers=(r"\b(web ?page|website|webpage|site|url|link|browse|fetch)\b",), handles_urls=True),
+    ToolSpec("fetch_many_urls", { "type": "function", "function": { "name": "fetch_many_urls", "description": "Fetches several web pages at once (concurrently) and returns a condensed readable-text excerpt of each. Prefer this over repeated simple_web_search calls when several URLs are needed.", "parameters": { "type": "object", "properties": { "urls": {"type": "array", "items": {"type": "string"}, "description": "The URLs to fetch (http:// or https://)."}, "max_chars_per_url": {"type": "integer", "description": "Optional: Maximum characters of text returned per page."}, }, "required": ["urls"]}}}, triggers=(r"\b(web ?pages|websites|sites|urls|links)\b",), handles_urls=True),
+    ToolSpec("calculator", { "type": "function", "function": { "name": "calculator", "description": "Evaluates simple mathematical expressions (e.g., '2+2', '100*3.14/2'). Use for calculations. Only supports basic arithmetic operations: +, -, *, / and parentheses. For many calculations use one call: pass a list of 'expressions', and/or named number lists in 'variables' to evaluate an expression element-wise (e.g. 'price*qty' over table columns).", "parameters": { "type": "object", "properties": { "expression": {"type": "string", "description": "The mathematical expression to evaluate."}, "expressions": {"type": "array", "items": {"type": "string"}, "description": "Optional: Several expressions evaluated in one batch."}, "variables": {"type": "object", "additionalProperties": {"type": "array", "items": {"type": "number"}}, "description": "Optional: Named lists of numbers usable as variables in the expression(s); results are element-wise lists."}, }, "required": []}}}, triggers=(r"\d\s*[-+*/^%]\s*\(?\s*[\d.]", r"\d\s*%", r"\d\s*(plus|minus|times|multiplied by|divided by|over|to the power of|squared|cubed)\b", r"\b(calculate|compute|evaluate|arithmetic|sum of|product of|percent(age)?|square root|how much is)\b")),
+    ToolSpec("read_tool_result", { "type": "function", "function": { "name": "read_tool_result", "description": "Reads part of a large earlier tool result that was stored out of band (its role=tool message shows a 'blob' handle and a preview). Request only the range you need.", "parameters": { "type": "object", "properties": { "blob": {"type": "string", "description": "The blob handle, e.g. 'blob_3f2a...'."}, "start": {"type": "integer", "description": "Optional: First line (1-based) or byte offset (0-based). Defaults to the beginning."}, "end": {"type": "integer", "description": "Optional: Last line (inclusive) or end byte offset (exclusive). Defaults to the end."}, "unit": {"type": "string", "enum": ["lines", "bytes"], "description": "Optional: Range unit. Defaults to 'lines'."}, }, "required": ["blob"]}}}, triggers=(r"\bblob_[0-9a-f]",), inline_result=True, on_demand=True),
+]
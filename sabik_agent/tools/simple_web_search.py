@@ -1,17 +1,33 @@
 import requests
-from ..interface import console, Panel
+from .. import output
+from ..web import fetch_page
 
 def simple_web_search(url, *, session, client, config, **kwargs):
-    console.print(Panel(f"Tool: Simple Web Search\nURL: [link={url}]{url}[/link]", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
+    output.tool_call("Simple Web Search", {"URL": [url]})
     try:
         if not url.startswith(('http://', 'https://')):
             return {"status": "error", "message": "Invalid URL. Must start with http:// or https://"}
-        console.print(f"[grey50 i]Fetching {url}...[/grey50 i]")
-        response = session.get(url, timeout=10)
-        response.raise_for_status()
-        content_summary = f"Successfully fetched content from {url}. Content length: {len(response.text)}. (Full content parsing not implemented in this simple tool)."
-        return {"status": "success", "url": url, "summary": content_summary, "message": f"Fetched content from {url}."}
+        output.message(f"Fetching {url}...", "detail")
+        page = fetch_page(session, url, max_bytes=config.WEB_MAX_BYTES, max_chars=config.WEB_MAX_CHARS, timeout=config.WEB_TIMEOUT)
+        if page["cache"] == "revalidated":
+            output.message("Not modified since last fetch; using cached text.", "detail")
+        message = f"Fetched {len(page['text'])} characters of text from {url}."
+        if page["truncated"]:
+            message += " Content was truncated to the configured size limit."
+        return {
+            "status": "success",
+            "url": url,
+            "final_url": page["final_url"],
+            "title": page["title"],
+            "content": page["text"],
+            "truncated": page["truncated"],
+            "bytes_read": page["bytes_read"],
+            "cache": page["cache"],
+            "message": message,
+        }
     except requests.exceptions.RequestException as e:
         return {"status": "error", "url": url, "message": f"Failed to fetch URL {url}: {str(e)}"}
+    except ValueError as e:
+        return {"status": "error", "url": url, "message": str(e)}
     except Exception as e:
         return {"status": "error", "url": url, "message": f"An unexpected error occurred during web search for {url}: {str(e)}"}
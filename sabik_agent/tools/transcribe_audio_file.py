@@ -1,36 +1,244 @@
+import os
+import re
+import importlib.util
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
 from .. import utils
-from ..interface import console, Panel
+from .. import tracing
+from ..cache import get_result_cache, file_sha256, make_key
+from .. import output
+
+TRANSCRIPTION_MODEL = "openai-audio"
+TRANSCRIPTION_PROMPT = "Transcribe the following audio."
+SILENCE_FRAME_SECONDS = 0.02 # Energy is measured over 20 ms frames when looking for a cut point
+MIN_OVERLAP_WORDS = 2 # Shorter matches at segment joins are treated as coincidence
+MAX_OVERLAP_WORDS = 40
+SEGMENT_RATE = 16000 # Segments are sent as 16 kHz mono 16-bit WAV: plenty for speech, ~4 MB per 2 minutes
 
 def _api_call_llm_for_vision_or_stt(client, messages, model):
     payload = {"model": model, "messages": messages, "stream": False}
     try:
-        console.print(Panel(f"Model: {model}", title=f"[bold blue]Internal API Call: {model}[/]", border_style="blue", expand=False, width=80))
+        output.panel(f"Internal API Call: {model}", f"Model: {model}")
         response = client.chat.completions.create(**payload)
         if not response.choices:
-            console.print("[red]Error: No choices from API.[/red]")
+            output.message("Error: No choices from API.", "error")
             return None
         content = response.choices[0].message.content
-        console.print(Panel(f"{content[:150]}...", title="[bold green]Internal Result[/]", border_style="green", expand=False, width=80))
+        output.panel("Internal Result", f"{content[:150]}...", "success")
         return content
     except Exception as e:
-        console.print(Panel(f"Error: {e}", title=f"[bold red]{model} API Error[/]", border_style="red"))
+        output.panel(f"{model} API Error", f"Error: {e}", "error")
         return None
 
-def transcribe_audio_file(audio_file_path, *, session, client, config, **kwargs):
-    console.print(Panel(f"Tool: Transcribe Audio\nFile: {audio_file_path}", title="[bold dark_orange]Tool Call[/]", border_style="dark_orange", expand=False))
-    base64_audio, audio_format = utils.encode_audio_base64(audio_file_path)
-    if not base64_audio:
-        return {"status": "error", "message": f"Could not load or encode audio file: {audio_file_path}"}
+class _WavSource:
+    """PCM access to a WAV file without loading it (frames are read on demand)."""
+    def __init__(self, path):
+        with wave.open(path, "rb") as wav:
+            self.rate, self.channels, self.width, self.nframes = wav.getframerate(), wav.getnchannels(), wav.getsampwidth(), wav.getnframes()
+        self.path = path
+
+    def read(self, start, count):
+        with wave.open(self.path, "rb") as wav:
+            wav.setpos(start)
+            return wav.readframes(count)
+
+class _PydubSource:
+    """PCM access to any format pydub/FFmpeg can decode (decoded once, in memory, at the segment format)."""
+    def __init__(self, path):
+        from pydub import AudioSegment
+        segment = AudioSegment.from_file(path).set_channels(1).set_frame_rate(SEGMENT_RATE).set_sample_width(2)
+        self.rate, self.channels, self.width = segment.frame_rate, segment.channels, segment.sample_width
+        self.raw = segment.raw_data
+        self.nframes = len(self.raw) // (self.channels * self.width)
+
+    def read(self, start, count):
+        frame_bytes = self.channels * self.width
+        return self.raw[start * frame_bytes:(start + count) * frame_bytes]
+
+def _probe_duration(path):
+    """Duration in seconds from the WAV header or the container metadata (ffprobe), without decoding; None if unknown."""
+    try:
+        if path.lower().endswith(".wav"):
+            with wave.open(path, "rb") as wav:
+                return wav.getnframes() / wav.getframerate()
+        if importlib.util.find_spec("pydub") is not None:
+            from pydub.utils import mediainfo
+            return float(mediainfo(path)["duration"])
+    except Exception:
+        pass
+    return None
+
+def _open_pcm_source(path):
+    """Returns a PCM source for splitting, or None if the file cannot be decoded locally."""
+    try:
+        if path.lower().endswith(".wav"):
+            return _WavSource(path)
+        if importlib.util.find_spec("pydub") is not None:
+            return _PydubSource(path)
+    except Exception as e:
+        output.message(f"Warn: Could not decode {path} for segmenting ({e}); sending it whole.", "warning")
+    return None
+
+def _samples(source, raw):
+    """Interleaved PCM bytes as float samples on the 16-bit scale, or None for an unsupported sample width."""
+    if source.width == 1:
+        return (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128) * 256 # 8-bit WAV is unsigned
+    if source.width == 2:
+        return np.frombuffer(raw, dtype="<i2").astype(np.float64)
+    if source.width == 3:
+        packed = np.frombuffer(raw[: len(raw) // 3 * 3], dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = packed[:, 0] | (packed[:, 1] << 8) | (packed[:, 2] << 16)
+        return np.where(values >= 1 << 23, values - (1 << 24), values).astype(np.float64) / 256
+    if source.width == 4:
+        return np.frombuffer(raw, dtype="<i4").astype(np.float64) / 65536
+    return None
+
+def _speech_pcm(source, raw):
+    """Downmixes PCM frames to mono and resamples them to SEGMENT_RATE as 16-bit little-endian samples."""
+    samples = _samples(source, raw)
+    if samples is None:
+        raise ValueError(f"Unsupported sample width: {source.width} bytes")
+    if source.channels > 1:
+        samples = samples[: len(samples) // source.channels * source.channels].reshape(-1, source.channels).mean(axis=1)
+    if source.rate != SEGMENT_RATE and len(samples):
+        step = source.rate / SEGMENT_RATE
+        if step >= 2: # Box filter against the worst aliasing before decimating
+            width = int(step)
+            samples = np.convolve(samples, np.ones(width) / width, mode="same")
+        samples = np.interp(np.arange(int(len(samples) / step)) * step, np.arange(len(samples)), samples)
+    return np.clip(np.round(samples), -32768, 32767).astype("<i2").tobytes()
+
+def _quietest_frame(source, start, end):
+    """Frame index of the lowest-energy 20 ms window in [start, end), or the midpoint if unknown."""
+    samples = _samples(source, source.read(start, end - start)) if end > start else None
+    if samples is None:
+        return (start + end) // 2
+    window = max(1, int(source.rate * SILENCE_FRAME_SECONDS))
+    frames = samples[: (len(samples) // (window * source.channels)) * window * source.channels].reshape(-1, window * source.channels)
+    if not len(frames):
+        return (start + end) // 2
+    quietest = int(np.argmin(np.sqrt(np.mean(frames ** 2, axis=1))))
+    return start + quietest * window + window // 2
 
+def _plan_segments(source, segment_seconds, overlap_seconds):
+    """Splits the recording near every segment_seconds at the quietest point nearby; segments overlap by overlap_seconds."""
+    segment_frames = int(segment_seconds * source.rate)
+    search_frames = int(min(10.0, segment_seconds / 4) * source.rate)
+    overlap_frames = int(overlap_seconds * source.rate)
+    cuts = [0]
+    while source.nframes - cuts[-1] > segment_frames * 1.25: # Avoid a tiny trailing segment
+        target = cuts[-1] + segment_frames
+        cuts.append(_quietest_frame(source, target - search_frames, min(source.nframes, target + search_frames)))
+    cuts.append(source.nframes)
+    return [(max(0, a - overlap_frames), min(source.nframes, b + overlap_frames)) for a, b in zip(cuts, cuts[1:])]
+
+def _write_wav_segment(source, start, end):
+    """Writes frames [start, end) as a 16 kHz mono 16-bit WAV, a fraction of the source's size at CD rates."""
+    fd, path = tempfile.mkstemp(prefix=".segment_", suffix=".wav")
+    os.close(fd)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SEGMENT_RATE)
+        wav.writeframes(_speech_pcm(source, source.read(start, end - start)))
+    return path
+
+def _normalize_word(word):
+    return re.sub(r"[^\w']", "", word.lower())
+
+def _merge_overlap(previous_text, next_text):
+    """Appends next_text to previous_text, dropping words repeated because of the segment overlap."""
+    if not previous_text:
+        return next_text
+    previous_words = previous_text.split()
+    next_words = next_text.split()
+    tail = [_normalize_word(w) for w in previous_words[-MAX_OVERLAP_WORDS:]]
+    head = [_normalize_word(w) for w in next_words[:MAX_OVERLAP_WORDS]]
+    for size in range(min(len(tail), len(head)), MIN_OVERLAP_WORDS - 1, -1):
+        if tail[-size:] == head[:size]:
+            next_words = next_words[size:]
+            break
+    return " ".join(previous_words + next_words)
+
+def _transcribe_file(client, audio_path):
+    base64_audio, audio_format = utils.encode_audio_base64(audio_path)
+    if not base64_audio:
+        return None
     messages = [
         {"role": "system", "content": "You are an AI transcription service."},
         {"role": "user", "content": [
-            {"type": "text", "text": "Transcribe the following audio."},
+            {"type": "text", "text": TRANSCRIPTION_PROMPT},
             {"type": "input_audio", "input_audio": {"data": base64_audio, "format": audio_format}}
         ]}
     ]
-    transcription = _api_call_llm_for_vision_or_stt(client, messages, model="openai-audio")
+    return _api_call_llm_for_vision_or_stt(client, messages, model=TRANSCRIPTION_MODEL)
+
+def _transcribe_long_audio(client, source, config):
+    """Transcribes overlapping segments concurrently and stitches them in order. Returns (text, segment_count, failed_segments)."""
+    segments = _plan_segments(source, config.TRANSCRIBE_SEGMENT_SECONDS, config.TRANSCRIBE_OVERLAP_SECONDS)
+    output.panel("Segmented Transcription", f"Long recording ({source.nframes / source.rate:.0f}s): {len(segments)} segments, up to {config.TRANSCRIBE_MAX_WORKERS} in parallel")
+
+    def transcribe_segment(bounds):
+        segment_path = _write_wav_segment(source, *bounds)
+        try:
+            return _transcribe_file(client, segment_path)
+        finally:
+            os.remove(segment_path)
+
+    with ThreadPoolExecutor(max_workers=max(1, config.TRANSCRIBE_MAX_WORKERS), thread_name_prefix="sabik-stt") as executor:
+        texts = list(executor.map(tracing.bind(transcribe_segment), segments))
+
+    transcription = ""
+    failed_segments = []
+    for index, text in enumerate(texts):
+        if text:
+            transcription = _merge_overlap(transcription, text.strip())
+        else:
+            failed_segments.append(index)
+    return transcription, len(segments), failed_segments
+
+def transcribe_audio_file(audio_file_path, *, session, client, config, **kwargs):
+    output.tool_call("Transcribe Audio", {"File": audio_file_path})
+    cache = get_result_cache("transcriptions")
+    cache_key = None
+    if cache and os.path.isfile(audio_file_path):
+        cache_key = make_key("transcribe_audio_file", file_sha256(audio_file_path), TRANSCRIPTION_PROMPT, TRANSCRIPTION_MODEL)
+        cached_transcription = cache.get(cache_key)
+        if cached_transcription is not None:
+            output.message(f"Cache hit for transcription of {audio_file_path}", "detail")
+            return {"status": "success", "transcription": cached_transcription, "cache": "hit"}
+
+    if not os.path.exists(audio_file_path):
+        return {"status": "error", "message": f"Could not load or encode audio file: {audio_file_path}"}
+
+    # Long recordings are split into overlapping segments that are transcribed concurrently.
+    # The duration comes from the header/container first, so short files are never decoded here.
+    long_seconds = config.TRANSCRIBE_SEGMENT_SECONDS * 1.5
+    source = None
+    if config.TRANSCRIBE_LONG_AUDIO:
+        duration = _probe_duration(audio_file_path)
+        if duration is None or duration > long_seconds:
+            source = _open_pcm_source(audio_file_path)
+    if source and source.nframes > source.rate * long_seconds:
+        transcription, segment_count, failed_segments = _transcribe_long_audio(client, source, config)
+        if not transcription:
+            return {"status": "error", "message": "Audio transcription failed for every segment."}
+        if cache_key and not failed_segments:
+            cache.set(cache_key, transcription)
+        result = {"status": "success", "transcription": transcription, "segments": segment_count, "cache": "miss" if cache_key else "disabled"}
+        if failed_segments:
+            result["failed_segments"] = failed_segments
+            result["message"] = f"{len(failed_segments)} of {segment_count} segments could not be transcribed; the text has gaps."
+        return result
+
+    transcription = _transcribe_file(client, audio_file_path)
     if transcription:
-        return {"status": "success", "transcription": transcription}
+        if cache_key:
+            cache.set(cache_key, transcription)
+        return {"status": "success", "transcription": transcription, "cache": "miss" if cache_key else "disabled"}
     else:
         return {"status": "error", "message": "Audio transcription failed."}
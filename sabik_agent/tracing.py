@@ -0,0 +1,249 @@
+# sabik_agent/tracing.py
+"""
+Lightweight span-based instrumentation (TRACE_ENABLED).
+
+    with tracing.span("llm.request", model=model) as span:
+        ...
+        span.set(prompt_tokens=120, bytes_sent=4096)
+
+Spans nest through a context variable: every span opened inside another one (on the same
+thread, the same asyncio task, or a worker started through `tracing.bind`) shares its
+trace_id and points at it as parent. Each user turn is one trace. Finished spans are
+appended to TRACE_FILE as JSON lines:
+
+    {"trace_id", "span_id", "parent_id", "name", "start", "duration_ms", "error", "attrs"}
+
+and folded into process-wide metrics, rewritten as Prometheus text to TRACE_METRICS_FILE
+whenever a root span ends. Attributes with these names are also aggregated as metrics:
+bytes_sent / bytes_received, prompt_tokens / completion_tokens and cache (hit, miss, ...).
+
+When tracing is disabled, span() returns a shared no-op object: one flag check per call.
+Use `span.recording` to skip computing attributes that are expensive (e.g. payload sizes).
+"""
+import atexit
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import deque
+
+from . import config as app_config
+
+QUANTILES = (0.5, 0.9, 0.99)
+DURATION_WINDOW = 1024 # Recent durations per span name kept for the quantiles
+
+_current = contextvars.ContextVar("sabik_span", default=None)
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+class _NoopSpan:
+    recording = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+    def record_error(self, exc):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    recording = True
+
+    def __init__(self, tracer, name, attrs):
+        self._tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = None
+        self.trace_id = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def record_error(self, exc):
+        """Marks the span as failed for an exception that was handled inside it."""
+        self.error = f"{type(exc).__name__}: {exc}"
+
+    def __enter__(self):
+        self.parent = _current.get()
+        self.trace_id = self.parent.trace_id if self.parent else uuid.uuid4().hex
+        self._token = _current.set(self)
+        self.start = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.duration = time.perf_counter() - self._started
+        if exc is not None and self.error is None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        try:
+            _current.reset(self._token)
+        except ValueError: # Exited in another context (e.g. a generator closed elsewhere)
+            _current.set(self.parent)
+        self._tracer.finish(self)
+        return False
+
+
+class Tracer:
+    def __init__(self, trace_path, metrics_path):
+        self.trace_path = trace_path
+        self.metrics_path = metrics_path
+        self._lock = threading.Lock()
+        self._pending = []
+        self._durations = {} # span name -> {"count", "sum", "errors", "recent"}
+        self._counters = {} # (metric, labels) -> value
+
+    def finish(self, span):
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent.span_id if span.parent else None,
+            "name": span.name,
+            "start": round(span.start, 6),
+            "duration_ms": round(span.duration * 1000, 3),
+            "error": span.error,
+            "attrs": span.attrs,
+        }
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._pending.append(line)
+            self._observe(span)
+        if span.parent is None:
+            self.flush()
+
+    def _observe(self, span):
+        stats = self._durations.get(span.name)
+        if stats is None:
+            stats = self._durations[span.name] = {"count": 0, "sum": 0.0, "errors": 0, "recent": deque(maxlen=DURATION_WINDOW)}
+        stats["count"] += 1
+        stats["sum"] += span.duration
+        stats["recent"].append(span.duration)
+        if span.error:
+            stats["errors"] += 1
+        attrs = span.attrs
+        for direction in ("sent", "received"):
+            value = attrs.get(f"bytes_{direction}")
+            if isinstance(value, (int, float)):
+                self._add("sabik_bytes_total", (("span", span.name), ("direction", direction)), value)
+        for kind in ("prompt", "completion"):
+            value = attrs.get(f"{kind}_tokens")
+            if isinstance(value, (int, float)):
+                self._add("sabik_llm_tokens_total", (("kind", kind),), value)
+        outcome = attrs.get("cache")
+        if isinstance(outcome, str):
+            self._add("sabik_cache_lookups_total", (("span", span.name), ("outcome", outcome)), 1)
+
+    def _add(self, metric, labels, value):
+        key = (metric, labels)
+        self._counters[key] = self._counters.get(key, 0) + value
+
+    def flush(self):
+        """Appends pending spans to the trace file and rewrites the metrics file."""
+        with self._lock:
+            lines, self._pending = self._pending, []
+            metrics = self.prometheus_text() if self.metrics_path else None
+        try:
+            if lines and self.trace_path:
+                os.makedirs(os.path.dirname(self.trace_path) or ".", exist_ok=True)
+                with open(self.trace_path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(lines) + "\n")
+            if metrics is not None:
+                _write_atomic(self.metrics_path, metrics)
+        except OSError:
+            pass # Tracing must never break the agent
+
+    def prometheus_text(self):
+        out = [
+            "# HELP sabik_span_duration_seconds Wall time of instrumented operations.",
+            "# TYPE sabik_span_duration_seconds summary",
+        ]
+        for name, stats in sorted(self._durations.items()):
+            recent = sorted(stats["recent"])
+            for q in QUANTILES:
+                value = recent[min(len(recent) - 1, int(q * len(recent)))]
+                out.append(f'sabik_span_duration_seconds{{span="{name}",quantile="{q}"}} {value:.6f}')
+            out.append(f'sabik_span_duration_seconds_sum{{span="{name}"}} {stats["sum"]:.6f}')
+            out.append(f'sabik_span_duration_seconds_count{{span="{name}"}} {stats["count"]}')
+        out += ["# HELP sabik_span_errors_total Instrumented operations that raised.", "# TYPE sabik_span_errors_total counter"]
+        for name, stats in sorted(self._durations.items()):
+            out.append(f'sabik_span_errors_total{{span="{name}"}} {stats["errors"]}')
+        helps = {
+            "sabik_bytes_total": "Payload bytes sent and received.",
+            "sabik_llm_tokens_total": "Token usage reported by the LLM API.",
+            "sabik_cache_lookups_total": "Cache lookups by outcome.",
+        }
+        for metric, help_text in helps.items():
+            out += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+            for (name, labels), value in sorted(self._counters.items()):
+                if name == metric:
+                    label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                    out.append(f"{metric}{{{label_text}}} {value}")
+        return "\n".join(out) + "\n"
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def configure(enabled=True, trace_path=None, metrics_path=None):
+    """(Re)configures tracing at runtime; defaults come from TRACE_FILE / TRACE_METRICS_FILE."""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is not None:
+            _tracer.flush()
+        _tracer = Tracer(trace_path or app_config.TRACE_FILE, metrics_path or app_config.TRACE_METRICS_FILE) if enabled else None
+    return _tracer
+
+
+def span(name, **attrs):
+    """Context manager timing a block; a shared no-op when tracing is disabled."""
+    if _tracer is None:
+        return NOOP_SPAN
+    return Span(_tracer, name, attrs)
+
+
+def current():
+    """The innermost open span (the no-op span if none or disabled)."""
+    return (_current.get() if _tracer is not None else None) or NOOP_SPAN
+
+
+def bind(fn):
+    """Wraps fn to run in the caller's context, so spans in worker threads keep their parent."""
+    if _tracer is None:
+        return fn
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs) # A Context can't be entered by two threads at once
+
+
+def flush():
+    if _tracer is not None:
+        _tracer.flush()
+
+
+if app_config.TRACE_ENABLED:
+    configure()
+atexit.register(flush)
@@ -0,0 +1,450 @@
+# sabik_agent/transport.py
+"""
+Shared outbound HTTP transport for tools (requests) and the OpenAI clients (httpx).
+
+Every request goes through the same policy:
+- sized, keep-alive connection pools (HTTP_POOL_CONNECTIONS hosts x HTTP_POOL_MAXSIZE connections);
+- retries of connection errors, timeouts and 429/5xx responses with jittered exponential
+  backoff ("full jitter"), honouring a Retry-After header when the server sends one.
+  Non-idempotent requests (POST: chat, TTS) are retried only when they were never sent
+  (connect errors) or the server refused them (429/503). Read timeouts longer than
+  HTTP_RETRY_READ_TIMEOUT_MAX are not retried and open the endpoint's circuit at once;
+- a per-endpoint (scheme://host) circuit breaker: after CIRCUIT_FAILURE_THRESHOLD consecutive
+  failures the endpoint fails fast for CIRCUIT_RESET_SECONDS, then a single probe request
+  decides whether it is closed again.
+The OpenAI clients are built with max_retries=0 so retries happen here only. Callers with an
+overall time limit wrap requests in `deadline(...)`: attempts are cut to the time left and no
+retry starts after it.
+With CASSETTE_MODE set, exchanges are also recorded to, or replayed from, a cassette file
+(see cassette.py); replayed requests skip the network, retries and the breaker.
+"""
+import asyncio
+import contextlib
+import contextvars
+import email.utils
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from . import config as app_config
+from . import tracing
+from .cassette import get_cassette
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+REFUSED_STATUSES = frozenset({429, 503}) # The server did not process the request, so any method may be resent
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+
+_deadline = contextvars.ContextVar("sabik_http_deadline", default=None)
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised (instead of sending) while an endpoint's circuit is open."""
+
+
+@contextlib.contextmanager
+def deadline(at):
+    """Bounds the requests-session calls made in this block by `at`, a time.monotonic() value."""
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def _time_left():
+    at = _deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+def _clamp_timeout(timeout, left):
+    if isinstance(timeout, tuple):
+        return tuple(left if part is None else min(part, left) for part in timeout)
+    return left if timeout is None else min(timeout, left)
+
+
+class RetryPolicy:
+    def __init__(self, max_retries, backoff_base, backoff_max, retry_after_max):
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_after_max = retry_after_max
+
+    def delay(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (0-based)."""
+        seconds = _parse_retry_after(retry_after)
+        if seconds is not None:
+            return min(seconds, self.retry_after_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+def _parse_retry_after(value):
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._endpoints = {} # endpoint -> {"failures", "opened_at", "probing"}
+
+    def admit(self, endpoint):
+        """
+        Returns (blocked, probe): blocked is None if a request may be sent, else a message explaining
+        why the circuit is open; probe is True for the single half-open probe request, whose caller
+        must call end_probe() once it has an outcome, whatever that outcome is.
+        """
+        if self.failure_threshold <= 0:
+            return None, False
+        with self._lock:
+            state = self._endpoints.get(endpoint)
+            if state is None or state["opened_at"] is None:
+                return None, False
+            remaining = self.reset_seconds - (time.monotonic() - state["opened_at"])
+            if remaining > 0:
+                return f"Circuit open for {endpoint} after {state['failures']} consecutive failures; retry in {remaining:.0f}s.", False
+            if state["probing"]:
+                return f"Circuit half-open for {endpoint}; waiting for the probe request.", False
+            state["probing"] = True # Half-open: let exactly one request through
+            return None, True
+
+    def end_probe(self, endpoint):
+        """Frees the half-open slot, so a probe that ended without success or failure doesn't block the endpoint."""
+        with self._lock:
+            state = self._endpoints.get(endpoint)
+            if state is not None:
+                state["probing"] = False
+
+    def record_success(self, endpoint):
+        with self._lock:
+            self._endpoints.pop(endpoint, None)
+
+    def record_failure(self, endpoint, trip=False):
+        """Counts a failure; trip=True opens the circuit at once (e.g. a long read timeout)."""
+        with self._lock:
+            state = self._endpoints.setdefault(endpoint, {"failures": 0, "opened_at": None, "probing": False})
+            state["failures"] += 1
+            state["probing"] = False
+            if trip or state["failures"] >= self.failure_threshold or state["opened_at"] is not None:
+                state["opened_at"] = time.monotonic()
+
+    def state(self, endpoint):
+        with self._lock:
+            state = self._endpoints.get(endpoint)
+            if state is None or state["opened_at"] is None:
+                return "closed"
+            return "half-open" if state["probing"] else "open"
+
+
+def _endpoint(url):
+    parts = urlsplit(str(url))
+    return f"{parts.scheme}://{parts.netloc.lower()}"
+
+
+def _is_failure_status(status_code):
+    # 429 means "slow down", not "endpoint is dead": retried, but doesn't trip the breaker
+    return status_code >= 500
+
+
+def _trace_response(span, response):
+    length = response.headers.get("Content-Length")
+    span.set(status=response.status_code)
+    if length and length.isdigit(): # Streamed bodies are counted by their consumers
+        span.set(bytes_received=int(length))
+
+
+def _should_retry(transport, endpoint, attempt, replayable=True):
+    # Stop early once our own failures have opened the circuit
+    return replayable and attempt < transport.policy.max_retries and transport.breaker.state(endpoint) != "open"
+
+
+def _status_retryable(method, status_code):
+    return status_code in RETRY_STATUSES and (method in IDEMPOTENT_METHODS or status_code in REFUSED_STATUSES)
+
+
+def _is_long_read_timeout(read_timeout):
+    return read_timeout is None or read_timeout > app_config.HTTP_RETRY_READ_TIMEOUT_MAX
+
+
+def _requests_read_timeout(timeout):
+    return timeout[1] if isinstance(timeout, tuple) else timeout
+
+
+def _requests_not_sent(exc):
+    """True if a requests error happened before any of the request reached the server."""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], "reason", exc.args[0]) if exc.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+class ResilientHTTPAdapter(HTTPAdapter):
+    """requests adapter applying the shared retry policy and circuit breaker."""
+    def __init__(self, policy=None, breaker=None, **kwargs):
+        self.policy = policy or default_policy()
+        self.breaker = breaker or default_breaker()
+        kwargs.setdefault("pool_connections", app_config.HTTP_POOL_CONNECTIONS)
+        kwargs.setdefault("pool_maxsize", app_config.HTTP_POOL_MAXSIZE)
+        super().__init__(max_retries=0, **kwargs)
+
+    def send(self, request, **kwargs):
+        endpoint = _endpoint(request.url)
+        # Streamed (iterator / file) bodies cannot be replayed
+        replayable = request.body is None or isinstance(request.body, (bytes, str))
+        cassette = get_cassette()
+        with tracing.span("http.request", method=request.method, endpoint=endpoint) as span:
+            if isinstance(request.body, (bytes, str)):
+                span.set(bytes_sent=len(request.body))
+            if cassette is not None and cassette.replaying:
+                span.set(replayed=True)
+                response = cassette.replay_requests(request)
+            else:
+                started = time.perf_counter()
+                response = self._send_with_retries(request, endpoint, replayable, span, **kwargs)
+                if cassette is not None:
+                    response = cassette.record_requests(request, response, started)
+            _trace_response(span, response)
+            return response
+
+    def _send_with_retries(self, request, endpoint, replayable, span, **kwargs):
+        attempt = 0
+        while True:
+            left = _time_left()
+            if left is not None:
+                if left <= 0:
+                    raise requests.exceptions.Timeout(f"Deadline reached before sending to {endpoint}.", request=request)
+                kwargs["timeout"] = _clamp_timeout(kwargs.get("timeout"), left)
+            blocked, probe = self.breaker.admit(endpoint)
+            if blocked:
+                raise CircuitOpenError(blocked, request=request)
+            span.set(attempts=attempt + 1)
+            try:
+                response = super().send(request, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                long_read = isinstance(exc, requests.exceptions.ReadTimeout) and _is_long_read_timeout(_requests_read_timeout(kwargs.get("timeout")))
+                self.breaker.record_failure(endpoint, trip=long_read)
+                sendable = request.method in IDEMPOTENT_METHODS or _requests_not_sent(exc)
+                if long_read or not sendable or not _should_retry(self, endpoint, attempt, replayable):
+                    raise
+                delay = self.policy.delay(attempt)
+                if left is not None and delay >= _time_left():
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUSES or (probe and response.status_code == 429):
+                    # A 429 probe still shows the endpoint is up
+                    self.breaker.record_success(endpoint)
+                elif _is_failure_status(response.status_code):
+                    self.breaker.record_failure(endpoint)
+                if not _status_retryable(request.method, response.status_code) or not _should_retry(self, endpoint, attempt, replayable):
+                    return response
+                delay = self.policy.delay(attempt, response.headers.get("Retry-After"))
+                if left is not None and delay >= _time_left():
+                    return response
+                response.close()
+            finally:
+                if probe:
+                    self.breaker.end_probe(endpoint)
+            time.sleep(delay)
+            attempt += 1
+
+
+class _HttpxRetryMixin:
+    def _admit(self, request):
+        """Raises while the circuit is open; returns True if this attempt is the half-open probe."""
+        blocked, probe = self.breaker.admit(_endpoint(request.url))
+        if blocked:
+            raise httpx.ConnectError(blocked, request=request)
+        return probe
+
+    def _after_response(self, request, response, attempt, probe=False):
+        """Returns the delay before the next attempt, or None if the response is final."""
+        endpoint = _endpoint(request.url)
+        if response.status_code not in RETRY_STATUSES or (probe and response.status_code == 429):
+            self.breaker.record_success(endpoint)
+        elif _is_failure_status(response.status_code):
+            self.breaker.record_failure(endpoint)
+        if not _status_retryable(request.method, response.status_code) or not _should_retry(self, endpoint, attempt):
+            return None
+        return self.policy.delay(attempt, response.headers.get("Retry-After"))
+
+    def _after_error(self, request, attempt, exc):
+        endpoint = _endpoint(request.url)
+        long_read = isinstance(exc, httpx.ReadTimeout) and _is_long_read_timeout(request.extensions.get("timeout", {}).get("read"))
+        self.breaker.record_failure(endpoint, trip=long_read)
+        sendable = request.method in IDEMPOTENT_METHODS or isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+        if long_read or not sendable or not _should_retry(self, endpoint, attempt):
+            return None
+        return self.policy.delay(attempt)
+
+
+class ResilientHTTPTransport(_HttpxRetryMixin, httpx.HTTPTransport):
+    """httpx transport (sync OpenAI client) with the shared retry policy and circuit breaker."""
+    def __init__(self, policy=None, breaker=None, **kwargs):
+        self.policy = policy or default_policy()
+        self.breaker = breaker or default_breaker()
+        kwargs.setdefault("limits", default_limits())
+        super().__init__(**kwargs)
+
+    def handle_request(self, request):
+        request.read() # Buffer the body so it can be resent
+        cassette = get_cassette()
+        with tracing.span("http.request", method=request.method, endpoint=_endpoint(request.url), bytes_sent=len(request.content)) as span:
+            if cassette is not None and cassette.replaying:
+                span.set(replayed=True)
+                response = cassette.replay_httpx(request)
+            else:
+                started = time.perf_counter()
+                response = self._handle_with_retries(request, span)
+                if cassette is not None:
+                    response = cassette.record_httpx(request, response, started)
+            _trace_response(span, response)
+            return response
+
+    def _handle_with_retries(self, request, span):
+        attempt = 0
+        while True:
+            span.set(attempts=attempt + 1)
+            probe = self._admit(request)
+            try:
+                response = super().handle_request(request)
+            except httpx.TransportError as exc:
+                delay = self._after_error(request, attempt, exc)
+                if delay is None:
+                    raise
+            else:
+                delay = self._after_response(request, response, attempt, probe)
+                if delay is None:
+                    return response
+                response.close()
+            finally:
+                if probe:
+                    self.breaker.end_probe(_endpoint(request.url))
+            time.sleep(delay)
+            attempt += 1
+
+
+class AsyncResilientHTTPTransport(_HttpxRetryMixin, httpx.AsyncHTTPTransport):
+    """Async counterpart of ResilientHTTPTransport (AsyncSabikAgent)."""
+    def __init__(self, policy=None, breaker=None, **kwargs):
+        self.policy = policy or default_policy()
+        self.breaker = breaker or default_breaker()
+        kwargs.setdefault("limits", default_limits())
+        super().__init__(**kwargs)
+
+    async def handle_async_request(self, request):
+        await request.aread()
+        cassette = get_cassette()
+        with tracing.span("http.request", method=request.method, endpoint=_endpoint(request.url), bytes_sent=len(request.content)) as span:
+            if cassette is not None and cassette.replaying:
+                span.set(replayed=True)
+                response = await cassette.replay_httpx_async(request)
+            else:
+                started = time.perf_counter()
+                response = await self._handle_with_retries(request, span)
+                if cassette is not None:
+                    response = cassette.record_httpx_async(request, response, started)
+            _trace_response(span, response)
+            return response
+
+    async def _handle_with_retries(self, request, span):
+        attempt = 0
+        while True:
+            span.set(attempts=attempt + 1)
+            probe = self._admit(request)
+            try:
+                response = await super().handle_async_request(request)
+            except httpx.TransportError as exc:
+                delay = self._after_error(request, attempt, exc)
+                if delay is None:
+                    raise
+            else:
+                delay = self._after_response(request, response, attempt, probe)
+                if delay is None:
+                    return response
+                await response.aclose()
+            finally:
+                if probe:
+                    self.breaker.end_probe(_endpoint(request.url))
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+_defaults_lock = threading.Lock()
+_default_breaker = None
+_default_session = None
+
+
+def default_policy():
+    return RetryPolicy(
+        max_retries=app_config.HTTP_MAX_RETRIES,
+        backoff_base=app_config.HTTP_BACKOFF_BASE,
+        backoff_max=app_config.HTTP_BACKOFF_MAX,
+        retry_after_max=app_config.HTTP_RETRY_AFTER_MAX,
+    )
+
+
+def default_breaker():
+    """Process-wide breaker, so every client shares the view of which endpoints are down."""
+    global _default_breaker
+    with _defaults_lock:
+        if _default_breaker is None:
+            _default_breaker = CircuitBreaker(app_config.CIRCUIT_FAILURE_THRESHOLD, app_config.CIRCUIT_RESET_SECONDS)
+        return _default_breaker
+
+
+def default_limits():
+    return httpx.Limits(
+        max_connections=app_config.HTTP_POOL_CONNECTIONS * app_config.HTTP_POOL_MAXSIZE,
+        max_keepalive_connections=app_config.HTTP_POOL_MAXSIZE,
+        keepalive_expiry=app_config.HTTP_KEEPALIVE_SECONDS,
+    )
+
+
+def default_timeout():
+    return httpx.Timeout(300.0, connect=10.0)
+
+
+def build_session(referrer=None):
+    """requests.Session with the shared adapter mounted for http and https."""
+    session = requests.Session()
+    adapter = ResilientHTTPAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if referrer:
+        session.headers.update({"User-Agent": referrer, "Referer": referrer})
+    return session
+
+
+def default_session():
+    """Lazily built module-level session for callers that were not handed one."""
+    global _default_session
+    with _defaults_lock:
+        if _default_session is None:
+            _default_session = build_session(app_config.REFERRER_ID)
+        return _default_session
+
+
+def build_http_client(referrer=None):
+    headers = {"User-Agent": referrer, "Referer": referrer} if referrer else None
+    return httpx.Client(transport=ResilientHTTPTransport(), headers=headers, timeout=default_timeout(), follow_redirects=True)
+
+
+def build_async_http_client(referrer=None):
+    headers = {"User-Agent": referrer, "Referer": referrer} if referrer else None
+    return httpx.AsyncClient(transport=AsyncResilientHTTPTransport(), headers=headers, timeout=default_timeout(), follow_redirects=True)
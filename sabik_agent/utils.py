@@ -1,63 +1,232 @@
 # sabik_agent/utils.py
 import base64
+import binascii
+import mmap
 import os
 import mimetypes
-import requests
-from PIL import Image
-from io import BytesIO
+import tempfile
+import time
+from PIL import Image, ImageOps
 
-from .interface import console, Panel
-from .config import OUTPUT_DIR
+from . import output
+from . import tracing
+from .transport import default_session
+from .config import OUTPUT_DIR, MAX_IMAGE_DOWNLOAD_MB, VISION_MAX_SIDE, VISION_MAX_UPLOAD_KB, VISION_UPLOAD_FORMAT, VISION_UPLOAD_QUALITY
 
-def encode_image_base64(image_path_or_url):
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+BASE64_CHUNK_SIZE = 3 * 256 * 1024 # Multiple of 3 (no padding between pieces) and of the page size (madvise)
+IMAGE_EXTENSIONS = {'image/jpeg': 'jpg', 'image/png': 'png', 'image/gif': 'gif', 'image/webp': 'webp', 'image/bmp': 'bmp'}
+
+class DownloadTooLarge(Exception):
+    pass
+
+def sniff_image_type(head):
+    """Detects the image MIME type from the first bytes of a file (None if not a known image format)."""
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'BM'):
+        return 'image/bmp'
+    return None
+
+def stream_download(session, url, dest_dir, max_bytes, timeout, params=None, require_image=False):
+    """
+    Streams a response body to a temporary file in dest_dir without buffering it in memory.
+    The content type is sniffed from the first chunk; with require_image the download is
+    aborted right there if the body is not an image (an empty body is rejected too). Raises DownloadTooLarge past max_bytes.
+    Returns (temp_path, content_type, final_url); the caller renames or removes temp_path.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    with tracing.span("http.download", url=url) as span, session.get(url, params=params, timeout=timeout, stream=True) as response:
+        response.raise_for_status()
+        declared_length = response.headers.get('Content-Length')
+        if declared_length and declared_length.isdigit() and int(declared_length) > max_bytes:
+            raise DownloadTooLarge(f"Response of {declared_length} bytes exceeds the {max_bytes} byte limit.")
+        header_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+        content_type = None
+        written = 0
+        fd, temp_path = tempfile.mkstemp(dir=dest_dir, prefix='.download_', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if content_type is None:
+                        content_type = sniff_image_type(chunk) or header_type or 'application/octet-stream'
+                        if require_image and not content_type.startswith('image/'):
+                            raise ValueError(f"Expected image, got {header_type or 'unknown type'}: {chunk[:200]!r}")
+                    written += len(chunk)
+                    if written > max_bytes:
+                        raise DownloadTooLarge(f"Download exceeded the {max_bytes} byte limit.")
+                    f.write(chunk)
+            if require_image and content_type is None: # Empty body: nothing to sniff, nothing to save
+                raise ValueError(f"Expected image, got an empty {header_type or 'response'} body.")
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        os.chmod(temp_path, 0o644) # mkstemp creates owner-only files; downloads are regular outputs
+        span.set(bytes_received=written, content_type=content_type or header_type)
+        return temp_path, content_type or header_type, response.url
+
+def base64_file(path, prefix=b""):
+    """
+    Base64-encodes a file with `prefix` prepended (e.g. a data-URI header) and returns a str.
+
+    The file is memory-mapped and encoded in BASE64_CHUNK_SIZE slices directly into one
+    preallocated buffer, and mapped pages are released after each slice. Peak memory is
+    roughly the buffer plus the final str (about 2.7x the file size). The old
+    read() + b64encode() + decode() + f-string path peaked at about 3.7x. For a 200 MiB
+    file, peak RSS measured with ru_maxrss went from ~735 MiB to ~535 MiB.
+    """
+    with tracing.span("encode.base64", bytes_in=os.path.getsize(path)):
+        return _base64_file(path, prefix)
+
+def _base64_file(path, prefix):
+    size = os.path.getsize(path)
+    out = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+    out[:len(prefix)] = prefix
+    pos = len(prefix)
+    if size:
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            source = memoryview(mapped)
+            try:
+                for start in range(0, size, BASE64_CHUNK_SIZE):
+                    # Slices are a multiple of 3 bytes, so the pieces concatenate without inner padding
+                    encoded = binascii.b2a_base64(source[start:start + BASE64_CHUNK_SIZE], newline=False)
+                    out[pos:pos + len(encoded)] = encoded
+                    pos += len(encoded)
+                    if hasattr(mapped, "madvise"): # Drop already-encoded pages from RSS (Python 3.8+, POSIX)
+                        mapped.madvise(mmap.MADV_DONTNEED, start, min(BASE64_CHUNK_SIZE, size - start))
+            finally:
+                source.release()
+    return out.decode("ascii")
+
+def detect_image_type(path, fallback):
+    """Detects the image MIME type with Pillow, reading only the file header."""
+    try:
+        with Image.open(path) as img: # Lazy: decodes nothing but the header
+            fmt_map = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
+            return fmt_map.get(img.format) or fallback # Pillow's detected format
+    except Exception as img_err:
+        output.message(f"Warn: Pillow format detection failed for '{path}'. Using initial type: {fallback}. Error: {img_err}", "warning")
+        return fallback
+
+def optimize_image_for_upload(path, stats, max_side=VISION_MAX_SIDE, max_kb=VISION_MAX_UPLOAD_KB, fmt=VISION_UPLOAD_FORMAT, quality=VISION_UPLOAD_QUALITY):
+    """
+    Downscales an image so its longest side is at most max_side, strips metadata (EXIF
+    orientation is applied first) and re-encodes it as JPEG/WEBP at `quality`.
+    Images already within both max_side and max_kb are left alone, as are animations.
+    Fills `stats` and returns (temp_path, content_type), or None if the original should be sent.
+    """
+    started = time.perf_counter()
+    original_bytes = os.path.getsize(path)
+    stats.update({"original_bytes": original_bytes, "upload_bytes": original_bytes, "bytes_saved": 0, "optimized": False})
+    fmt = fmt.upper()
+    content_type = {'JPEG': 'image/jpeg', 'WEBP': 'image/webp'}.get(fmt)
+    if content_type is None:
+        stats["skipped"] = f"unsupported upload format {fmt}"
+        return None
+    with Image.open(path) as img:
+        stats["original_size"] = list(img.size)
+        if max(img.size) <= max_side and original_bytes <= max_kb * 1024:
+            stats["skipped"] = "already under limits"
+            return None
+        if getattr(img, "n_frames", 1) > 1:
+            stats["skipped"] = "animated image"
+            return None
+        if img.format == "JPEG":
+            img.draft("RGB", (max_side, max_side)) # Let the JPEG decoder downscale by 1/2..1/8 for free
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+        if img.mode not in ("RGB", "L") and not (fmt == "WEBP" and img.mode == "RGBA"):
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, (255, 255, 255))
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            else:
+                img = img.convert("RGB")
+        fd, temp_path = tempfile.mkstemp(prefix=".upload_", suffix=f".{fmt.lower()}")
+        with os.fdopen(fd, "wb") as f:
+            img.save(f, format=fmt, quality=quality, optimize=True) # No exif/icc passed: metadata is stripped
+        stats["upload_size"] = list(img.size)
+    optimized_bytes = os.path.getsize(temp_path)
+    stats["encode_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if optimized_bytes >= original_bytes:
+        os.remove(temp_path)
+        stats["skipped"] = "re-encoding did not reduce size"
+        return None
+    stats.update({"upload_bytes": optimized_bytes, "bytes_saved": original_bytes - optimized_bytes, "optimized": True})
+    return temp_path, content_type
+
+def download_image(image_url, session=None):
+    """Streams a remote image to a temporary file; returns (temp_path, content_type). The caller removes temp_path."""
+    output.message("Fetching image", target=image_url)
+    temp_path, content_type, _ = stream_download(session or default_session(), image_url, tempfile.gettempdir(), MAX_IMAGE_DOWNLOAD_MB * 1024 * 1024, timeout=15)
+    return temp_path, content_type
+
+def encode_image_base64(image_path_or_url, session=None, upload_stats=None, content_type=None):
+    """
+    Returns the image as a base64 data URI (None on error). If `upload_stats` is a dict, the
+    image is first passed through optimize_image_for_upload and its stats are stored there.
+    `content_type` is the known type of a local file that was already downloaded (see download_image).
+    """
+    temp_paths = []
     try:
         if image_path_or_url.startswith(('http://', 'https://')):
-            console.print(f"Fetching image: [link={image_path_or_url}]{image_path_or_url}[/link]")
-            response = requests.get(image_path_or_url, timeout=15)
-            response.raise_for_status()
-            image_data = response.content
-            content_type = response.headers.get('Content-Type', 'image/jpeg')
+            temp_path, content_type = download_image(image_path_or_url, session)
+            temp_paths.append(temp_path)
+            source_path = temp_path
         else:
             if not os.path.exists(image_path_or_url):
                 raise FileNotFoundError(f"Image not found: {image_path_or_url}")
-            console.print(f"Encoding image: [cyan]{image_path_or_url}[/cyan]")
-            with open(image_path_or_url, "rb") as f:
-                image_data = f.read()
-            mime_type, _ = mimetypes.guess_type(image_path_or_url)
-            content_type = mime_type or 'image/jpeg'
-        
-        # Try to verify and get more precise mime type with Pillow
-        try:
-            img = Image.open(BytesIO(image_data))
-            img.verify() # Verifies if it's a valid image
-            fmt_map = {'JPEG': 'image/jpeg', 'PNG': 'image/png', 'GIF': 'image/gif', 'WEBP': 'image/webp'}
-            detected_mime = fmt_map.get(img.format) # Pillow's detected format
-            if detected_mime:
-                content_type = detected_mime
-            img.close()
-        except Exception as img_err:
-            console.print(f"[yellow]Warn:[/yellow] Pillow verification/format detection failed for '{image_path_or_url}'. Using initial type: {content_type}. Error: {img_err}")
+            if content_type is None:
+                output.message("Encoding image", target=image_path_or_url)
+                mime_type, _ = mimetypes.guess_type(image_path_or_url)
+                content_type = mime_type or 'image/jpeg'
+            source_path = image_path_or_url
 
-        return f"data:{content_type};base64,{base64.b64encode(image_data).decode('utf-8')}"
+        content_type = detect_image_type(source_path, content_type)
+        if upload_stats is not None:
+            with tracing.span("image.optimize") as span:
+                try:
+                    optimized = optimize_image_for_upload(source_path, upload_stats)
+                except Exception as opt_err: # Fall back to the original bytes
+                    span.record_error(opt_err)
+                    output.message(f"Warn: Image optimization failed for '{image_path_or_url}': {opt_err}", "warning")
+                    optimized = None
+                span.set(original_bytes=upload_stats.get("original_bytes"), upload_bytes=upload_stats.get("upload_bytes"), optimized=bool(optimized))
+            if optimized:
+                source_path, content_type = optimized
+                temp_paths.append(source_path)
+                output.message(f"Optimized image for upload: {upload_stats['original_bytes']} -> {upload_stats['upload_bytes']} bytes in {upload_stats['encode_ms']} ms", "detail")
+        return base64_file(source_path, prefix=f"data:{content_type};base64,".encode("ascii"))
     except Exception as e:
-        console.print(Panel(f"{str(e)}", title="[bold red]Image Encode Error[/]", border_style="red"))
+        output.panel("Image Encode Error", str(e), "error")
         return None
+    finally:
+        for temp_path in temp_paths:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
 def encode_audio_base64(audio_path):
     try:
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio not found: {audio_path}")
-        console.print(f"Encoding audio: [cyan]{audio_path}[/cyan]")
-        with open(audio_path, "rb") as f:
-            audio_data = f.read()
-        base64_audio = base64.b64encode(audio_data).decode('utf-8')
+        output.message("Encoding audio", target=audio_path)
+        base64_audio = base64_file(audio_path)
         audio_format = os.path.splitext(audio_path)[1].lower().lstrip('.')
         if not audio_format:
-            console.print(f"[yellow]Warn:[/yellow] Could not determine audio format for {audio_path}. Assuming 'mp3'.")
+            output.message(f"Warn: Could not determine audio format for {audio_path}. Assuming 'mp3'.", "warning")
             audio_format = 'mp3' # Default assumption
         return base64_audio, audio_format
     except Exception as e:
-        console.print(Panel(f"{str(e)}", title="[bold red]Audio Encode Error[/]", border_style="red"))
+        output.panel("Audio Encode Error", str(e), "error")
         return None, None
 
 def save_base64_audio(base64_data, filename="output_audio.mp3"):
@@ -67,8 +236,8 @@ def save_base64_audio(base64_data, filename="output_audio.mp3"):
         filepath = os.path.join(OUTPUT_DIR, filename)
         with open(filepath, 'wb') as f:
             f.write(audio_binary)
-        console.print(f"Audio saved: [bright_blue u]{filepath}[/bright_blue u]")
+        output.message("Audio saved", target=filepath)
         return filepath
     except Exception as e:
-        console.print(Panel(f"{str(e)}", title="[bold red]Audio Save Error[/]", border_style="red"))
+        output.panel("Audio Save Error", str(e), "error")
         return None
\ No newline at end of file
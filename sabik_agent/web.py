@@ -0,0 +1,189 @@
+# sabik_agent/web.py
+"""
+Bounded page fetching and readable-text extraction for the web tools.
+
+Bodies are streamed with a byte cap and fed chunk by chunk into a streaming HTML parser,
+so extraction stops as soon as either the byte cap or the text limit is reached. Extracted
+pages are kept in the result cache together with their ETag / Last-Modified validators;
+repeat fetches are sent as conditional GETs and a 304 is served from the cache.
+An optional deadline bounds the whole fetch, including retries and reading the body.
+"""
+import codecs
+import contextlib
+import io
+import re
+import time
+from html.parser import HTMLParser
+
+import requests
+
+from .cache import get_result_cache, make_key
+from .transport import deadline as request_deadline
+
+STREAM_CHUNK_SIZE = 16 * 1024
+SKIPPED_TAGS = {"script", "style", "noscript", "svg", "template", "iframe", "nav", "header", "footer", "aside", "form", "button", "select"}
+BLOCK_TAGS = {"p", "div", "section", "article", "main", "br", "li", "ul", "ol", "tr", "table", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "dd", "dt"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+TEXT_CONTENT_TYPES = ("text/plain", "application/json", "text/markdown", "text/csv", "application/xml", "text/xml")
+
+
+class ReadableTextExtractor(HTMLParser):
+    """Incremental HTML-to-text: drops scripts, styles and page chrome, keeps block structure."""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self._parts = []
+        self._length = 0
+        self._skip_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._newline()
+            return
+        if tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "title":
+            self._in_title = True
+        elif tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._newline()
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        text = re.sub(r"\s+", " ", data)
+        if text.strip():
+            self._parts.append(text)
+            self._length += len(text)
+
+    def _newline(self):
+        if self._parts and self._parts[-1] != "\n":
+            self._parts.append("\n")
+            self._length += 1
+
+    @property
+    def length(self):
+        return self._length
+
+    def text(self):
+        lines = (line.strip() for line in "".join(self._parts).split("\n"))
+        return "\n".join(line for line in lines if line)
+
+
+def _charset(content_type):
+    match = re.search(r"charset=([\w-]+)", content_type or "", re.I)
+    if match:
+        try:
+            return codecs.lookup(match.group(1)).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+def _body_chunks(response, deadline):
+    """
+    The response body in chunks. With a deadline, each read returns whatever has arrived (read1),
+    so a server trickling bytes cannot keep a fetch blocked in one large read past the deadline.
+    """
+    raw = response.raw
+    if deadline is None or isinstance(raw, io.BytesIO) or not hasattr(raw, "read1"): # BytesIO: replayed bodies are in memory
+        yield from response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        return
+    while True:
+        chunk = raw.read1(STREAM_CHUNK_SIZE, decode_content=True)
+        if not chunk:
+            return
+        yield chunk
+
+
+def read_page(response, max_bytes, max_chars, deadline=None):
+    """
+    Streams an open (stream=True) response into readable text. Stops after max_bytes of body
+    or max_chars of text. Returns (title, text, bytes_read, truncated). Raises
+    requests.exceptions.Timeout once `deadline` (a time.monotonic() value) has passed.
+    """
+    content_type = response.headers.get("Content-Type", "").lower()
+    is_html = "html" in content_type or not content_type
+    if not is_html and not content_type.startswith(TEXT_CONTENT_TYPES):
+        raise ValueError(f"Unsupported content type for text extraction: {content_type}")
+
+    decoder = codecs.getincrementaldecoder(_charset(content_type))(errors="replace")
+    extractor = ReadableTextExtractor() if is_html else None
+    plain_parts = []
+    plain_length = 0
+    bytes_read = 0
+    truncated = False
+    for chunk in _body_chunks(response, deadline):
+        if deadline is not None and time.monotonic() > deadline:
+            raise requests.exceptions.Timeout("Deadline reached while reading the page.")
+        if not chunk:
+            continue
+        if bytes_read + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - bytes_read]
+            truncated = True
+        bytes_read += len(chunk)
+        text = decoder.decode(chunk)
+        if extractor:
+            extractor.feed(text)
+            extracted_length = extractor.length
+        else:
+            plain_parts.append(text)
+            plain_length += len(text)
+            extracted_length = plain_length
+        if truncated or extracted_length >= max_chars:
+            truncated = True
+            break
+    if extractor:
+        extractor.feed(decoder.decode(b"", final=True))
+        title, text = extractor.title.strip(), extractor.text()
+    else:
+        title, text = "", "".join(plain_parts).strip()
+    if len(text) > max_chars:
+        text, truncated = text[:max_chars], True
+    return title, text, bytes_read, truncated
+
+
+def fetch_page(session, url, max_bytes, max_chars, timeout=10, deadline=None):
+    """
+    Fetches a page and extracts its readable text, revalidating cached copies with
+    If-None-Match / If-Modified-Since. Returns a dict with url, final_url, title, text,
+    bytes_read, truncated and cache ("revalidated", "miss" or "disabled").
+    `deadline` (a time.monotonic() value) bounds the request, its retries and the body read.
+    Raises requests exceptions and ValueError (unsupported content) to the caller.
+    """
+    cache = get_result_cache("web")
+    cache_key = make_key("fetch_page", url, max_bytes, max_chars)
+    cached = cache.get(cache_key) if cache else None
+    headers = {}
+    if cached:
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+
+    bounded = request_deadline(deadline) if deadline is not None else contextlib.nullcontext()
+    with bounded, session.get(url, headers=headers, timeout=timeout, stream=True) as response:
+        if cached and response.status_code == 304:
+            cache.set(cache_key, cached) # Refresh TTL and LRU position
+            return dict(cached["page"], bytes_read=0, cache="revalidated")
+        response.raise_for_status()
+        title, text, bytes_read, truncated = read_page(response, max_bytes, max_chars, deadline)
+        page = {"url": url, "final_url": response.url, "title": title, "text": text, "truncated": truncated}
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+    if cache and (etag or last_modified):
+        cache.set(cache_key, {"etag": etag, "last_modified": last_modified, "page": page})
+    return dict(page, bytes_read=bytes_read, cache="miss" if cache else "disabled")
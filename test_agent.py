@@ -0,0 +1,194 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import config as app_config
+from sabik_agent import output, transport
+from sabik_agent.agent import AdvancedSabikAgent
+from sabik_agent.async_agent import AsyncSabikAgent
+
+output.set_sink(output.NullSink())
+
+
+def _tool_call_chunk(call_id, name, arguments):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    tool_call = SimpleNamespace(index=0, id=call_id, function=function)
+    delta = SimpleNamespace(content=None, tool_calls=[tool_call])
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])
+
+
+class _FakeCompletions:
+    """Streams the given chunk lists, one list per request; an exception instance is raised mid-stream."""
+    def __init__(self, responses):
+        self.responses = list(responses)
+
+    def create(self, **payload):
+        chunks = self.responses.pop(0)
+
+        def stream():
+            for chunk in chunks:
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        return stream()
+
+
+class _FakeAsyncCompletions(_FakeCompletions):
+    async def create(self, **payload):
+        chunks = self.responses.pop(0)
+
+        async def stream():
+            for chunk in chunks:
+                await asyncio.sleep(0)
+                if isinstance(chunk, BaseException):
+                    raise chunk
+                yield chunk
+        return stream()
+
+
+def _configure(monkeypatch):
+    monkeypatch.setattr(app_config, "STREAM_RESPONSES", True)
+    monkeypatch.setattr(app_config, "PARALLEL_TOOL_CALLS", True)
+    monkeypatch.setattr(app_config, "TOOL_MAX_WORKERS", 4)
+    monkeypatch.setattr(app_config, "TOOL_SELECTION", False)
+    monkeypatch.setattr(app_config, "CONTEXT_TOKEN_BUDGET", 0)
+
+
+def _agent(monkeypatch, responses, tool):
+    _configure(monkeypatch)
+    agent = AdvancedSabikAgent()
+    agent.client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeCompletions(responses)))
+    agent.available_functions = {"record": tool}
+    return agent
+
+
+def test_tool_started_before_a_stream_error_is_awaited_and_recorded(monkeypatch):
+    finished = threading.Event()
+
+    def record(value, **kwargs):
+        finished.wait(0.2) # Still running when the stream fails
+        return {"status": "success", "value": value}
+
+    agent = _agent(monkeypatch, [[_tool_call_chunk("call_1", "record", '{"value": 1}'), RuntimeError("connection reset")]], record)
+    assert agent.process_input("go") is not None
+    history = agent.message_history
+    assert history[-2]["tool_calls"][0]["id"] == "call_1"
+    assert history[-1]["role"] == "tool" and json.loads(history[-1]["content"])["value"] == 1
+    assert agent.last_turn_tool_calls[0]["status"] == "success"
+
+
+def test_every_tool_call_gets_a_result_at_the_iteration_limit(monkeypatch):
+    calls = []
+
+    def record(value, **kwargs):
+        calls.append(value)
+        return {"status": "success", "value": value}
+
+    responses = [[_tool_call_chunk(f"call_{i}", "record", json.dumps({"value": i}))] for i in range(6)]
+    agent = _agent(monkeypatch, responses, record)
+    agent.process_input("loop")
+    assert sorted(calls)[:5] == list(range(5))
+    # The sixth call, started while streaming, was either cancelled before it ran or awaited
+    assert agent.last_turn_tool_calls[-1]["status"] == ("success" if len(calls) == 6 else "skipped")
+    tool_call_ids = [m["tool_calls"][0]["id"] for m in agent.message_history if m.get("tool_calls")]
+    result_ids = [m["tool_call_id"] for m in agent.message_history if m["role"] == "tool"]
+    assert result_ids == tool_call_ids
+
+
+def test_async_tool_started_before_a_stream_error_is_awaited_and_recorded(monkeypatch):
+    async def record(value, **kwargs):
+        await asyncio.sleep(0.05)
+        return {"status": "success", "value": value}
+
+    async def run():
+        _configure(monkeypatch)
+        async with AsyncSabikAgent() as agent:
+            agent.async_client = SimpleNamespace(chat=SimpleNamespace(completions=_FakeAsyncCompletions(
+                [[_tool_call_chunk("call_1", "record", '{"value": 7}'), RuntimeError("connection reset")]])))
+            agent.available_functions = {"record": record}
+            await agent.process_input("go")
+            return agent.message_history
+
+    history = asyncio.run(run())
+    assert history[-2]["tool_calls"][0]["id"] == "call_1"
+    assert json.loads(history[-1]["content"])["value"] == 7
+
+
+def test_lazy_session_is_built_once_under_concurrent_access(monkeypatch):
+    built = []
+    barrier = threading.Barrier(8)
+
+    def build_session(referrer):
+        built.append(referrer)
+        threading.Event().wait(0.05) # Widen the window between the check and the assignment
+        return object()
+    monkeypatch.setattr(transport, "build_session", build_session)
+    agent = AdvancedSabikAgent()
+    sessions = []
+
+    def read():
+        barrier.wait()
+        sessions.append(agent.session)
+    threads = [threading.Thread(target=read) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(built) == 1 and all(session is sessions[0] for session in sessions)
+
+
+def _tool_calls(name, count):
+    return [{"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps({"value": i})}} for i in range(count)]
+
+
+def test_independent_tool_calls_run_concurrently(monkeypatch):
+    barrier = threading.Barrier(3, timeout=2) # Only passes if all three calls run at the same time
+
+    def record(value, **kwargs):
+        barrier.wait()
+        return {"status": "success", "value": value}
+
+    agent = _agent(monkeypatch, [], record)
+    results = agent._handle_function_call(_tool_calls("record", 3))
+    assert [json.loads(result["content"])["value"] for result in results] == [0, 1, 2]
+
+
+def test_results_keep_tool_call_order_when_calls_finish_out_of_order(monkeypatch):
+    finished = []
+
+    def record(value, **kwargs):
+        threading.Event().wait(0.03 * (3 - value)) # The last call finishes first
+        finished.append(value)
+        return {"status": "success", "value": value}
+
+    agent = _agent(monkeypatch, [], record)
+    results = agent._handle_function_call(_tool_calls("record", 4))
+    assert finished[0] == 3
+    assert [result["tool_call_id"] for result in results] == ["call_0", "call_1", "call_2", "call_3"]
+    assert [json.loads(result["content"])["value"] for result in results] == [0, 1, 2, 3]
+    assert [call["id"] for call in agent.last_turn_tool_calls] == ["call_0", "call_1", "call_2", "call_3"]
+
+
+def test_serial_only_tool_calls_never_overlap(monkeypatch):
+    lock = threading.Lock()
+    active, peak = [0], [0]
+
+    def record(value, **kwargs):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        threading.Event().wait(0.02)
+        with lock:
+            active[0] -= 1
+        return {"status": "success", "value": value}
+    record.serial_only = True
+
+    agent = _agent(monkeypatch, [], record)
+    results = agent._handle_function_call(_tool_calls("record", 4))
+    assert peak[0] == 1
+    assert [json.loads(result["content"])["value"] for result in results] == [0, 1, 2, 3]
@@ -0,0 +1,72 @@
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import cache, utils
+
+# sabik_agent.tools rebinds submodule names to the tool functions
+vision = importlib.import_module("sabik_agent.tools.analyze_image_content")
+
+CONFIG = SimpleNamespace(VISION_OPTIMIZE=False)
+
+
+class _FakeVisionClient:
+    def __init__(self):
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=self)
+
+    def create(self, **payload):
+        self.calls += 1
+        message = SimpleNamespace(content=f"analysis {self.calls}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def _image(path, color):
+    Image.new("RGB", (8, 8), color).save(path)
+    return str(path)
+
+
+def _analyze(source, client):
+    return vision.analyze_image_content(source, "What color?", session=None, client=client, config=CONFIG)
+
+
+def _use_cache(monkeypatch, tmp_path):
+    monkeypatch.setitem(cache._caches, "vision", cache.ResultCache("vision", 10 * 1024 * 1024, 3600, root=str(tmp_path / "cache")))
+
+
+def test_local_image_hits_until_its_content_changes(monkeypatch, tmp_path):
+    _use_cache(monkeypatch, tmp_path)
+    client = _FakeVisionClient()
+    path = _image(tmp_path / "a.png", "red")
+    assert _analyze(path, client)["cache"] == "miss"
+    assert _analyze(path, client) == {"status": "success", "analysis": "analysis 1", "cache": "hit"}
+    _image(path, "blue")
+    assert _analyze(path, client)["cache"] == "miss"
+    assert client.calls == 2
+
+
+def test_remote_image_is_keyed_by_downloaded_content(monkeypatch, tmp_path):
+    _use_cache(monkeypatch, tmp_path)
+    client = _FakeVisionClient()
+    served = {"path": _image(tmp_path / "red.png", "red")}
+
+    def download(url, session=None):
+        fd, temp_path = tempfile.mkstemp(dir=tmp_path, suffix=".part")
+        os.close(fd)
+        shutil.copyfile(served["path"], temp_path)
+        return temp_path, "image/png"
+    monkeypatch.setattr(utils, "download_image", download)
+
+    url = "https://example.com/latest.png"
+    assert _analyze(url, client)["cache"] == "miss"
+    assert _analyze(url, client)["cache"] == "hit"
+    served["path"] = _image(tmp_path / "blue.png", "blue") # Same URL, new image
+    assert _analyze(url, client) == {"status": "success", "analysis": "analysis 2", "cache": "miss"}
+    assert sorted(os.listdir(tmp_path)) == ["blue.png", "cache", "red.png"] # Downloads are removed
@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import batch
+from sabik_agent.agent import AdvancedSabikAgent
+
+
+class _RecordingAgent(AdvancedSabikAgent):
+    """Answers without an LLM and leaves conversation state behind, as a real turn would."""
+    seen = []
+    lock = threading.Lock()
+
+    def process_input(self, user_input):
+        with self.lock:
+            self.seen.append((user_input, len(self.message_history), self.context_budget.summary_message, self._persisted_summary))
+        time.sleep(0.01 * (len(user_input) % 3))
+        self.message_history += [{"role": "user", "content": user_input}, {"role": "assistant", "content": "ok"}]
+        self.context_budget._summary_message = self._persisted_summary = {"role": "system", "content": "summary"}
+        self.last_turn_tools = ["calculator"]
+        return f"answer to {user_input}"
+
+
+def _write_prompts(path, prompts):
+    path.write_text("\n".join(json.dumps({"id": prompt_id, "prompt": prompt}) for prompt_id, prompt in prompts) + "\n", encoding="utf-8")
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_every_prompt_starts_a_fresh_conversation(tmp_path):
+    _RecordingAgent.seen = []
+    prompts = tmp_path / "prompts.jsonl"
+    _write_prompts(prompts, [("a", "first"), ("b", "second"), ("c", "third")])
+    summary = batch.run_batch(str(prompts), str(tmp_path / "out.jsonl"), concurrency=1, agent_factory=_RecordingAgent)
+    assert summary["ok"] == 3
+    assert [entry[1:] for entry in _RecordingAgent.seen] == [(0, None, None)] * 3
+
+
+def test_records_follow_input_order_with_one_worker(tmp_path):
+    prompts = tmp_path / "prompts.txt"
+    prompts.write_text("one\ntwo\n# comment\nthree\n", encoding="utf-8")
+    out = tmp_path / "out.jsonl"
+    batch.run_batch(str(prompts), str(out), concurrency=1, agent_factory=_RecordingAgent)
+    assert [(record["id"], record["content"]) for record in _records(out)] == [("1", "answer to one"), ("2", "answer to two"), ("4", "answer to three")]
+
+
+def test_parallel_workers_write_each_prompt_once(tmp_path):
+    prompts = tmp_path / "prompts.jsonl"
+    _write_prompts(prompts, [(str(i), "x" * i) for i in range(12)])
+    out = tmp_path / "out.jsonl"
+    summary = batch.run_batch(str(prompts), str(out), concurrency=4, agent_factory=_RecordingAgent)
+    records = _records(out)
+    assert summary["ok"] == 12 and sorted(int(record["id"]) for record in records) == list(range(12))
+    assert {record["worker"] for record in records} <= set(range(4))
+
+
+def test_resume_skips_ok_ids_and_retries_failed_ones(tmp_path):
+    prompts = tmp_path / "prompts.jsonl"
+    _write_prompts(prompts, [("a", "first"), ("b", "second"), ("c", "third")])
+    out = tmp_path / "out.jsonl"
+    out.write_text(json.dumps({"id": "a", "status": "ok"}) + "\n" + json.dumps({"id": "b", "status": "error"}) + "\n" + '{"id": "c", "sta', encoding="utf-8")
+    assert batch.completed_ids(str(out)) == {"a"}
+    summary = batch.run_batch(str(prompts), str(out), concurrency=1, agent_factory=_RecordingAgent)
+    assert (summary["skipped"], summary["ok"]) == (1, 2)
+    lines = out.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines[3:]] == ["b", "c"] # The torn line was not glued onto
+    assert batch.completed_ids(str(out)) == {"a", "b", "c"}
+    assert batch.run_batch(str(prompts), str(out), agent_factory=_RecordingAgent)["skipped"] == 3
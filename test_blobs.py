@@ -0,0 +1,60 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import blobs
+from sabik_agent import config as app_config
+from sabik_agent.blobs import STUB_PREFIX, BlobStore
+
+TEXT = "".join(f"line {i}\n" for i in range(1, 11)) + "héllo\n"
+
+
+def test_put_is_content_addressed(tmp_path):
+    store = BlobStore(str(tmp_path), 1024 * 1024)
+    assert store.put(TEXT) == store.put(TEXT)
+    assert store.put(TEXT) != store.put(TEXT + "more\n")
+
+
+def test_line_ranges_are_one_based_and_inclusive(tmp_path):
+    store = BlobStore(str(tmp_path), 1024 * 1024)
+    handle = store.put(TEXT)
+    assert store.read_lines(handle, 2, 3) == ("line 2\nline 3\n", 2, 3, 11)
+    assert store.read_lines(handle, 10) == ("line 10\nhéllo\n", 10, 11, 11)
+    text, start, end, total = store.read_lines(handle, 0, 99)
+    assert (text, start, end, total) == (TEXT, 1, 11, 11)
+
+
+def test_byte_ranges_are_clamped_and_replace_cut_characters(tmp_path):
+    store = BlobStore(str(tmp_path), 1024 * 1024)
+    handle = store.put(TEXT)
+    total = len(TEXT.encode("utf-8"))
+    assert store.read_bytes(handle, 0, 7) == ("line 1\n", 0, 7, total)
+    assert store.read_bytes(handle, total - 2, total + 50) == ("o\n", total - 2, total, total)
+    cut = TEXT.encode("utf-8").index("é".encode("utf-8")) + 1 # Inside the two-byte character
+    assert store.read_bytes(handle, cut, cut + 1)[0] == "�"
+
+
+def test_unknown_or_malformed_handles_raise_key_error(tmp_path):
+    store = BlobStore(str(tmp_path), 1024 * 1024)
+    for handle in ("blob_" + "0" * 32, "../etc/passwd"):
+        try:
+            store.read_lines(handle)
+            assert False, "KeyError expected"
+        except KeyError:
+            pass
+
+
+def test_large_results_are_replaced_by_a_stub(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_config, "TOOL_RESULT_BLOBS", True)
+    monkeypatch.setattr(app_config, "TOOL_RESULT_INLINE_CHARS", 100)
+    monkeypatch.setattr(blobs, "_store", BlobStore(str(tmp_path), 1024 * 1024))
+    small = {"status": "success", "value": 1}
+    assert blobs.externalize(small, json.dumps(small)) == json.dumps(small)
+    large = {"status": "success", "transcription": "word " * 200}
+    stub = blobs.externalize(large, json.dumps(large))
+    assert stub.startswith(STUB_PREFIX)
+    handle = json.loads(stub)["blob"]
+    text = blobs.get_store().read_lines(handle)[0]
+    assert text.startswith("status: \"success\"\n## transcription\nword word")
@@ -0,0 +1,57 @@
+import importlib
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import config
+from sabik_agent import output
+
+output.set_sink(output.NullSink())
+# sabik_agent.tools exposes the tool functions under the module names
+calculator_module = importlib.import_module("sabik_agent.tools.calculator")
+
+EXPRESSIONS = ["2+2", "3+4", "100*3.14/2", "1.5*2.5", "(7-2)*(3+1)", "10/4", "2*(3+4)", "5-9", "0.1+0.2"]
+
+
+def calculate(**kwargs):
+    return calculator_module.calculator(session=None, client=None, config=config, **kwargs)
+
+
+def test_batch_results_match_single_expressions():
+    batch = calculate(expressions=EXPRESSIONS)
+    assert batch["status"] == "success" and batch["failed"] == 0
+    for item in batch["results"]:
+        assert float(item["result"]) == float(calculate(expression=item["expression"])["result"])
+
+
+def test_variables_match_single_expressions_element_wise():
+    prices, quantities = [1.5, 2, 10], [4, 3, 0.5]
+    result = calculate(expression="price*qty+1", variables={"price": prices, "qty": quantities})
+    values = result["results"][0]["result"]
+    singles = [float(calculate(expression=f"{p}*{q}+1")["result"]) for p, q in zip(prices, quantities)]
+    assert values == singles
+
+
+def test_batch_reports_errors_per_expression():
+    result = calculate(expressions=["1+1", "import os", "2*("])
+    assert [("result" in item) for item in result["results"]] == [True, False, False]
+    assert result["evaluated"] == 1 and result["failed"] == 2 and result["status"] == "success"
+
+
+def test_division_by_zero_is_an_error_for_expressions_but_inf_element_wise():
+    assert calculate(expression="1/0")["status"] == "error"
+    batch = calculate(expressions=["1/0", "1/2", "3/4"])
+    assert "error" in batch["results"][0]
+    element_wise = calculate(expression="x/y", variables={"x": [1, 2], "y": [0, 2]})
+    assert element_wise["results"][0]["result"] == ["inf", 1.0]
+
+
+def test_unknown_names_and_calls_are_rejected_with_variables():
+    result = calculate(expressions=["x+y", "sin(x)"], variables={"x": [1, 2]})
+    assert all("error" in item for item in result["results"])
+
+
+def test_batch_size_is_capped(monkeypatch):
+    monkeypatch.setattr(config, "CALCULATOR_MAX_EXPRESSIONS", 2)
+    assert calculate(expressions=["1", "2", "3"])["status"] == "error"
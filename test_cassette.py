@@ -0,0 +1,74 @@
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import transport
+from sabik_agent import utils
+from sabik_agent.cassette import Cassette
+
+BIG_BODY = b"\x89PNG\r\n\x1a\n" + b"x" * (1024 * 1024)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = BIG_BODY if self.path.startswith("/big") else b'{"hello": "world"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png" if self.path.startswith("/big") else "application/json")
+        if not self.path.startswith("/big"): # Unknown length: only the streamed cap can stop it
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _use(monkeypatch, cassette):
+    monkeypatch.setattr(transport, "get_cassette", lambda: cassette)
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f][1:]
+
+
+def test_record_then_replay_offline(monkeypatch, server, tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = Cassette(path, "record")
+    _use(monkeypatch, recorder)
+    assert transport.build_session().get(server + "/hello").json() == {"hello": "world"}
+    recorder.close()
+
+    _use(monkeypatch, Cassette(path, "replay", latency="zero"))
+    session = transport.build_session()
+    assert session.get(server + "/hello").json() == {"hello": "world"}
+    with pytest.raises(Exception):
+        session.get(server + "/never-recorded")
+
+
+def test_recording_keeps_the_streamed_byte_cap(monkeypatch, server, tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = Cassette(path, "record")
+    _use(monkeypatch, recorder)
+    with pytest.raises(utils.DownloadTooLarge):
+        utils.stream_download(transport.build_session(), server + "/big", str(tmp_path), 100 * 1024, timeout=10)
+    recorder.close()
+    record = _records(path)[0]
+    recorded = len(record.get("body_b64", record.get("body", ""))) * 3 // 4
+    assert recorded < 300 * 1024 # Only what the capped download read, not the whole 1 MiB body
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".part")]
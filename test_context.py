@@ -0,0 +1,109 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent.blobs import STUB_PREFIX
+from sabik_agent.context import SUMMARY_PREFIX, ContextBudget, estimate_tokens
+
+
+def _turn(index, tool_chars=0):
+    """One user turn: user message, optionally an assistant tool call and its result, then the answer."""
+    messages = [{"role": "user", "content": f"question {index}"}]
+    if tool_chars:
+        call_id = f"call_{index}"
+        messages.append({"role": "assistant", "content": None, "tool_calls": [{"id": call_id, "type": "function", "function": {"name": "calculator", "arguments": "{}"}}]})
+        messages.append({"role": "tool", "tool_call_id": call_id, "content": "x" * tool_chars})
+    messages.append({"role": "assistant", "content": f"answer {index}"})
+    return messages
+
+
+def _history(*turns):
+    history = [{"role": "system", "content": "You are Sabik."}]
+    for turn in turns:
+        history.extend(turn)
+    return history
+
+
+def test_fit_is_a_no_op_within_budget():
+    history = _history(_turn(1), _turn(2))
+    snapshot = json.dumps(history)
+    assert ContextBudget(10_000).fit(history) == 0
+    assert json.dumps(history) == snapshot
+
+
+def test_fit_folds_old_tool_results_before_dropping_turns():
+    history = _history(_turn(1, tool_chars=4000), _turn(2), _turn(3))
+    budget = ContextBudget(400, keep_turns=2)
+    saved = budget.fit(history)
+    assert saved > 0
+    assert len(history) == 1 + 4 + 2 + 2 # Nothing dropped
+    folded = json.loads(history[3]["content"])
+    assert folded["folded"] and len(folded["preview"]) == 200
+    assert budget.total(history) <= 400
+
+
+def test_fit_drops_whole_turns_and_pins_the_latest():
+    history = _history(*[_turn(i, tool_chars=40) for i in range(1, 6)])
+    budget = ContextBudget(120, keep_turns=2)
+    budget.fit(history)
+    assert history[0]["role"] == "system"
+    assert history[1]["role"] == "user" # A turn never starts mid-way
+    assert [m["content"] for m in history if m["role"] == "user"][-2:] == ["question 4", "question 5"]
+    # Every tool result still follows the assistant message that called it
+    for i, message in enumerate(history):
+        if message["role"] == "tool":
+            assert history[i - 1].get("tool_calls")[0]["id"] == message["tool_call_id"]
+
+
+def test_pinned_turns_are_kept_even_over_budget():
+    history = _history(_turn(1, tool_chars=4000), _turn(2, tool_chars=4000))
+    ContextBudget(50, keep_turns=2).fit(history)
+    assert len(history) == 1 + 4 + 4
+    assert history[3]["content"] == "x" * 4000
+
+
+def test_dropped_turns_go_into_a_rolling_summary():
+    calls = []
+
+    def summarizer(previous, dropped):
+        calls.append((previous, [m["content"] for m in dropped if m["role"] == "user"]))
+        return f"summary {len(calls)}"
+
+    budget = ContextBudget(30, keep_turns=1, summarizer=summarizer)
+    history = _history(_turn(1), _turn(2), _turn(3))
+    budget.fit(history)
+    assert history[1] == {"role": "system", "content": SUMMARY_PREFIX + "summary 1"}
+    history.extend(_turn(4))
+    budget.fit(history)
+    assert calls[1][0] == "summary 1"
+    summaries = [m for m in history if isinstance(m["content"], str) and m["content"].startswith(SUMMARY_PREFIX)]
+    assert summaries == [history[1]] # The new summary replaced the old one
+
+
+def test_estimates_follow_in_place_content_changes():
+    budget = ContextBudget(10_000)
+    message = {"role": "tool", "tool_call_id": "a", "content": "short"}
+    assert budget.tokens(message) == estimate_tokens(message)
+    message["content"] = "y" * 4000
+    assert budget.tokens(message) == estimate_tokens(message)
+
+
+def test_estimates_survive_replacing_the_history_wholesale():
+    budget = ContextBudget(10_000)
+    for _ in range(50): # Fresh message objects each round, so ids get recycled
+        history = _history(_turn(1, tool_chars=4000))
+        budget.fit(history)
+        history = _history(_turn(2))
+        budget.fit(history)
+        assert budget.total(history) == sum(estimate_tokens(m) for m in history)
+
+
+def test_blob_stubs_are_never_folded():
+    stub = STUB_PREFIX + 'blob_abc", "preview": "' + "x" * 2000 + '"}'
+    history = _history(_turn(1, tool_chars=2000), _turn(2, tool_chars=4000), _turn(3))
+    history[3]["content"] = stub
+    ContextBudget(1000, keep_turns=1).fit(history)
+    assert history[3]["content"] == stub # Still carries its handle
+    assert json.loads(history[7]["content"])["folded"]
@@ -0,0 +1,89 @@
+import collections
+import importlib
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import config as app_config
+from sabik_agent import output, transport
+
+# sabik_agent.tools rebinds submodule names to the tool functions
+fetch = importlib.import_module("sabik_agent.tools.fetch_many_urls")
+
+output.set_sink(output.NullSink())
+
+
+class _Handler(BaseHTTPRequestHandler):
+    lock = threading.Lock()
+    active = collections.Counter()
+    peak = collections.Counter()
+    disconnected = threading.Event()
+
+    def do_GET(self):
+        host = self.headers["Host"].split(":")[0]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.end_headers()
+        if self.path.startswith("/trickle"): # Never finishes within the deadline
+            try:
+                for _ in range(100):
+                    self.wfile.write(b"<p>" + b"x" * 64 + b"</p>")
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            except OSError:
+                self.disconnected.set()
+            return
+        with self.lock:
+            self.active[host] += 1
+            self.peak[host] = max(self.peak[host], self.active[host])
+        time.sleep(0.1)
+        with self.lock:
+            self.active[host] -= 1
+        self.wfile.write(b"<html><title>Page</title><body><p>Hello</p></body></html>")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(app_config, "RESULT_CACHE_ENABLED", False)
+    _Handler.active.clear()
+    _Handler.peak.clear()
+    _Handler.disconnected.clear()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd.server_address[1]
+    httpd.shutdown()
+
+
+def _config(**overrides):
+    settings = dict(FETCH_MAX_URLS=20, FETCH_MAX_CHARS_PER_URL=1000, WEB_MAX_CHARS=5000, WEB_MAX_BYTES=1024 * 1024, WEB_TIMEOUT=10,
+                    FETCH_PER_HOST_LIMIT=2, FETCH_MAX_WORKERS=8, FETCH_DEADLINE_SECONDS=10)
+    settings.update(overrides)
+    return SimpleNamespace(**settings)
+
+
+def test_requests_per_host_are_capped(server):
+    urls = [f"http://{host}:{server}/page/{i}" for host in ("127.0.0.1", "localhost") for i in range(6)]
+    result = fetch.fetch_many_urls(urls, session=transport.build_session(), client=None, config=_config())
+    assert result["fetched"] == 12
+    assert [r["url"] for r in result["results"]] == urls # Results keep the input order
+    assert _Handler.peak["127.0.0.1"] == 2 and _Handler.peak["localhost"] == 2
+
+
+def test_deadline_stops_in_flight_downloads(server):
+    urls = [f"http://127.0.0.1:{server}/trickle", f"http://127.0.0.1:{server}/page/1"]
+    started = time.monotonic()
+    result = fetch.fetch_many_urls(urls, session=transport.build_session(), client=None, config=_config(FETCH_DEADLINE_SECONDS=0.5))
+    assert time.monotonic() - started < 2
+    assert [r["status"] for r in result["results"]] == ["error", "success"]
+    assert _Handler.disconnected.wait(1) # The straggler dropped its connection instead of reading on
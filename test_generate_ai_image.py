@@ -0,0 +1,74 @@
+import importlib
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import cache, output
+
+# sabik_agent.tools rebinds submodule names to the tool functions
+images = importlib.import_module("sabik_agent.tools.generate_ai_image")
+
+output.set_sink(output.NullSink())
+CONFIG = SimpleNamespace(REFERRER_ID="test")
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    """Fake image endpoint: each call writes a new file; calls wait for `release` when it is cleared."""
+    monkeypatch.setitem(cache._caches, "images", cache.ResultCache("images", 10 * 1024 * 1024, 3600, root=str(tmp_path / "cache")))
+    state = SimpleNamespace(calls=[], release=threading.Event(), started=threading.Event())
+    state.release.set()
+
+    def generate(session, referrer, prompt, **params):
+        state.calls.append((prompt, params["seed"]))
+        state.started.set()
+        state.release.wait(5)
+        path = tmp_path / f"image_{len(state.calls)}.jpg"
+        path.write_bytes(b"\xff\xd8\xff")
+        return f"https://images.example/{len(state.calls)}", str(path)
+    monkeypatch.setattr(images, "_api_generate_image_get", generate)
+    return state
+
+
+def _generate(prompt="a cat", seed=None):
+    return images.generate_ai_image(prompt, seed=seed, session=None, client=None, config=CONFIG)
+
+
+def test_seeded_request_is_reused(api):
+    first = _generate(seed=7)
+    second = _generate(seed=7)
+    assert (first["cache"], second["cache"]) == ("miss", "hit")
+    assert second["file_path"] == first["file_path"] and len(api.calls) == 1
+    assert _generate(seed=8)["cache"] == "miss" # Another seed is another image
+
+
+def test_seeded_entry_is_regenerated_when_its_file_is_gone(api):
+    os.remove(_generate(seed=7)["file_path"])
+    assert _generate(seed=7)["cache"] == "miss" and len(api.calls) == 2
+
+
+def test_unseeded_requests_always_reach_the_endpoint(api):
+    assert [_generate()["cache"] for _ in range(2)] == ["disabled", "disabled"]
+    assert len(api.calls) == 2
+
+
+def test_concurrent_identical_requests_share_one_download(api):
+    api.release.clear()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(_generate(seed=3))) for _ in range(3)]
+    threads[0].start()
+    assert api.started.wait(2) # The leader is downloading before the others ask
+    for thread in threads[1:]:
+        thread.start()
+    threading.Event().wait(0.05)
+    api.release.set()
+    for thread in threads:
+        thread.join()
+    assert len(api.calls) == 1
+    assert sorted(result["cache"] for result in results) == ["coalesced", "coalesced", "miss"]
+    assert len({result["file_path"] for result in results}) == 1
@@ -0,0 +1,74 @@
+import base64
+import importlib
+import os
+import sys
+import threading
+from types import SimpleNamespace
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent.cache import FileCache
+
+# sabik_agent.tools rebinds submodule names to the tool functions
+speech = importlib.import_module("sabik_agent.tools.generate_speech_audio")
+
+CONFIG = SimpleNamespace(REFERRER_ID="test", TTS_PIPELINE=False)
+
+
+def test_auto_play_is_queued_in_order_without_overlap(monkeypatch, tmp_path):
+    paths = []
+    for name in ("first.mp3", "second.mp3"):
+        paths.append(str(tmp_path / name))
+        open(paths[-1], "wb").close()
+    synthesized = iter(paths)
+    monkeypatch.setenv("TTS_ENABLED", "true")
+    monkeypatch.setattr(speech, "_api_generate_speech_post", lambda *args: next(synthesized))
+    monkeypatch.setattr(speech.platform, "system", lambda: "Linux")
+    release = threading.Event()
+    played, active = [], []
+
+    def play(path, wait=False):
+        assert wait and not active # One clip at a time
+        active.append(path)
+        release.wait(5)
+        played.append(path)
+        active.remove(path)
+        return True
+    monkeypatch.setattr(speech, "_play_audio_file", play)
+
+    first = speech.generate_speech_audio("Hello.", session=None, client=None, config=CONFIG, auto_play=True)
+    second = speech.generate_speech_audio("Bye.", session=None, client=None, config=CONFIG, auto_play=True)
+    assert "playing in the background" in first["message"] and second["status"] == "success"
+    assert played == [] # Both calls returned while the first clip was still playing
+    release.set()
+    speech._drain_playback()
+    assert played == paths
+
+
+class _FakeTTSSession:
+    def __init__(self):
+        self.posts = []
+
+    def post(self, url, json=None, **kwargs):
+        self.posts.append(json)
+        audio = base64.b64encode(f"{json['voice']}:{json['messages'][0]['content']}".encode()).decode()
+        return SimpleNamespace(raise_for_status=lambda: None, json=lambda: {"choices": [{"message": {"audio": {"data": audio}}}]})
+
+
+def test_speech_cache_is_keyed_by_text_and_voice(monkeypatch, tmp_path):
+    monkeypatch.setenv("TTS_ENABLED", "true")
+    monkeypatch.setattr(speech, "_speech_cache", lambda: FileCache(str(tmp_path), 10 * 1024 * 1024))
+    session = _FakeTTSSession()
+
+    def speak(text, voice="alloy"):
+        return speech.generate_speech_audio(text, voice, session=session, client=None, config=CONFIG, auto_play=False)
+    first = speak("Hello there.")
+    assert first["cache"] == {"hits": 0, "misses": 1}
+    second = speak("Hello there.")
+    assert second["cache"] == {"hits": 1, "misses": 0} and len(session.posts) == 1
+    assert second["audio_file_path"] == first["audio_file_path"]
+    with open(second["audio_file_path"], "rb") as f:
+        assert f.read() == b"alloy:Hello there."
+    assert speak("Hello there.", "nova")["cache"]["misses"] == 1
+    assert speak("Hello again.")["cache"]["misses"] == 1
+    assert len(session.posts) == 3 and len(os.listdir(tmp_path)) == 3
@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import sys
+
+import pytest
+from rich.console import Console
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import output
+
+
+@pytest.fixture(autouse=True)
+def restore_sink():
+    previous = output.set_sink("null")
+    yield
+    output.set_sink(previous)
+
+
+def test_plain_sink_writes_one_line_per_event():
+    stream = io.StringIO()
+    output.set_sink(output.PlainSink(stream))
+    output.rule("Processing Request")
+    output.message("Image saved", target="/tmp/a.png")
+    output.panel("TTS Error", "first\nsecond", "error")
+    output.tool_call("Fetch Many URLs", {"URLs (2)": ["https://a.example", "https://b.example"]})
+    output.get_sink().tool_summary([("call_1", "calculator", "{}", "success")])
+    assert stream.getvalue().splitlines() == [
+        "== Processing Request ==",
+        "Image saved: /tmp/a.png",
+        "[TTS Error] ERROR: first | second",
+        "[tool] Fetch Many URLs: URLs (2)=https://a.example, https://b.example",
+        "[done] calculator (call_1): success",
+    ]
+
+
+def test_plain_sink_shortens_long_results():
+    stream = io.StringIO()
+    serialized = json.dumps({"text": "x" * 1000})
+    output.PlainSink(stream).tool_result("simple_web_search", {"text": "x" * 1000}, serialized)
+    line = stream.getvalue().rstrip("\n")
+    assert line.endswith(f"... ({len(serialized)} chars)") and len(line) < 600
+
+
+def test_json_sink_events_are_valid_json_lines():
+    stream = io.StringIO()
+    sink = output.JsonSink(stream)
+    sink.message("Fetching image", "detail", "https://a.example/x.png")
+    result = {"status": "success", "value": 4}
+    sink.tool_result("calculator", result, json.dumps(result)) # Spliced in, not re-encoded
+    sink.tool_result("echo", "plain text", "plain text")
+    events = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert events[0]["event"] == "message" and events[0]["target"] == "https://a.example/x.png"
+    assert events[1]["result"] == result and events[1]["tool"] == "calculator"
+    assert events[2]["result"] == "plain text"
+
+
+def test_rich_sink_renders_to_its_console():
+    stream = io.StringIO()
+    sink = output.RichSink(Console(file=stream, width=80, color_system=None))
+    sink.message("[not markup]", "warning")
+    sink.panel("Audio Playback", "Playing...")
+    text = stream.getvalue()
+    assert "[not markup]" in text and "Audio Playback" in text and "Playing..." in text
+
+
+def test_set_sink_returns_the_previous_sink_and_accepts_mode_names():
+    previous = output.set_sink("json")
+    assert type(previous) is output.NullSink and isinstance(output.get_sink(), output.JsonSink)
+    with pytest.raises(ValueError):
+        output.make_sink("fancy")
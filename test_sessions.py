@@ -0,0 +1,83 @@
+import json
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent.sessions import SessionStore
+
+
+def _turn(index):
+    return [{"role": "user", "content": f"question {index}"}, {"role": "assistant", "content": f"answer {index}"}]
+
+
+def _summary(text):
+    return {"role": "system", "content": f"Summary of the earlier conversation (older turns were compressed):\n{text}"}
+
+
+def _new_log(tmp_path, turns=3):
+    store = SessionStore(str(tmp_path))
+    log = store.create()
+    for index in range(1, turns + 1):
+        log.append_turn(_turn(index))
+    return store, log
+
+
+def test_appended_turns_are_loaded_and_indexed(tmp_path):
+    store, log = _new_log(tmp_path)
+    log.close()
+    reopened = store.open(log.id)
+    assert reopened.load() == _turn(1) + _turn(2) + _turn(3)
+    assert store.list()[0]["title"] == "question 1"
+    assert store.resolve("last") == log.id
+
+
+def test_torn_last_line_is_skipped_and_cut_before_the_next_append(tmp_path):
+    store, log = _new_log(tmp_path, turns=2)
+    log.close()
+    with open(log.path, "ab") as f:
+        f.write(b'{"type": "message", "turn": 3, "mess') # Crash mid-append
+    reopened = store.open(log.id)
+    assert reopened.load() == _turn(1) + _turn(2)
+    reopened.append_turn(_turn(3))
+    reopened.close()
+    with open(log.path, "rb") as f:
+        lines = f.read().splitlines()
+    assert all(json.loads(line) for line in lines)
+    assert store.open(log.id).load() == _turn(1) + _turn(2) + _turn(3)
+
+
+def test_index_is_rebuilt_from_the_logs(tmp_path):
+    store, log = _new_log(tmp_path, turns=2)
+    log.close()
+    os.remove(store.index_path)
+    assert [entry["id"] for entry in store.list()] == [log.id]
+    assert store.list()[0]["turns"] == 2
+
+
+def test_resume_starts_at_the_latest_summary(tmp_path):
+    store, log = _new_log(tmp_path, turns=3)
+    log.append_summary(_summary("turn 1"), through_turn=1)
+    log.append_turn(_turn(4))
+    log.append_summary(_summary("turns 1-2"), through_turn=2)
+    log.close()
+    assert store.open(log.id).load() == [_summary("turns 1-2")] + _turn(3) + _turn(4)
+
+
+def test_compaction_drops_superseded_summaries_and_keeps_every_message(tmp_path, monkeypatch):
+    monkeypatch.setattr("sabik_agent.config.SESSION_COMPACT_TURNS", 1)
+    store, log = _new_log(tmp_path, turns=3)
+    log.append_summary(_summary("turn 1"), through_turn=1)
+    assert not log.should_compact() # A single summary is not redundant
+    log.append_summary(_summary("turns 1-2"), through_turn=2)
+    assert log.should_compact()
+    log.compact()
+    assert not log.should_compact()
+    log.append_turn(_turn(4))
+    log.close()
+
+    with open(log.path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f]
+    assert [r["message"] for r in records if r["type"] == "message"] == _turn(1) + _turn(2) + _turn(3) + _turn(4)
+    assert [r["through_turn"] for r in records if r["type"] == "summary"] == [2]
+    assert store.open(log.id).load() == [_summary("turns 1-2")] + _turn(3) + _turn(4)
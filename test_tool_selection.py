@@ -0,0 +1,65 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent.tool_selection import ToolSelector
+from sabik_agent.tools import TOOL_SPECS, tool_schemas
+
+
+@pytest.fixture
+def selector():
+    return ToolSelector(TOOL_SPECS)
+
+
+@pytest.mark.parametrize("prompt", ["what is 2 plus 2", "What is 15% of 80?", "what is 2 + 2", "12 divided by 4"])
+def test_arithmetic_selects_the_calculator(selector, prompt):
+    assert selector.select(prompt) == ("calculator",)
+
+
+def test_decimal_number_is_not_a_file_name(selector):
+    assert selector.select("what is 2.50 times 4") == ("calculator",)
+
+
+@pytest.mark.parametrize("prompt", ["Read this file: notes.txt", "Open config.py"])
+def test_file_no_tool_reads_gets_no_tools(selector, prompt):
+    assert selector.select(prompt) == ()
+
+
+def test_make_and_describe_selects_both_image_tools(selector):
+    names = selector.select("Make a picture of a dog and then describe what is in it")
+    assert names == ("generate_ai_image", "analyze_image_content")
+
+
+def test_previous_tools_are_used_only_for_a_follow_up_without_matches(selector):
+    assert selector.select("now make it wider", previous_tools=["generate_ai_image"]) == ("generate_ai_image",)
+    assert selector.select("what is 2 plus 2", previous_tools=["generate_ai_image"]) == ("calculator",)
+
+
+def test_fallback_offers_everything_but_on_demand_tools(selector):
+    names = selector.select("tell me about the history of Rome")
+    assert "read_tool_result" not in names
+    assert len(names) == len(TOOL_SPECS) - 1
+    assert selector.select("show me the start of blob_3f2a") == ("read_tool_result",)
+
+
+def test_schema_lists_are_cached_and_json_encoded_once(selector):
+    schemas = tool_schemas()
+    first = selector.schemas(["calculator"], schemas)
+    assert selector.schemas(("calculator",), schemas) is first
+    assert [schema["function"]["name"] for schema in first] == ["calculator"]
+    assert '"name": "calculator"' in first.json
+
+
+def test_changed_schema_source_invalidates_the_cache(selector):
+    schemas = tool_schemas()
+    first = selector.schemas(["calculator"], schemas)
+    replaced = tool_schemas()
+    replaced[-2]["function"]["description"] = "Evaluates arithmetic."
+    assert selector.schemas(["calculator"], replaced)[0]["function"]["description"] == "Evaluates arithmetic."
+    schemas[-2] = replaced[-2] # Replacing one schema in the original list also resets the cache
+    assert selector.schemas(["calculator"], schemas) is not first
+    extra = {"type": "function", "function": {"name": "runtime_tool", "parameters": {}}}
+    assert selector.schemas(["calculator"], schemas + [extra])[-1] is extra
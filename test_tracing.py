@@ -0,0 +1,88 @@
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import tracing
+
+
+@pytest.fixture
+def traced(tmp_path):
+    paths = (str(tmp_path / "trace.jsonl"), str(tmp_path / "metrics.prom"))
+    tracing.configure(True, *paths)
+    yield paths
+    tracing.configure(False)
+
+
+def _spans(trace_path):
+    with open(trace_path, encoding="utf-8") as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+
+def test_spans_nest_within_a_trace_and_across_bound_threads(traced):
+    def tool():
+        with tracing.span("tool"):
+            pass
+
+    with tracing.span("turn") as turn:
+        with tracing.span("llm.request"):
+            pass
+        worker = threading.Thread(target=tracing.bind(tool))
+        worker.start()
+        worker.join()
+        assert tracing.current() is turn
+    with tracing.span("turn2"):
+        pass
+    spans = _spans(traced[0])
+    assert spans["llm.request"]["parent_id"] == spans["turn"]["span_id"]
+    assert spans["tool"]["parent_id"] == spans["turn"]["span_id"]
+    assert spans["llm.request"]["trace_id"] == spans["tool"]["trace_id"] == spans["turn"]["trace_id"]
+    assert spans["turn"]["parent_id"] is None and spans["turn2"]["trace_id"] != spans["turn"]["trace_id"]
+
+
+def test_spans_are_written_when_the_root_span_ends(traced):
+    with tracing.span("turn"):
+        with tracing.span("http.request", bytes_sent=10):
+            pass
+        assert not os.path.exists(traced[0])
+    spans = _spans(traced[0])
+    assert set(spans) == {"turn", "http.request"}
+    assert spans["http.request"]["attrs"] == {"bytes_sent": 10}
+
+
+def test_errors_are_recorded_and_counted(traced):
+    with pytest.raises(ValueError):
+        with tracing.span("tool"):
+            raise ValueError("bad input")
+    with tracing.span("tool") as handled:
+        handled.record_error(KeyError("x"))
+    assert _spans(traced[0])["tool"]["error"] == "KeyError: 'x'"
+    assert 'sabik_span_errors_total{span="tool"} 2' in open(traced[1], encoding="utf-8").read()
+
+
+def test_prometheus_summary_and_counters(traced):
+    for outcome in ("hit", "miss", "hit"):
+        with tracing.span("cache.get", cache=outcome):
+            pass
+    with tracing.span("llm.request", prompt_tokens=100, completion_tokens=20, bytes_sent=300, bytes_received=50):
+        pass
+    lines = open(traced[1], encoding="utf-8").read().splitlines()
+    assert "# TYPE sabik_span_duration_seconds summary" in lines
+    assert 'sabik_span_duration_seconds_count{span="cache.get"} 3' in lines
+    assert sum(1 for line in lines if line.startswith('sabik_span_duration_seconds{span="cache.get",quantile=')) == 3
+    assert 'sabik_cache_lookups_total{span="cache.get",outcome="hit"} 2' in lines
+    assert 'sabik_llm_tokens_total{kind="prompt"} 100' in lines
+    assert 'sabik_bytes_total{span="llm.request",direction="received"} 50' in lines
+
+
+def test_disabled_tracing_is_a_shared_no_op():
+    tracing.configure(False)
+    with tracing.span("turn", size=1) as span:
+        assert span is tracing.NOOP_SPAN and not span.recording
+    assert tracing.current() is tracing.NOOP_SPAN
+    fn = lambda: None
+    assert tracing.bind(fn) is fn
@@ -0,0 +1,80 @@
+import importlib
+import os
+import sys
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import cache
+
+# sabik_agent.tools exposes the tool functions under the module names
+stt = importlib.import_module("sabik_agent.tools.transcribe_audio_file")
+
+
+def _write_wav(path, seconds, rate=44100, channels=2, width=2):
+    t = np.arange(int(seconds * rate)) / rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 8000).astype("<i2")
+    frames = np.repeat(tone, channels)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(channels)
+        wav.setsampwidth(width)
+        wav.setframerate(rate)
+        wav.writeframes(frames.tobytes())
+
+
+def test_merge_overlap_drops_words_repeated_at_the_join():
+    merged = stt._merge_overlap("we met on the Tuesday morning", "Tuesday morning, and then we left")
+    assert merged == "we met on the Tuesday morning and then we left"
+
+
+def test_merge_overlap_ignores_single_word_coincidences():
+    assert stt._merge_overlap("it was the", "the end") == "it was the the end"
+
+
+def test_segments_are_written_as_16k_mono(tmp_path):
+    path = tmp_path / "long.wav"
+    _write_wav(path, seconds=3)
+    source = stt._WavSource(str(path))
+    segment_path = stt._write_wav_segment(source, 0, source.nframes)
+    try:
+        with wave.open(segment_path, "rb") as wav:
+            assert (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) == (1, 2, stt.SEGMENT_RATE)
+            assert abs(wav.getnframes() - 3 * stt.SEGMENT_RATE) <= 1
+        assert os.path.getsize(segment_path) < os.path.getsize(path) / 5
+    finally:
+        os.remove(segment_path)
+
+
+def test_probe_duration_reads_the_wav_header(tmp_path):
+    path = tmp_path / "short.wav"
+    _write_wav(path, seconds=2, rate=8000, channels=1)
+    assert stt._probe_duration(str(path)) == 2.0
+
+
+def test_plan_segments_overlap_and_cover_the_recording(tmp_path):
+    path = tmp_path / "long.wav"
+    _write_wav(path, seconds=10, rate=8000, channels=1)
+    source = stt._WavSource(str(path))
+    segments = stt._plan_segments(source, segment_seconds=3, overlap_seconds=0.5)
+    assert segments[0][0] == 0 and segments[-1][1] == source.nframes
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end - start == 2 * int(0.5 * source.rate)
+
+
+def test_transcription_cache_hits_until_the_file_changes(monkeypatch, tmp_path):
+    monkeypatch.setitem(cache._caches, "transcriptions", cache.ResultCache("transcriptions", 10 * 1024 * 1024, 3600, root=str(tmp_path / "cache")))
+    calls = []
+    monkeypatch.setattr(stt, "_transcribe_file", lambda client, path: calls.append(path) or f"text {len(calls)}")
+    config = SimpleNamespace(TRANSCRIBE_LONG_AUDIO=False, TRANSCRIBE_SEGMENT_SECONDS=120)
+    path = tmp_path / "note.wav"
+    _write_wav(path, 0.5)
+
+    def transcribe():
+        return stt.transcribe_audio_file(str(path), session=None, client=None, config=config)
+    assert transcribe()["cache"] == "miss"
+    assert transcribe() == {"status": "success", "transcription": "text 1", "cache": "hit"}
+    _write_wav(path, 0.6)
+    assert transcribe() == {"status": "success", "transcription": "text 2", "cache": "miss"}
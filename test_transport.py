@@ -0,0 +1,184 @@
+import io
+import os
+import sys
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import transport
+from sabik_agent.transport import CircuitBreaker, CircuitOpenError, ResilientHTTPAdapter, RetryPolicy
+
+ENDPOINT = "https://example.test"
+
+
+def _open_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    breaker.record_failure(ENDPOINT)
+    breaker.record_failure(ENDPOINT)
+    return breaker
+
+
+def test_breaker_opens_after_threshold_and_blocks(monkeypatch):
+    monkeypatch.setattr(transport.time, "monotonic", lambda: 100.0)
+    breaker = CircuitBreaker(failure_threshold=2, reset_seconds=10)
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == "closed"
+    assert breaker.admit(ENDPOINT) == (None, False)
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == "open"
+    blocked, probe = breaker.admit(ENDPOINT)
+    assert blocked and not probe
+
+
+def test_breaker_half_open_lets_one_probe_through(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(transport.time, "monotonic", lambda: now[0])
+    breaker = _open_breaker()
+    now[0] += 11
+    assert breaker.admit(ENDPOINT) == (None, True)
+    assert breaker.state(ENDPOINT) == "half-open"
+    blocked, probe = breaker.admit(ENDPOINT)
+    assert blocked and not probe
+    breaker.record_success(ENDPOINT)
+    assert breaker.state(ENDPOINT) == "closed"
+
+
+def test_breaker_failed_probe_reopens(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(transport.time, "monotonic", lambda: now[0])
+    breaker = _open_breaker()
+    now[0] += 11
+    assert breaker.admit(ENDPOINT)[1]
+    breaker.record_failure(ENDPOINT)
+    assert breaker.state(ENDPOINT) == "open"
+    assert breaker.admit(ENDPOINT)[0]
+
+
+def test_breaker_end_probe_frees_the_half_open_slot(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(transport.time, "monotonic", lambda: now[0])
+    breaker = _open_breaker()
+    now[0] += 11
+    assert breaker.admit(ENDPOINT)[1]
+    breaker.end_probe(ENDPOINT)
+    assert breaker.admit(ENDPOINT) == (None, True)
+
+
+def test_breaker_trip_opens_immediately():
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=10)
+    breaker.record_failure(ENDPOINT, trip=True)
+    assert breaker.state(ENDPOINT) == "open"
+
+
+def _adapter(monkeypatch, outcomes, breaker=None):
+    """Adapter whose underlying send returns or raises the given outcomes in order."""
+    calls = []
+
+    def fake_send(self, request, **kwargs):
+        calls.append(request.method)
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        response = requests.Response()
+        response.status_code = outcome
+        response.request = request
+        response.raw = io.BytesIO(b"")
+        return response
+
+    monkeypatch.setattr(HTTPAdapter, "send", fake_send)
+    monkeypatch.setattr(transport.time, "sleep", lambda seconds: None)
+    policy = RetryPolicy(max_retries=3, backoff_base=0, backoff_max=0, retry_after_max=0)
+    adapter = ResilientHTTPAdapter(policy=policy, breaker=breaker or CircuitBreaker(5, 30))
+    return adapter, calls
+
+
+def _request(method="GET", body=None):
+    return requests.Request(method, ENDPOINT + "/x", data=body).prepare()
+
+
+def test_probe_that_raises_unexpectedly_does_not_lock_the_endpoint(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(transport.time, "monotonic", lambda: now[0])
+    breaker = _open_breaker()
+    now[0] += 11
+    adapter, _ = _adapter(monkeypatch, [ValueError("boom"), 200], breaker)
+    try:
+        adapter.send(_request())
+    except ValueError:
+        pass
+    assert adapter.send(_request()).status_code == 200
+    assert breaker.state(ENDPOINT) == "closed"
+
+
+def test_probe_answered_with_429_completes_the_probe(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(transport.time, "monotonic", lambda: now[0])
+    breaker = _open_breaker()
+    now[0] += 11
+    adapter, calls = _adapter(monkeypatch, [429, 200], breaker)
+    assert adapter.send(_request()).status_code == 200
+    assert calls == ["GET", "GET"]
+    assert breaker.state(ENDPOINT) == "closed"
+
+
+def test_long_read_timeout_is_not_retried_and_opens_circuit(monkeypatch):
+    breaker = CircuitBreaker(5, 30)
+    adapter, calls = _adapter(monkeypatch, [requests.exceptions.ReadTimeout(), 200], breaker)
+    try:
+        adapter.send(_request(), timeout=300)
+        assert False, "ReadTimeout expected"
+    except requests.exceptions.ReadTimeout:
+        pass
+    assert len(calls) == 1
+    assert breaker.state(ENDPOINT) == "open"
+    try:
+        adapter.send(_request(), timeout=300)
+        assert False, "CircuitOpenError expected"
+    except CircuitOpenError:
+        pass
+
+
+def test_short_read_timeout_on_get_is_retried(monkeypatch):
+    adapter, calls = _adapter(monkeypatch, [requests.exceptions.ReadTimeout(), 200])
+    assert adapter.send(_request(), timeout=10).status_code == 200
+    assert len(calls) == 2
+
+
+def test_post_is_not_retried_after_a_server_error(monkeypatch):
+    adapter, calls = _adapter(monkeypatch, [502, 200])
+    assert adapter.send(_request("POST", b"{}")).status_code == 502
+    assert calls == ["POST"]
+
+
+def test_post_is_retried_when_refused(monkeypatch):
+    adapter, calls = _adapter(monkeypatch, [503, requests.exceptions.ConnectTimeout(), 200])
+    assert adapter.send(_request("POST", b"{}")).status_code == 200
+    assert len(calls) == 3
+
+
+def test_post_is_not_retried_after_a_read_timeout(monkeypatch):
+    adapter, calls = _adapter(monkeypatch, [requests.exceptions.ReadTimeout(), 200])
+    try:
+        adapter.send(_request("POST", b"{}"), timeout=5)
+        assert False, "ReadTimeout expected"
+    except requests.exceptions.ReadTimeout:
+        pass
+    assert len(calls) == 1
+
+
+def test_no_attempt_or_retry_starts_past_the_deadline(monkeypatch):
+    adapter, calls = _adapter(monkeypatch, [503, 200])
+    adapter.policy.delay = lambda attempt, retry_after=None: 5.0
+    with transport.deadline(time.monotonic() + 2):
+        assert adapter.send(_request(), timeout=10).status_code == 503 # The 5s backoff would end past the deadline
+    assert calls == ["GET"]
+    with transport.deadline(time.monotonic() - 1):
+        try:
+            adapter.send(_request(), timeout=10)
+            assert False, "Timeout expected"
+        except requests.exceptions.Timeout:
+            pass
+    assert calls == ["GET"]
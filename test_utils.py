@@ -0,0 +1,110 @@
+import base64
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+from PIL import Image
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import utils
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+BODIES = {"/image": PNG, "/empty": b"", "/html": b"<html>not an image</html>", "/big": PNG + b"\x00" * 4096}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        body = BODIES[self.path]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html" if self.path == "/html" else "image/png")
+        self.end_headers() # No Content-Length: the size is only known while streaming
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def _download(server, tmp_path, path, max_bytes=1024):
+    return utils.stream_download(requests.Session(), server + path, str(tmp_path), max_bytes, timeout=10, require_image=True)
+
+
+def test_image_is_streamed_to_a_temp_file(server, tmp_path):
+    temp_path, content_type, _ = _download(server, tmp_path, "/image")
+    assert content_type == "image/png"
+    with open(temp_path, "rb") as f:
+        assert f.read() == PNG
+
+
+@pytest.mark.parametrize("path", ["/empty", "/html"])
+def test_empty_or_non_image_body_is_rejected(server, tmp_path, path):
+    with pytest.raises(ValueError):
+        _download(server, tmp_path, path)
+    assert os.listdir(tmp_path) == []
+
+
+def test_download_past_the_cap_is_aborted(server, tmp_path):
+    with pytest.raises(utils.DownloadTooLarge):
+        _download(server, tmp_path, "/big")
+    assert os.listdir(tmp_path) == []
+
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, utils.BASE64_CHUNK_SIZE - 1, utils.BASE64_CHUNK_SIZE + 2])
+def test_base64_file_matches_b64encode_across_chunk_boundaries(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert utils.base64_file(str(path), prefix=b"data:x;base64,") == "data:x;base64," + base64.b64encode(data).decode("ascii")
+
+
+def _noise_image(path, size, mode="RGB"):
+    Image.frombytes(mode, size, os.urandom(size[0] * size[1] * len(mode))).save(path)
+    return str(path)
+
+
+def _optimize(path, **limits):
+    stats = {}
+    result = utils.optimize_image_for_upload(path, stats, **dict(dict(max_side=512, max_kb=64, fmt="JPEG", quality=80), **limits))
+    if result:
+        os.remove(result[0])
+    return result, stats
+
+
+def test_large_image_is_downscaled_to_max_side(tmp_path):
+    result, stats = _optimize(_noise_image(tmp_path / "big.png", (1024, 512)))
+    assert result[1] == "image/jpeg"
+    assert stats["optimized"] and stats["upload_size"] == [512, 256]
+    assert stats["upload_bytes"] < stats["original_bytes"]
+
+
+def test_image_over_the_size_cap_is_recompressed_at_its_size(tmp_path):
+    result, stats = _optimize(_noise_image(tmp_path / "heavy.png", (400, 400)))
+    assert result and stats["upload_size"] == [400, 400]
+
+
+def test_image_within_limits_is_sent_unchanged(tmp_path):
+    path = tmp_path / "small.png"
+    Image.new("RGB", (64, 64), "red").save(path)
+    result, stats = _optimize(str(path))
+    assert result is None and stats["skipped"] == "already under limits"
+
+
+def test_upload_format_choice(tmp_path):
+    path = _noise_image(tmp_path / "alpha.png", (800, 800), mode="RGBA")
+    result, _ = _optimize(path, fmt="webp")
+    assert result[1] == "image/webp"
+    result, stats = _optimize(path, fmt="jpeg") # Transparency is flattened for JPEG
+    assert result[1] == "image/jpeg" and stats["optimized"]
+    result, stats = _optimize(path, fmt="gif")
+    assert result is None and stats["skipped"] == "unsupported upload format GIF"
@@ -0,0 +1,74 @@
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sabik_agent import cache, transport
+from sabik_agent.web import fetch_page
+
+PAGE = b"<html><head><title>News</title><script>var x = 1;</script></head><body><nav>Menu</nav><p>First story.</p><p>Second story.</p></body></html>"
+BIG_PAGE = b"<html><body>" + b"<p>" + b"word " * 50000 + b"</p></body></html>"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/news" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE if self.path == "/news" else BIG_PAGE
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        if self.path == "/news":
+            self.send_header("ETag", '"v1"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch, tmp_path):
+    monkeypatch.setitem(cache._caches, "web", cache.ResultCache("web", 10 * 1024 * 1024, 3600, root=str(tmp_path)))
+    _Handler.requests_seen = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+def test_readable_text_without_scripts_or_navigation(server):
+    page = fetch_page(transport.build_session(), server + "/news", max_bytes=65536, max_chars=1000)
+    assert page["title"] == "News"
+    assert page["text"] == "First story.\nSecond story."
+    assert not page["truncated"] and page["cache"] == "miss"
+
+
+def test_repeat_fetch_is_revalidated_with_a_conditional_get(server):
+    session = transport.build_session()
+    first = fetch_page(session, server + "/news", max_bytes=65536, max_chars=1000)
+    second = fetch_page(session, server + "/news", max_bytes=65536, max_chars=1000)
+    assert _Handler.requests_seen == [("/news", None), ("/news", '"v1"')]
+    assert second["cache"] == "revalidated" and second["bytes_read"] == 0
+    assert second["text"] == first["text"]
+
+
+def test_body_read_stops_at_the_byte_cap(server):
+    page = fetch_page(transport.build_session(), server + "/big", max_bytes=20000, max_chars=1_000_000)
+    assert page["truncated"] and page["bytes_read"] == 20000
+    assert len(page["text"]) < 20000
+
+
+def test_text_limit_stops_the_read_early(server):
+    page = fetch_page(transport.build_session(), server + "/big", max_bytes=10 * 1024 * 1024, max_chars=500)
+    assert page["truncated"] and len(page["text"]) == 500
+    assert page["bytes_read"] < len(BIG_PAGE)